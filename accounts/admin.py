@@ -12,7 +12,7 @@ class CustomUserAdmin(UserAdmin):
     )
     add_fieldsets = UserAdmin.add_fieldsets + (
         ('Informations supplémentaires', {
-            'fields': ('role', 'phone')
+            'fields': ('email', 'role', 'phone')
         }),
     )
 
@@ -0,0 +1,176 @@
+"""
+Variantes async (ASGI) des vues les plus sollicitées : me, login, logout,
+list_users.
+
+Sous uvicorn, une vue DRF synchrone passe par le pool de threads de
+`sync_to_async` à chaque requête. Ces vues Django natives utilisent l'ORM
+async (`aget`, `async for`), la session async (`auser`,
+`alogin`, `alogout`) et font attendre le hachage PBKDF2 dans un thread de
+l'exécuteur. Elles renvoient exactement les mêmes corps JSON que les vues
+de `views.py`, dont elles partagent la validation et la mise en forme.
+
+Activées par ACCOUNTS_ASYNC_VIEWS (voir `urls.py` et `crm_backend/asgi.py`).
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import alogin, alogout
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from rest_framework.authentication import CSRFCheck
+from rest_framework.exceptions import NotAuthenticated, NotFound
+
+from . import hashing, rows, tokens
+from .bulk import filter_users
+from .conditional import instance_validators, not_modified, page_validators, set_validators
+from .models import User
+from .pagination import UserRowPagination
+from .permissions import is_super_admin
+from .throttling import login_throttle
+from .views import (
+    LOGIN_INACTIVE, LOGIN_NOT_FOUND, LOGIN_WRONG_PASSWORD,
+    _login_input_error, _login_success, _login_throttled, _page_state, _user_page,
+)
+
+
+def _json(data, status_code=status.HTTP_200_OK, headers=None):
+    # Même rendu que le JSONRenderer de DRF (UTF-8, séparateurs compacts).
+    return JsonResponse(
+        data, status=status_code, headers=headers,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def _not_authenticated():
+    return _json({'detail': str(NotAuthenticated.default_detail)}, status.HTTP_403_FORBIDDEN)
+
+
+async def _authenticated_user(request):
+    """
+    Équivalent de SessionAuthentication puis AccessTokenAuthentication :
+    utilisateur connecté et actif, sinon None.
+    """
+    token = tokens.bearer_token(request) if tokens.is_enabled() else None
+    if token is not None:
+        try:
+            claims = await tokens.adecode(token)
+        except tokens.InvalidToken:
+            return None
+        return tokens.TokenUser(claims) if claims['is_active'] else None
+    user = await request.auser()
+    if not user.is_authenticated or not user.is_active:
+        return None
+    return user
+
+
+def _csrf_failure(request):
+    """Contrôle CSRF appliqué par DRF aux requêtes authentifiées par session."""
+    check = CSRFCheck(lambda req: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+# ── AUTH ──────────────────────────────────────────────────────────
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    data = _request_data(request)
+    if data is None:
+        return _json({'detail': 'JSON invalide.'}, status.HTTP_400_BAD_REQUEST)
+    email = str(data.get('email', '')).strip()
+    password = str(data.get('password', ''))
+
+    error = _login_input_error(email, password)
+    if error is not None:
+        return _json(*error)
+
+    wait = await login_throttle.acheck(request, email)
+    if wait is not None:
+        return _json(*_login_throttled(wait))
+
+    try:
+        user = await User.objects.by_email(email).aget()
+    except User.DoesNotExist:
+        return _json(*LOGIN_NOT_FOUND)
+    if not user.is_active:
+        return _json(*LOGIN_INACTIVE)
+
+    try:
+        valid = await hashing.acheck_password(user, password)
+    except hashing.PasswordHashingUnavailable as exc:
+        # Hors de DRF : même réponse que son gestionnaire d'exceptions (503 + Retry-After).
+        return _json(
+            {'detail': str(exc.detail)}, status.HTTP_503_SERVICE_UNAVAILABLE, {'Retry-After': '%d' % exc.wait},
+        )
+    if not valid:
+        return _json(*LOGIN_WRONG_PASSWORD)
+    if not tokens.is_enabled():
+        await alogin(request, user, backend='accounts.backends.EmailBackend')
+    return _json(_login_success(user))
+
+
+@csrf_exempt
+@require_POST
+async def logout_view(request):
+    user = await _authenticated_user(request)
+    if user is None:
+        return _not_authenticated()
+    if isinstance(user, tokens.TokenUser):
+        # Pas de cookie, donc pas de contrôle CSRF ; voir `views.logout_view`.
+        data = _request_data(request) or {}
+        await sync_to_async(tokens.revoke)(user.claims)
+        await sync_to_async(tokens.revoke_refresh)(str(data.get('refresh', '')))
+        return _json({'success': True, 'message': 'Deconnexion reussie'})
+    reason = _csrf_failure(request)
+    if reason:
+        return _json({'detail': f'CSRF Failed: {reason}'}, status.HTTP_403_FORBIDDEN)
+    await alogout(request)
+    return _json({'success': True, 'message': 'Deconnexion reussie'})
+
+
+@require_GET
+async def me(request):
+    user = await _authenticated_user(request)
+    if user is None:
+        return _not_authenticated()
+    etag, last_modified = instance_validators(user)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+    return set_validators(_json(rows.profile(user)), etag, last_modified)
+
+
+# ── GESTION DES COMPTES ───────────────────────────────────────────
+
+@require_GET
+async def list_users(request):
+    """Voir `views.list_users` (mêmes paramètres, même réponse)."""
+    user = await _authenticated_user(request)
+    if user is None:
+        return _not_authenticated()
+    queryset = filter_users(User.objects.all(), request.GET)
+
+    can_manage = is_super_admin(user)
+    paginator = UserRowPagination()
+    try:
+        page = await paginator.apaginate_queryset(rows.select_rows(queryset), request)
+    except NotFound as exc:
+        return _json({'detail': str(exc.detail)}, status.HTTP_404_NOT_FOUND)
+    etag, last_modified = page_validators(page, *_page_state(paginator), can_manage)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+    return set_validators(_json(_user_page(paginator, can_manage)), etag, last_modified)
@@ -0,0 +1,25 @@
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import tokens
+
+
+class AccessTokenAuthentication(BaseAuthentication):
+    """
+    `Authorization: Bearer <jeton d'accès>` (mode ACCOUNTS_TOKEN_AUTH).
+    `request.user` est un `TokenUser` et `request.auth` ses claims, sans requête SQL.
+    """
+
+    def authenticate(self, request):
+        if not tokens.is_enabled():
+            return None
+        token = tokens.bearer_token(request)
+        if token is None:
+            return None
+        try:
+            claims = tokens.decode(token)
+        except tokens.InvalidToken as exc:
+            raise AuthenticationFailed(str(exc))
+        if not claims['is_active']:
+            raise AuthenticationFailed('Ce compte est désactivé.')
+        return tokens.TokenUser(claims), claims
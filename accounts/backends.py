@@ -0,0 +1,36 @@
+from django.contrib.auth.backends import ModelBackend
+
+from . import hashing
+from .models import User
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authentification par e-mail en une seule requête indexée.
+
+    - `authenticate(request, email=..., password=...)` charge l'utilisateur
+      via LOWER(email) puis vérifie le mot de passe ;
+    - `authenticate(request, user=<User>, password=...)` réutilise une
+      instance déjà chargée par la vue, sans nouvelle requête ;
+    - sinon on retombe sur l'authentification par username de Django
+      (formulaire de l'admin).
+    """
+
+    def authenticate(self, request, email=None, password=None, user=None, **kwargs):
+        if user is None and email is None:
+            return super().authenticate(request, password=password, **kwargs)
+        if password is None:
+            return None
+
+        if user is None:
+            try:
+                user = User.objects.get_by_email(email)
+            except User.DoesNotExist:
+                # Même coût qu'un vrai contrôle pour ne pas révéler l'existence du compte.
+                hashing.make_password(password)
+                return None
+
+        # Hachage délégué au pool borné (503 + Retry-After si saturé).
+        if hashing.check_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,359 @@
+"""
+Banc d'essai de l'API des comptes, exécuté en processus avec le client de
+test Django (pas de serveur, pas de réseau).
+
+Chaque scénario appelle une vue N fois et relève la latence de chaque
+requête, le nombre de requêtes SQL et les codes HTTP. `run_suite` renvoie un
+dict sérialisable en JSON pour comparer deux commits.
+
+`run_concurrency` compare, à concurrence égale, la pile WSGI (vues DRF
+synchrones, un thread par connexion) et la pile ASGI (vues async, une boucle
+d'événements). C'est une approximation en processus : pour des chiffres de
+déploiement, lancer un outil de charge externe contre gunicorn et uvicorn.
+"""
+import asyncio
+import platform
+import subprocess
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from types import ModuleType
+
+import django
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import include, path, reverse
+
+from . import search, stats, tokens
+from .middleware import QueryCounter
+from .password_reset import reset_codes
+from .models import User
+from .seed import seed_users
+
+BENCH_PASSWORD = 'bench-password-123'
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """Percentile par rang le plus proche sur une liste triée."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(timings, queries, statuses, elapsed):
+    timings = sorted(timings)
+    result = {
+        'requests': len(timings),
+        'total_seconds': round(elapsed, 6),
+        'throughput_rps': round(len(timings) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(timings) / len(timings), 3) if timings else 0.0,
+            'max': round(timings[-1], 3) if timings else 0.0,
+        },
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else 0.0,
+        'statuses': {str(code): n for code, n in sorted(statuses.items())},
+    }
+    for pct in PERCENTILES:
+        result['latency_ms'][f'p{pct}'] = round(percentile(timings, pct), 3)
+    return result
+
+
+def measure(send, count, warmup=0):
+    """Appelle `send(i)` `count` fois (après `warmup` appels ignorés)."""
+    for i in range(warmup):
+        send(-1 - i)
+    timings, queries, statuses = [], [], Counter()
+    started = time.perf_counter()
+    for i in range(count):
+        counter = QueryCounter()
+        t0 = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = send(i)
+        timings.append((time.perf_counter() - t0) * 1000)
+        queries.append(counter.count)
+        statuses[response.status_code] += 1
+    return summarize(timings, queries, statuses, time.perf_counter() - started)
+
+
+# ── Données ───────────────────────────────────────────────────────
+
+@contextmanager
+def disposable_database(enabled=True):
+    """
+    Base de test jetable, créée puis détruite autour du bloc, pour que les
+    comptes factices n'atterrissent jamais dans la base configurée.
+    Sans effet si `enabled` est faux.
+    """
+    if not enabled:
+        yield
+        return
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_dataset(users, seed=0):
+    """Insère `users` comptes factices, puis leur index de recherche et les compteurs de stats."""
+    seed_users(users, seed=seed)
+    search.rebuild_index()
+    stats.rebuild()
+
+
+def prepare_data(users, seed=0):
+    """Insère `users` comptes factices (tous rôles) et les comptes du banc."""
+    if users:
+        seed_dataset(users, seed=seed)
+    admin, _ = User.objects.get_or_create(
+        username='bench_admin',
+        defaults={'email': 'bench.admin@example.com', 'role': 'super_admin'},
+    )
+    admin.set_password(BENCH_PASSWORD)
+    admin.save()
+    return admin
+
+
+# ── Scénarios ─────────────────────────────────────────────────────
+
+def scenarios(admin, requests, search_term):
+    """Liste ordonnée (nom, fonction d'envoi) ; create_user précède delete_user."""
+    client = Client()
+    client.force_login(admin)
+    anonymous = Client()
+    targets = list(
+        User.objects.exclude(pk=admin.pk).order_by('id').values_list('id', flat=True)[:requests]
+    )
+    created = []
+
+    def login(i):
+        # Le limiteur refuserait les appels répétés : on mesure la connexion elle-même.
+        with override_settings(LOGIN_THROTTLE_ENABLED=False):
+            return anonymous.post(
+                reverse('login'), {'email': admin.email, 'password': BENCH_PASSWORD},
+                content_type='application/json',
+            )
+
+    def create(i):
+        response = client.post(reverse('create_user'), {
+            'first_name': 'Bench', 'last_name': 'Create', 'email': f'bench.create{i}.{time.time_ns()}@example.com',
+            'phone': '20000000', 'role': 'etudiant', 'password': BENCH_PASSWORD,
+        }, content_type='application/json')
+        if i >= 0 and response.status_code == 201:
+            created.append(response.json()['user']['id'])
+        return response
+
+    def toggle(i):
+        user_id = targets[i % len(targets)] if targets else admin.pk
+        return client.patch(reverse('toggle_user_status', args=[user_id]))
+
+    def delete(i):
+        # Comptes créés par create_user d'abord, puis comptes factices en partant de la fin.
+        if i < len(created):
+            user_id = created[i]
+        else:
+            user_id = targets[-(i - len(created) + 1)] if targets else 0
+        return client.delete(reverse('delete_user', args=[user_id]))
+
+    return [
+        ('login', login),
+        ('me', lambda i: client.get(reverse('me'))),
+        ('list_users', lambda i: client.get(reverse('list_users'))),
+        ('list_users_search', lambda i: client.get(reverse('list_users'), {'search': search_term})),
+        ('create_user', create),
+        ('toggle_user_status', toggle),
+        ('delete_user', delete),
+    ]
+
+
+class EndpointDriver:
+    """
+    Un appel représentatif par route de `accounts.urls`, connecté en `admin`.
+
+    `call(name)` prépare hors mesure ce dont l'appel a besoin (session,
+    compte cible…) et renvoie la fonction d'envoi. Sert aux budgets de
+    requêtes des tests et à `explain_user_queries`.
+    """
+
+    def __init__(self, admin, client, password):
+        self.admin = admin
+        self.client = client
+        self.password = password
+        self.counter = 0
+
+    def target(self):
+        self.counter += 1
+        return User.objects.create_user(
+            username=f'cible{self.counter}', email=f'cible{self.counter}.{time.time_ns()}@example.com',
+            password=self.password,
+        )
+
+    def call(self, name):
+        client = self.client
+        password = self.password
+        json_post = lambda url, data: client.post(url, data, content_type='application/json')
+        if name == 'login':
+            client.logout()
+            return lambda: json_post(reverse('login'), {'email': self.admin.email, 'password': password})
+        if name.startswith('password_reset_'):
+            client.logout()
+            if name == 'password_reset_request':
+                def send():
+                    with override_settings(PASSWORD_RESET_RESEND_INTERVAL=0):  # un code (et un e-mail) à chaque appel
+                        return json_post(reverse(name), {'email': self.admin.email})
+                return send
+            with override_settings(PASSWORD_RESET_RESEND_INTERVAL=0):
+                code = reset_codes.issue(self.admin.email)
+            return lambda: json_post(reverse(name), {
+                'email': self.admin.email, 'code': code, 'new_password': password, 'confirm_password': password,
+            })
+        self.admin.refresh_from_db()  # change_password modifie le hash (et donc la session)
+        client.force_login(self.admin)
+        if name == 'change_password':
+            return lambda: json_post(reverse('change_password'), {
+                'old_password': password, 'new_password': password, 'confirm_password': password,
+            })
+        if name == 'token_refresh':
+            refresh = tokens.issue(self.admin)['refresh']
+
+            def send():
+                with override_settings(ACCOUNTS_TOKEN_AUTH=True):
+                    return json_post(reverse(name), {'refresh': refresh})
+            return send
+        if name in ('logout', 'logout_all'):
+            return lambda: client.post(reverse(name))
+        if name == 'list_users':
+            return lambda: client.get(reverse('list_users'), {'search': 'mohamed', 'role': 'etudiant'})
+        if name == 'export_users':
+            return lambda: b''.join(client.get(reverse('export_users'), {'role': 'super_admin'}).streaming_content)
+        if name == 'search_users':
+            return lambda: client.get(reverse('search_users'), {'q': 'moh ben'})
+        if name == 'user_changes':
+            return lambda: client.get(reverse('user_changes'), {'limit': 5})
+        if name == 'create_user':
+            self.counter += 1
+            return lambda: json_post(reverse('create_user'), {
+                'first_name': 'Mohamed', 'last_name': 'Benali',
+                'email': f'nouveau{self.counter}.{time.time_ns()}@example.com',
+                'phone': '20000000', 'role': 'etudiant', 'password': password,
+            })
+        if name == 'import_users':
+            self.counter += 1
+            tag = f'{self.counter}.{time.time_ns()}'
+            body = (
+                'first_name,last_name,email,phone,role,password\n'
+                f'Sami,Trabelsi,import{tag}a@example.com,20000000,etudiant,{password}\n'
+                f'Nour,Gharbi,import{tag}b@example.com,20000000,formateur,{password}\n'
+            )
+            return lambda: client.generic('POST', reverse('import_users'), body, content_type='text/csv')
+        if name in ('toggle_user_status', 'delete_user'):
+            user = self.target()
+            method = client.patch if name == 'toggle_user_status' else client.delete
+            return lambda: method(reverse(name, args=[user.id]))
+        if name in ('bulk_user_status', 'bulk_delete_users'):
+            ids = [self.target().id for _ in range(3)]
+            data = {'ids': ids, 'is_active': False}
+            if name == 'bulk_user_status':
+                return lambda: client.patch(reverse(name), data, content_type='application/json')
+            return lambda: json_post(reverse(name), data)
+        return lambda: client.get(reverse(name))
+
+
+def run_suite(admin, requests=50, warmup=3, search_term='mohamed', only=None):
+    results = {}
+    for name, send in scenarios(admin, requests, search_term):
+        if only and name not in only:
+            continue
+        # Pas d'échauffement pour delete_user : chaque appel consomme un compte créé.
+        results[name] = measure(send, requests, warmup=0 if name == 'delete_user' else warmup)
+    return results
+
+
+# ── WSGI / ASGI à concurrence égale ──────────────────────────────
+
+CONCURRENT_SCENARIOS = ('me', 'list_users')
+
+
+def async_urlconf():
+    """URLconf où me / login / logout / list_users sont les variantes async."""
+    from .urls import build_urlpatterns
+    urlconf = ModuleType('accounts.async_urlconf')
+    urlconf.urlpatterns = [path('api/', include(build_urlpatterns(async_views_enabled=True)))]
+    return urlconf
+
+
+def _wsgi_concurrent(url, cookies, requests, concurrency):
+    def worker(count):
+        client = Client()
+        client.cookies = cookies
+        results = []
+        try:
+            for _ in range(count):
+                t0 = time.perf_counter()
+                response = client.get(url)
+                results.append(((time.perf_counter() - t0) * 1000, response.status_code))
+        finally:
+            connections.close_all()
+        return results
+
+    shares = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [item for chunk in pool.map(worker, shares) for item in chunk]
+    return results, time.perf_counter() - started
+
+
+async def _asgi_concurrent(url, cookies, requests, concurrency):
+    client = AsyncClient()
+    client.cookies = cookies
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            t0 = time.perf_counter()
+            response = await client.get(url)
+            return (time.perf_counter() - t0) * 1000, response.status_code
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(requests)))
+    return results, time.perf_counter() - started
+
+
+def run_concurrency(admin, requests=200, concurrency=20):
+    """{'wsgi': {scénario: résumé}, 'asgi': {...}} pour me et list_users."""
+    client = Client()
+    client.force_login(admin)
+    cookies = client.cookies
+    report = {'wsgi': {}, 'asgi': {}}
+    for name in CONCURRENT_SCENARIOS:
+        url = reverse(name)
+        results, elapsed = _wsgi_concurrent(url, cookies, requests, concurrency)
+        report['wsgi'][name] = summarize(
+            [t for t, _ in results], [], Counter(code for _, code in results), elapsed,
+        )
+        with override_settings(ROOT_URLCONF=async_urlconf()):
+            results, elapsed = asyncio.run(_asgi_concurrent(url, cookies, requests, concurrency))
+        report['asgi'][name] = summarize(
+            [t for t, _ in results], [], Counter(code for _, code in results), elapsed,
+        )
+    return report
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'users': User.objects.count(),
+    }
@@ -0,0 +1,139 @@
+"""
+Sélection et actions en masse sur les comptes.
+
+Une sélection est soit une liste d'`ids`, soit des `filters` identiques à
+ceux de `list_users`. L'activation et la suppression parcourent la
+sélection par lots d'identifiants, chacun traité dans sa propre transaction :
+un UPDATE par lot, ou un DELETE dont les cascades — codes de
+réinitialisation, index de recherche, groupes — partent en
+`DELETE ... WHERE user_id IN (...)`. Les compteurs de `stats` sont ajustés
+en un delta agrégé par lot.
+Les comptes désactivés ou supprimés perdent leurs sessions et jetons.
+"""
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import search as user_search
+from . import notifications, stats, sync
+from .tokens import revoke_user_access
+from .signals import suspended
+from .models import User
+
+MAX_IDS = 5000
+
+
+class BulkSelectionError(ValueError):
+    pass
+
+
+def get_status_chunk_size():
+    return getattr(settings, 'BULK_STATUS_CHUNK_SIZE', 1000)
+
+
+def get_delete_chunk_size():
+    return getattr(settings, 'BULK_DELETE_CHUNK_SIZE', 500)
+
+
+def filter_users(queryset, params):
+    """Applique les filtres `search`, `role` et `is_active` de `list_users`."""
+    search = str(params.get('search', '') or '').strip()
+    role   = str(params.get('role', '') or '').strip()
+    active = params.get('is_active', '')
+    active = str(active).strip().lower() if active is not None else ''
+
+    if search:
+        queryset = user_search.filter_users(queryset, search)
+    if role:
+        queryset = queryset.filter(role=role)
+    if active in ('true', 'false'):
+        queryset = queryset.filter(is_active=(active == 'true'))
+    return queryset
+
+
+def resolve_selection(data, exclude_user=None):
+    """Construit le queryset visé par une action en masse, ou lève BulkSelectionError."""
+    ids = data.get('ids')
+    filters = data.get('filters')
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise BulkSelectionError("Le champ ids doit être une liste non vide d'identifiants.")
+        if len(ids) > MAX_IDS:
+            raise BulkSelectionError(f'Au plus {MAX_IDS} identifiants par requête ; utilisez des filtres.')
+        try:
+            ids = {int(i) for i in ids}
+        except (TypeError, ValueError):
+            raise BulkSelectionError('Identifiants invalides.')
+        queryset = User.objects.filter(id__in=ids)
+    elif isinstance(filters, dict) and any(filters.get(k) not in (None, '') for k in ('search', 'role', 'is_active')):
+        queryset = filter_users(User.objects.all(), filters)
+    else:
+        # Pas de sélection implicite de toute la table.
+        raise BulkSelectionError('Précisez des ids ou au moins un filtre (search, role, is_active).')
+
+    if exclude_user is not None:
+        queryset = queryset.exclude(id=exclude_user.id)
+    return queryset
+
+
+def bulk_set_active(queryset, is_active, chunk_size=None):
+    """
+    Active ou désactive la sélection par lots d'identifiants, un UPDATE et
+    une transaction par lot : mémoire et durée de transaction bornées même
+    si un filtre couvre toute la table. Les avis de changement de statut
+    partent après la validation de chaque lot. Renvoie le nombre de lignes
+    modifiées.
+    """
+    chunk_size = chunk_size or get_status_chunk_size()
+    queryset = queryset.exclude(is_active=is_active)
+    updated = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            # Une lecture par lot pour les compteurs par rôle et les avis.
+            selected = list(
+                queryset.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'role', 'first_name', 'username', 'email')[:chunk_size]
+            )
+            if not selected:
+                return updated
+            ids = [row[0] for row in selected]
+            if not is_active:
+                revoke_user_access(ids)
+            updated += User.objects.filter(id__in=ids).update(is_active=is_active, updated_at=timezone.now())
+            deltas = Counter()
+            for role, n in Counter(row[1] for row in selected).items():
+                deltas[(role, not is_active)] -= n
+                deltas[(role, is_active)] += n
+            stats.apply_deltas(deltas)
+            recipients = [row[2:] for row in selected]
+            transaction.on_commit(partial(notifications.send_status_notices, recipients, is_active))
+        if len(selected) < chunk_size:
+            return updated
+        last_id = ids[-1]
+
+
+def bulk_delete(queryset, chunk_size=None):
+    """Supprime la sélection par lots d'identifiants ; renvoie le nombre de comptes supprimés."""
+    chunk_size = chunk_size or get_delete_chunk_size()
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return deleted
+        with transaction.atomic(), suspended():
+            chunk = User.objects.filter(id__in=ids)
+            removed = list(chunk.only('id', 'role', 'is_active', 'created_at'))
+            _, per_model = chunk.delete()
+            stats.users_removed(removed)
+            sync.record_deletions([user.pk for user in removed])
+            revoke_user_access(ids)
+        deleted += per_model.get(User._meta.label, 0)
+        last_id = ids[-1]
@@ -0,0 +1,72 @@
+"""
+Contrôles de configuration (`manage.py check`, aussi lancés par migrate et runserver).
+
+Les sessions (`accounts.sessions`), la liste de révocation des jetons et les
+codes de réinitialisation gardent un état dans un cache. Avec un cache local
+au processus, chaque worker a sa propre copie : une déconnexion ou une
+révocation n'est vue que par le worker qui l'a traitée. Ces caches sont donc
+refusés, sauf si ACCOUNTS_SINGLE_PROCESS déclare un déploiement à un seul
+processus (runserver, tests).
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_process_local(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_LOCAL_CACHES
+
+
+def _local_cache_error(setting, alias, what, error_id):
+    return Error(
+        f"{setting} = '{alias}' désigne un cache local au processus.",
+        hint=(
+            f'{what} : seul le worker qui les écrit les verrait. Utiliser un cache partagé '
+            '(Redis : REDIS_URL), ou ACCOUNTS_SINGLE_PROCESS = True pour un seul processus.'
+        ),
+        id=error_id,
+    )
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    if getattr(settings, 'ACCOUNTS_SINGLE_PROCESS', False) or settings.SESSION_ENGINE != 'accounts.sessions':
+        return []
+    alias = settings.SESSION_CACHE_ALIAS
+    if not is_process_local(alias):
+        return []
+    return [_local_cache_error('SESSION_CACHE_ALIAS', alias, 'Déconnexions et révocations de session', 'accounts.E001')]
+
+
+@register(Tags.caches)
+def check_password_reset_store(app_configs, **kwargs):
+    if getattr(settings, 'ACCOUNTS_SINGLE_PROCESS', False):
+        return []
+    backend = getattr(settings, 'PASSWORD_RESET_BACKEND', 'accounts.password_reset.CacheBackend')
+    what = 'Codes de réinitialisation du mot de passe'
+    if backend == 'accounts.password_reset.MemoryBackend':
+        return [Error(
+            "PASSWORD_RESET_BACKEND = MemoryBackend garde les codes dans le processus.",
+            hint=f'{what} : un code émis par un worker serait refusé par les autres. Utiliser CacheBackend sur un cache partagé.',
+            id='accounts.E002',
+        )]
+    alias = getattr(settings, 'PASSWORD_RESET_CACHE_ALIAS', 'default')
+    if backend == 'accounts.password_reset.CacheBackend' and is_process_local(alias):
+        return [_local_cache_error('PASSWORD_RESET_CACHE_ALIAS', alias, what, 'accounts.E002')]
+    return []
+
+
+@register(Tags.caches)
+def check_token_cache(app_configs, **kwargs):
+    if getattr(settings, 'ACCOUNTS_SINGLE_PROCESS', False) or not getattr(settings, 'ACCOUNTS_TOKEN_AUTH', False):
+        return []
+    alias = getattr(settings, 'TOKEN_CACHE_ALIAS', 'default')
+    if not is_process_local(alias):
+        return []
+    return [_local_cache_error(
+        'TOKEN_CACHE_ALIAS', alias, 'Révocations et usage unique des jetons de rafraîchissement', 'accounts.E003',
+    )]
@@ -0,0 +1,43 @@
+"""
+Requêtes GET conditionnelles (ETag / Last-Modified).
+
+Les validateurs sont calculés avant de construire la réponse ; si le client
+a déjà la bonne version (If-None-Match / If-Modified-Since), on renvoie un
+304 sans sérialiser le corps.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    digest = hashlib.blake2b('|'.join(str(p) for p in parts).encode(), digest_size=12).hexdigest()
+    return quote_etag(digest)
+
+
+def page_validators(rows, *extra):
+    """
+    (etag, None) d'une page de liste, calculé sur les lignes servies et
+    l'état de la pagination passé dans `extra` : coût O(page), sans agrégat
+    sur l'ensemble filtré. Pas de Last-Modified : le plus récent `updated_at`
+    de la page ne change pas quand une ligne en sort (suppression), l'ETag si.
+    """
+    return make_etag(*rows, *extra), None
+
+
+def instance_validators(instance, *extra):
+    last_modified = int(instance.updated_at.timestamp())
+    return make_etag(instance.pk, instance.updated_at.isoformat(), *extra), last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """Renvoie une réponse 304/412 si le client est à jour, sinon None."""
+    return get_conditional_response(getattr(request, '_request', request), etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
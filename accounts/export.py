@@ -0,0 +1,81 @@
+"""
+Export en flux de l'annuaire (CSV ou NDJSON).
+
+Les lignes sont lues par lots `WHERE id > <dernier id> ORDER BY id LIMIT n`
+sur `values_list()` — pas d'instances de modèle — et écrites au fur et à
+mesure dans une StreamingHttpResponse. Contrairement à
+`QuerySet.iterator()`, ce découpage garde une mémoire constante aussi sur
+MySQL, dont le driver charge sinon tout le résultat côté client.
+
+En CSV, les textes commençant par `=`, `+`, `-` ou `@` sont préfixés d'une
+apostrophe pour qu'un tableur ne les évalue pas ; le NDJSON garde les
+valeurs brutes.
+"""
+import csv
+import json
+
+from django.conf import settings
+
+EXPORT_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'role', 'phone', 'is_active', 'created_at',
+)
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# Début de cellule qu'un tableur évaluerait comme une formule (injection CSV).
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def get_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def iter_values(queryset, fields=EXPORT_FIELDS, chunk_size=None):
+    """Tuples `fields` de la sélection, par lots sur la clé `id` (qui doit être le 1er champ)."""
+    chunk_size = chunk_size or get_chunk_size()
+    queryset = queryset.order_by('id').values_list(*fields)
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+class _Echo:
+    """Pseudo-fichier : `csv.writer` renvoie directement la ligne formatée."""
+
+    def write(self, value):
+        return value
+
+
+def csv_cell(value):
+    """Préfixe `'` les textes lus comme une formule : le tableur les affiche tels quels."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(rows, fields=EXPORT_FIELDS):
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(fields)  # BOM pour Excel
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row])
+
+
+def iter_ndjson(rows, fields=EXPORT_FIELDS):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), default=str, ensure_ascii=False) + '\n'
+
+
+def iter_export(queryset, export_format):
+    rows = iter_values(queryset)
+    if export_format == 'ndjson':
+        return iter_ndjson(rows)
+    return iter_csv(rows)
@@ -0,0 +1,286 @@
+"""
+Hachage des mots de passe hors du worker de requête.
+
+PBKDF2 est volontairement coûteux : exécuté dans le worker WSGI, une rafale
+de connexions bloque tous les workers sur le CPU. Les calculs passent donc
+par un pool de processus borné (PASSWORD_HASH_WORKERS), avec une file
+d'attente limitée (PASSWORD_HASH_MAX_PENDING). Quand la file est pleine, on
+échoue immédiatement avec un 503 + Retry-After plutôt que d'empiler les
+requêtes.
+
+PASSWORD_HASH_WORKERS = 0 exécute les calculs dans le processus courant
+(tests, commandes de gestion).
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingUnavailable(APIException):
+    """File de hachage saturée : DRF ajoute l'en-tête Retry-After via `wait`."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Service momentanément surchargé. Réessayez dans quelques instants.'
+    default_code = 'hashing_unavailable'
+
+    def __init__(self, wait=None):
+        super().__init__()
+        self.wait = wait if wait is not None else get_retry_after()
+
+
+def get_workers():
+    return getattr(settings, 'PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+
+
+def get_max_pending():
+    return getattr(settings, 'PASSWORD_HASH_MAX_PENDING', max(get_workers(), 1) * 4)
+
+
+def get_timeout():
+    return getattr(settings, 'PASSWORD_HASH_TIMEOUT', 10)
+
+
+def get_retry_after():
+    return getattr(settings, 'PASSWORD_HASH_RETRY_AFTER', 1)
+
+
+# ── Tâches exécutées dans le pool ─────────────────────────────────
+
+def _init_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _timed(func, *args):
+    started = time.time()
+    result = func(*args)
+    return result, started, time.time()
+
+
+def _make_password(raw_password):
+    return hashers.make_password(raw_password)
+
+
+def _check_password(raw_password, encoded):
+    """
+    Renvoie (valide, nouveau hash si le hash doit être mis à jour) : autre
+    algorithme que PASSWORD_HASHERS[0], ou mêmes paramètres périmés
+    (itérations…), comme `django.contrib.auth.hashers.check_password`.
+    """
+    if not hashers.check_password(raw_password, encoded):
+        return False, None
+    hasher = hashers.identify_hasher(encoded)
+    if hasher.algorithm != hashers.get_hasher().algorithm or hasher.must_update(encoded):
+        return True, hashers.make_password(raw_password)
+    return True, None
+
+
+# ── Métriques ─────────────────────────────────────────────────────
+
+class HashMetrics:
+    """Compteurs cumulés : latence de hachage et attente dans la file (secondes)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.hash_seconds = 0.0
+        self.hash_seconds_max = 0.0
+        self.wait_seconds = 0.0
+        self.wait_seconds_max = 0.0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, wait, duration):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.hash_seconds += duration
+            self.wait_seconds += wait
+            self.hash_seconds_max = max(self.hash_seconds_max, duration)
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def failed(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'in_flight': self.in_flight,
+                'hash_seconds_total': self.hash_seconds,
+                'hash_seconds_max': self.hash_seconds_max,
+                'queue_wait_seconds_total': self.wait_seconds,
+                'queue_wait_seconds_max': self.wait_seconds_max,
+            }
+
+
+# ── Pool ──────────────────────────────────────────────────────────
+
+class HashingPool:
+
+    def __init__(self):
+        self.metrics = HashMetrics()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=get_workers(), initializer=_init_worker)
+                self._slots = threading.BoundedSemaphore(get_max_pending())
+            return self._executor, self._slots
+
+    def run(self, func, *args):
+        if get_workers() <= 0:
+            self.metrics.started()
+            result, started, finished = _timed(func, *args)
+            self.metrics.finished(0.0, finished - started)
+            return result
+
+        executor, slots = self._get_executor()
+        if not slots.acquire(blocking=False):
+            self.metrics.reject()
+            raise PasswordHashingUnavailable()
+
+        submitted = time.time()
+        self.metrics.started()
+        try:
+            future = executor.submit(_timed, func, *args)
+            result, started, finished = future.result(timeout=get_timeout())
+        except FutureTimeoutError:
+            future.cancel()
+            self.metrics.failed()
+            self.metrics.reject()
+            raise PasswordHashingUnavailable()
+        except BaseException:
+            self.metrics.failed()
+            raise
+        finally:
+            slots.release()
+        self.metrics.finished(max(started - submitted, 0.0), finished - started)
+        return result
+
+    def run_many(self, func, args_list):
+        """
+        Exécute `func` sur chaque tuple d'arguments en parallèle ; résultats dans l'ordre.
+
+        Destiné aux traitements en masse : au plus PASSWORD_HASH_WORKERS tâches
+        occupent la file à la fois (pour laisser de la place aux connexions), et
+        on attend qu'une place se libère au lieu d'échouer aussitôt.
+        """
+        if get_workers() <= 0:
+            return [self.run(func, *args) for args in args_list]
+
+        executor, slots = self._get_executor()
+        window = max(1, min(get_workers(), get_max_pending() // 2))
+        pending = deque()
+        results = []
+
+        def collect():
+            submitted, future = pending.popleft()
+            try:
+                result, started, finished = future.result(timeout=get_timeout())
+            except FutureTimeoutError:
+                self.metrics.failed()
+                raise PasswordHashingUnavailable()
+            self.metrics.finished(max(started - submitted, 0.0), finished - started)
+            results.append(result)
+
+        try:
+            for args in args_list:
+                if len(pending) >= window:
+                    collect()
+                if not slots.acquire(timeout=get_timeout()):
+                    self.metrics.reject()
+                    raise PasswordHashingUnavailable()
+                self.metrics.started()
+                submitted = time.time()
+                future = executor.submit(_timed, func, *args)
+                future.add_done_callback(lambda _f: slots.release())
+                pending.append((submitted, future))
+            while pending:
+                collect()
+        except BaseException:
+            for _, future in pending:
+                future.cancel()
+                self.metrics.failed()
+            raise
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+
+hashing_pool = HashingPool()
+
+
+# ── API utilisée par les vues ─────────────────────────────────────
+
+def make_password(raw_password):
+    return hashing_pool.run(_make_password, raw_password)
+
+
+def make_passwords(raw_passwords):
+    """Hache une liste de mots de passe en parallèle (import en masse)."""
+    return hashing_pool.run_many(_make_password, [(raw,) for raw in raw_passwords])
+
+
+def check_password(user, raw_password):
+    """
+    Équivalent de `user.check_password` via le pool : met aussi à jour le
+    hash si l'algorithme a changé.
+    """
+    if not user.has_usable_password():
+        return False
+    valid, upgraded = hashing_pool.run(_check_password, raw_password, user.password)
+    if upgraded:
+        user.password = upgraded
+        user.save(update_fields=['password'])
+    return valid
+
+
+async def acheck_password(user, raw_password):
+    """
+    Variante async de `check_password` : l'attente du pool se fait dans un
+    thread de l'exécuteur, sans bloquer la boucle d'événements.
+    """
+    if not user.has_usable_password():
+        return False
+    loop = asyncio.get_running_loop()
+    valid, upgraded = await loop.run_in_executor(
+        None, hashing_pool.run, _check_password, raw_password, user.password,
+    )
+    if upgraded:
+        user.password = upgraded
+        await user.asave(update_fields=['password'])
+    return valid
+
+
+def set_password(user, raw_password):
+    """Équivalent de `user.set_password` (sans sauvegarde)."""
+    user.password = make_password(raw_password)
+    user._password = raw_password
@@ -0,0 +1,180 @@
+"""
+Import en masse de comptes (CSV ou NDJSON), lu en flux.
+
+Le fichier n'est jamais chargé entièrement : les lignes sont validées une à
+une (mêmes règles que `create_user`), puis traitées par lots de
+IMPORT_CHUNK_SIZE :
+
+- une requête pour les e-mails déjà pris du lot ;
+- une requête par préfixe pour attribuer des usernames libres (`usernames`) ;
+- hachage des mots de passe en parallèle dans le pool ;
+- un `bulk_create` dans une transaction.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from . import hashing, search, stats
+from .models import User
+from .usernames import allocate_usernames
+from .validation import EMAIL_TAKEN_MESSAGE, base_username, clean_user_payload
+
+CSV_CONTENT_TYPES = ('text/csv', 'application/csv')
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+MAX_REPORTED_ERRORS = 1000
+MAX_ATTEMPTS = 3
+
+
+def get_chunk_size():
+    return getattr(settings, 'IMPORT_CHUNK_SIZE', 500)
+
+
+# ── Lecture du flux ───────────────────────────────────────────────
+
+def iter_text_lines(stream):
+    """Décode un flux d'octets ligne par ligne (BOM UTF-8 toléré)."""
+    first = True
+    for raw in stream:
+        line = raw.decode('utf-8', errors='replace')
+        if first:
+            line = line.lstrip('\ufeff')
+            first = False
+        yield line
+
+
+def iter_csv_rows(lines):
+    """Renvoie (numéro de ligne, dict) ; la première ligne donne les colonnes."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_ndjson_rows(lines):
+    """Renvoie (numéro de ligne, dict) ; None pour une ligne illisible."""
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def iter_rows(stream, content_type):
+    lines = iter_text_lines(stream)
+    if content_type in NDJSON_CONTENT_TYPES:
+        return iter_ndjson_rows(lines)
+    return iter_csv_rows(lines)
+
+
+# ── Import ────────────────────────────────────────────────────────
+
+class UserImporter:
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or get_chunk_size()
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.seen_emails = set()
+
+    def add_error(self, line_no, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'ligne': line_no, 'errors': errors})
+
+    def run(self, rows):
+        chunk = []
+        for line_no, row in rows:
+            if row is None:
+                self.add_error(line_no, {'general': 'Ligne illisible.'})
+                continue
+            cleaned, errors = clean_user_payload(row)
+            if errors:
+                self.add_error(line_no, errors)
+                continue
+            if cleaned['email'] in self.seen_emails:
+                self.add_error(line_no, {'email': 'E-mail en double dans le fichier.'})
+                continue
+            self.seen_emails.add(cleaned['email'])
+            chunk.append((line_no, cleaned))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    def import_chunk(self, chunk):
+        passwords = hashing.make_passwords([cleaned['password'] for _, cleaned in chunk])
+        for _ in range(MAX_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    created, rejected = self.insert_chunk(chunk, passwords)
+            except IntegrityError:
+                # Création concurrente entre la vérification et l'insertion :
+                # on recalcule e-mails pris et usernames, puis on réessaie.
+                continue
+            self.created += created
+            for line_no, errors in rejected:
+                self.add_error(line_no, errors)
+            return
+        for line_no, _ in chunk:
+            self.add_error(line_no, {'general': "Conflit d'insertion, réessayez."})
+
+    def insert_chunk(self, chunk, passwords):
+        """Insère un lot ; renvoie (nombre créé, [(ligne, erreurs)])."""
+        taken = set(
+            User.objects.alias(email_ci=Lower('email'))
+            .filter(email_ci__in=[cleaned['email'] for _, cleaned in chunk])
+            .values_list('email', flat=True)
+        )
+        rows, rejected = [], []
+        for (line_no, cleaned), password in zip(chunk, passwords):
+            if cleaned['email'] in taken:
+                rejected.append((line_no, {'email': EMAIL_TAKEN_MESSAGE}))
+            else:
+                rows.append((cleaned, password))
+        if not rows:
+            return 0, rejected
+
+        usernames = allocate_usernames(
+            [base_username(c['first_name'], c['last_name'], c['email']) for c, _ in rows]
+        )
+        users = [
+            User(
+                username=username,
+                email=cleaned['email'],
+                password=password,
+                first_name=cleaned['first_name'],
+                last_name=cleaned['last_name'],
+                role=cleaned['role'],
+                phone=cleaned['phone'],
+                is_active=cleaned['is_active'],
+            )
+            for (cleaned, password), username in zip(rows, usernames)
+        ]
+        User.objects.bulk_create(users)
+
+        if any(user.pk is None for user in users):
+            # MySQL ne renvoie pas les clés d'un INSERT multiple.
+            ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        search.index_new_users(users)
+        stats.users_added(users)
+        return len(users), rejected
+
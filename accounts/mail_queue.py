@@ -0,0 +1,182 @@
+"""
+File d'attente des e-mails sortants, persistée dans `mail_queue`.
+
+Avec EMAIL_BACKEND = 'accounts.mail_queue.QueuedEmailBackend', `send_mail()`
+n'attend plus le serveur SMTP : les messages sont insérés en un INSERT, dans
+la transaction en cours (un rollback annule aussi l'envoi).
+
+`send_queued_mail` (worker) draine la file par lots :
+- réservation du lot : SELECT … FOR UPDATE SKIP LOCKED, puis `next_attempt_at`
+  repoussé de MAIL_QUEUE_LEASE secondes. Plusieurs workers peuvent tourner ;
+  un worker arrêté en plein lot ne perd rien, le lot redevient dû ;
+- une seule connexion au backend de livraison (MAIL_QUEUE_DELIVERY_BACKEND,
+  SMTP en production, console en développement) par lot ;
+- messages livrés supprimés en un DELETE ; en cas d'échec, nouvel essai après
+  MAIL_QUEUE_RETRY_BASE × 2^(essais - 1) secondes (plafonné à
+  MAIL_QUEUE_RETRY_MAX), abandon (`failed`) après MAIL_QUEUE_MAX_ATTEMPTS essais.
+
+`depth()` donne la profondeur de la file, exposée par /api/metrics/.
+"""
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+
+def get_delivery_backend():
+    return getattr(settings, 'MAIL_QUEUE_DELIVERY_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+
+
+def get_batch_size():
+    return getattr(settings, 'MAIL_QUEUE_BATCH_SIZE', 100)
+
+
+def get_lease():
+    return getattr(settings, 'MAIL_QUEUE_LEASE', 300)
+
+
+def get_max_attempts():
+    return getattr(settings, 'MAIL_QUEUE_MAX_ATTEMPTS', 8)
+
+
+def retry_delay(attempts):
+    """Délai avant l'essai suivant, après `attempts` échecs (backoff exponentiel)."""
+    base = getattr(settings, 'MAIL_QUEUE_RETRY_BASE', 30)
+    ceiling = getattr(settings, 'MAIL_QUEUE_RETRY_MAX', 3600)
+    return min(base * 2 ** (attempts - 1), ceiling)
+
+
+# ── Sérialisation ─────────────────────────────────────────────────
+
+def to_payload(message):
+    """Dict JSON d'un EmailMessage (pièces jointes en tuples uniquement)."""
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise TypeError('Pièce jointe MIME non prise en charge par la file d\'envoi.')
+        filename, content, mimetype = attachment
+        if isinstance(content, bytes):
+            attachments.append([filename, base64.b64encode(content).decode(), mimetype, True])
+        else:
+            attachments.append([filename, content, mimetype, False])
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': dict(message.extra_headers),
+        'alternatives': [list(alt) for alt in getattr(message, 'alternatives', [])],
+        'attachments': attachments,
+    }
+
+
+def from_payload(payload):
+    attachments = [
+        (filename, base64.b64decode(content) if binary else content, mimetype)
+        for filename, content, mimetype, binary in payload['attachments']
+    ]
+    return EmailMultiAlternatives(
+        subject=payload['subject'], body=payload['body'], from_email=payload['from_email'],
+        to=payload['to'], cc=payload['cc'], bcc=payload['bcc'], reply_to=payload['reply_to'],
+        headers=payload['headers'], attachments=attachments,
+        alternatives=[tuple(alt) for alt in payload['alternatives']],
+    )
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Backend d'envoi Django qui met les messages en file (un INSERT par appel)."""
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        rows = [
+            QueuedEmail(message=to_payload(message), next_attempt_at=now)
+            for message in email_messages if message.recipients()
+        ]
+        QueuedEmail.objects.bulk_create(rows)
+        return len(rows)
+
+
+# ── Worker ────────────────────────────────────────────────────────
+
+def _claim(batch_size):
+    """Réserve jusqu'à `batch_size` messages dus (en repoussant leur échéance)."""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            QueuedEmail.objects
+            .select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .filter(failed=False, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            QueuedEmail.objects.filter(id__in=[item.id for item in batch]).update(
+                next_attempt_at=now + timedelta(seconds=get_lease())
+            )
+    return batch
+
+
+def _record_failures(failures):
+    now = timezone.now()
+    for item, error in failures:
+        item.attempts += 1
+        item.last_error = f'{type(error).__name__}: {error}'[:2000]
+        item.failed = item.attempts >= get_max_attempts()
+        item.next_attempt_at = now + timedelta(seconds=retry_delay(item.attempts))
+    QueuedEmail.objects.bulk_update(
+        [item for item, _ in failures], ['attempts', 'last_error', 'failed', 'next_attempt_at']
+    )
+
+
+def send_batch(batch_size=None):
+    """Livre un lot de messages dus ; renvoie (livrés, en échec)."""
+    batch = _claim(batch_size or get_batch_size())
+    if not batch:
+        return 0, 0
+    sent, failures = [], []
+    mailer = get_connection(get_delivery_backend(), fail_silently=False)
+    try:
+        mailer.open()
+    except Exception as exc:
+        failures = [(item, exc) for item in batch]
+    else:
+        try:
+            for item in batch:
+                try:
+                    mailer.send_messages([from_payload(item.message)])
+                except Exception as exc:
+                    failures.append((item, exc))
+                else:
+                    sent.append(item.id)
+        finally:
+            mailer.close()
+    if sent:
+        QueuedEmail.objects.filter(id__in=sent).delete()
+    if failures:
+        _record_failures(failures)
+    return len(sent), len(failures)
+
+
+def depth():
+    """{'pending', 'due', 'failed'} en une requête."""
+    return QueuedEmail.objects.aggregate(
+        pending=Count('id', filter=Q(failed=False)),
+        due=Count('id', filter=Q(failed=False, next_attempt_at__lte=timezone.now())),
+        failed=Count('id', filter=Q(failed=True)),
+    )
+
+
+def retry_failed():
+    """Remet en file les messages abandonnés ; renvoie leur nombre."""
+    return QueuedEmail.objects.filter(failed=True).update(
+        failed=False, attempts=0, next_attempt_at=timezone.now()
+    )
@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from accounts import benchmarks
+
+SCENARIOS = (
+    'login', 'me', 'list_users', 'list_users_search',
+    'create_user', 'toggle_user_status', 'delete_user',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure débit et latence des vues de comptes (client de test, en processus) "
+        "et écrit le résultat en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000,
+                            help='Nombre de comptes factices à insérer (tous rôles).')
+        parser.add_argument('--requests', type=int, default=50, help='Requêtes par scénario.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--search', default='mohamed', help='Terme utilisé par list_users_search.')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, dest='only')
+        parser.add_argument('--seed', type=int, default=0, help='Graine du générateur de données.')
+        parser.add_argument('--concurrency', type=int, default=0,
+                            help='Compare aussi WSGI et ASGI (me, list_users) avec N requêtes simultanées.')
+        parser.add_argument('--output', help='Fichier JSON de sortie (sortie standard par défaut).')
+        parser.add_argument('--current-db', action='store_true',
+                            help='Utilise la base configurée au lieu d’une base de test jetable.')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with benchmarks.disposable_database(enabled=not options['current_db']):
+                result = self.run(options)
+        finally:
+            teardown_test_environment()
+
+        payload = json.dumps(result, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(payload + '\n')
+            self.stderr.write(f"Résultats écrits dans {options['output']}")
+        else:
+            self.stdout.write(payload)
+
+    def run(self, options):
+        admin = benchmarks.prepare_data(options['users'], seed=options['seed'])
+        result = {
+            'environment': benchmarks.environment(),
+            'parameters': {
+                'users': options['users'], 'requests': options['requests'],
+                'warmup': options['warmup'], 'search': options['search'], 'seed': options['seed'],
+            },
+            'scenarios': benchmarks.run_suite(
+                admin, requests=options['requests'], warmup=options['warmup'],
+                search_term=options['search'], only=options['only'],
+            ),
+        }
+        if options['concurrency']:
+            result['parameters']['concurrency'] = options['concurrency']
+            result['concurrency'] = benchmarks.run_concurrency(
+                admin, requests=max(options['requests'], options['concurrency']),
+                concurrency=options['concurrency'],
+            )
+        return result
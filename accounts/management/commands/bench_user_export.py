@@ -0,0 +1,62 @@
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from accounts import benchmarks
+from accounts.export import EXPORT_FIELDS, iter_export
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = "Mesure le pic mémoire de l'export en flux (et, en option, de l'ancienne liste complète)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Mesure sur N comptes factices, dans une base de test jetable '
+                                 '(ex. 1000000). Sans cette option : la base configurée, en lecture seule.')
+        parser.add_argument('--output', choices=('csv', 'ndjson'), default='csv')
+        parser.add_argument('--compare-legacy', action='store_true',
+                            help='Mesure aussi la construction de la liste complète (comme list_users avant pagination).')
+
+    def handle(self, *args, **options):
+        with benchmarks.disposable_database(enabled=bool(options['seed'])):
+            if options['seed']:
+                self.stdout.write(f"Insertion de {options['seed']} comptes (base jetable)…")
+                benchmarks.seed_dataset(options['seed'])
+            self.run(options)
+
+    def run(self, options):
+        total = User.objects.count()
+        self.stdout.write(f'{total} comptes dans la table users.')
+
+        self.report('flux', lambda: self.stream(options['output']))
+        if options['compare_legacy']:
+            self.report('liste complète', self.legacy)
+
+    def stream(self, export_format):
+        size = 0
+        for chunk in iter_export(User.objects.all(), export_format):
+            size += len(chunk)
+        return size
+
+    def legacy(self):
+        rows = [
+            {field: getattr(user, field) for field in EXPORT_FIELDS}
+            for user in User.objects.all().order_by('id')
+        ]
+        return len(rows)
+
+    def report(self, label, func):
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(
+            f'{label:<15} {elapsed:8.2f} s   pic Python {peak / 2**20:8.1f} Mio   '
+            f'RSS max du processus {rss:8.1f} Mio   ({result})'
+        )
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import benchmarks
+from accounts.models import User
+from accounts.rows import select_rows, user_row
+
+
+class Command(BaseCommand):
+    help = "Compare la projection values_list + user_row à l'instanciation de modèles User (lignes/s)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Mesure sur N comptes factices, dans une base de test jetable '
+                                 '(ex. 100000). Sans cette option : la base configurée, en lecture seule.')
+        parser.add_argument('--rows', type=int, default=10000, help='Lignes lues par mesure.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmarks.disposable_database(enabled=bool(options['seed'])):
+            if options['seed']:
+                self.stdout.write(f"Insertion de {options['seed']} comptes (base jetable)…")
+                benchmarks.seed_dataset(options['seed'])
+            self.run(options)
+
+    def run(self, options):
+        limit = options['rows']
+        self.stdout.write(f'{User.objects.count()} comptes, {limit} lignes par mesure.\n')
+
+        legacy = self.measure(lambda: [self.legacy_row(u) for u in User.objects.order_by('id')[:limit]],
+                              options['repeat'])
+        projected = self.measure(lambda: [user_row(r) for r in select_rows(User.objects.order_by('id'))[:limit]],
+                                 options['repeat'])
+
+        self.stdout.write(f"{'chemin':<22} {'médiane (ms)':>13} {'lignes/s':>12}")
+        for label, (elapsed, count) in (('instances User', legacy), ('values_list + user_row', projected)):
+            self.stdout.write(f'{label:<22} {elapsed * 1000:>13.1f} {count / elapsed:>12.0f}')
+        self.stdout.write(f'Gain : x{legacy[0] / projected[0]:.2f}')
+
+    def legacy_row(self, user):
+        """Mise en forme d'avant (une instance complète par ligne)."""
+        full_name = f"{user.first_name} {user.last_name}".strip() or user.username
+        initiales = (
+            (user.first_name[0] + user.last_name[0]).upper()
+            if user.first_name and user.last_name
+            else user.username[:2].upper()
+        )
+        return {
+            'id':        user.id,
+            'code':      f'#USR-{str(user.id).zfill(3)}',
+            'nom':       full_name,
+            'initiales': initiales,
+            'email':     user.email,
+            'role':      user.role,
+            'is_active': user.is_active,
+        }
+
+    def measure(self, func, repeat):
+        """(durée médiane en secondes, nombre de lignes)."""
+        timings, count = [], 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = len(func())
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2], count
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from accounts import benchmarks, search
+from accounts.models import User
+
+DEFAULT_QUERIES = ('mohamed', 'benali', 'moh ben', 'yasmine trabelsi', 'gmail', 'zzz')
+
+
+class Command(BaseCommand):
+    help = "Compare la recherche indexée à l'ancienne chaîne de Q(...__icontains)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Mesure sur N comptes factices, dans une base de test jetable '
+                                 '(ex. 500000). Sans cette option : la base configurée, en lecture seule.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--query', action='append', dest='queries')
+
+    def handle(self, *args, **options):
+        with benchmarks.disposable_database(enabled=bool(options['seed'])):
+            if options['seed']:
+                self.stdout.write(f"Insertion de {options['seed']} comptes (base jetable)…")
+                benchmarks.seed_dataset(options['seed'])
+            self.run(options)
+
+    def run(self, options):
+        total = User.objects.count()
+        limit = options['limit']
+        self.stdout.write(f'{total} comptes dans la table users.\n')
+        self.stdout.write(f"{'requête':<20} {'icontains (ms)':>15} {'index (ms)':>12} {'classé (ms)':>12}")
+
+        for query in options['queries'] or DEFAULT_QUERIES:
+            legacy = self.measure(lambda: list(self.legacy_queryset(query)[:limit]), options['repeat'])
+            indexed = self.measure(
+                lambda: list(search.filter_users(User.objects.order_by('id'), query)[:limit]),
+                options['repeat'],
+            )
+            ranked = self.measure(lambda: search.ranked_search(query, limit=limit), options['repeat'])
+            self.stdout.write(f'{query:<20} {legacy:>15.2f} {indexed:>12.2f} {ranked:>12.2f}')
+
+    def legacy_queryset(self, query):
+        return User.objects.filter(
+            Q(first_name__icontains=query) | Q(last_name__icontains=query) |
+            Q(email__icontains=query)      | Q(username__icontains=query)
+        ).order_by('id')
+
+    def measure(self, func, repeat):
+        """Médiane en millisecondes."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return timings[len(timings) // 2]
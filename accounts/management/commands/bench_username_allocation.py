@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from accounts.models import User
+from accounts.usernames import allocate_username
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare l'attribution de username par requête préfixe à l'ancienne boucle exists()."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', default='mohamedbenali')
+        parser.add_argument('--collisions', type=int, nargs='+', default=[0, 10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        base = options['base']
+        self.stdout.write(f"{'collisions':>10} {'boucle (ms)':>12} {'requêtes':>9} {'préfixe (ms)':>13} {'requêtes':>9}")
+        for collisions in options['collisions']:
+            # Les comptes de test sont insérés puis annulés avec la transaction.
+            try:
+                with transaction.atomic():
+                    self.seed(base, collisions)
+                    legacy = self.measure(lambda: self.legacy_loop(base), options['repeat'])
+                    prefix = self.measure(lambda: self.prefix_query(base), options['repeat'])
+                    self.stdout.write(
+                        f'{collisions:>10} {legacy[0]:>12.2f} {legacy[1]:>9} {prefix[0]:>13.2f} {prefix[1]:>9}'
+                    )
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def seed(self, base, count):
+        if User.objects.filter(Q(username=base) | Q(username__startswith=base)).exists():
+            self.stderr.write(f'Des usernames commencent déjà par « {base} » ; résultats faussés.')
+        names = [base] + [f'{base}{i}' for i in range(1, count)] if count else []
+        User.objects.bulk_create(
+            [User(username=name, email=f'{name}@bench.local', password='!') for name in names],
+            batch_size=1000,
+        )
+
+    def legacy_loop(self, base):
+        """L'ancienne boucle de `create_user` ; renvoie le nombre de requêtes."""
+        username, counter, queries = base, 1, 1
+        while User.objects.filter(username=username).exists():
+            username = f'{base}{counter}'
+            counter += 1
+            queries += 1
+        return queries
+
+    def prefix_query(self, base):
+        allocate_username(base)
+        return 1
+
+    def measure(self, func, repeat):
+        """(médiane en ms, nombre de requêtes)."""
+        timings, queries = [], 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queries = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return timings[len(timings) // 2], queries
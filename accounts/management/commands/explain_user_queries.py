@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from accounts import benchmarks, query_plans
+from accounts.urls import urlpatterns
+
+# Tables bornées par construction, lues en entier volontairement.
+BOUNDED_TABLES = ('user_stat_counters',)
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute un appel représentatif de chaque vue de comptes, passe ses "
+        "requêtes SQL à EXPLAIN et signale les parcours complets de table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5000,
+                            help='Nombre de comptes factices à insérer avant EXPLAIN.')
+        parser.add_argument('--seed', type=int, default=0, help='Graine du générateur de données.')
+        parser.add_argument('--endpoint', action='append', dest='only',
+                            choices=sorted(p.name for p in urlpatterns))
+        parser.add_argument('--allow-table', action='append', default=list(BOUNDED_TABLES),
+                            help='Table dont le parcours complet est accepté (option répétable).')
+        parser.add_argument('--strict', action='store_true',
+                            help='Termine en erreur si un parcours complet est trouvé.')
+        parser.add_argument('--current-db', action='store_true',
+                            help='Utilise la base configurée au lieu d’une base de test jetable.')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = None
+        if not options['current_db']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            admin = benchmarks.prepare_data(options['users'], seed=options['seed'])
+            # Statistiques des seules tables remplies en masse par le jeu de données.
+            query_plans.analyze(['users', 'user_search_tokens'])
+            with override_settings(LOGIN_THROTTLE_ENABLED=False):
+                report = self.explain_endpoints(admin, options['only'])
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        allowed = set(options['allow_table'])
+        full_scans = 0
+        for name, statements in report.items():
+            scans = [
+                (sql, step) for sql, steps in statements for step in steps
+                if step.access == query_plans.FULL_SCAN and step.table not in allowed
+            ]
+            full_scans += len(scans)
+            status = self.style.ERROR('PARCOURS COMPLET') if scans else self.style.SUCCESS('ok')
+            self.stdout.write(f'{name:<20} {len(statements):>2} requête(s)  {status}')
+            for sql, step in scans:
+                self.stdout.write(f'    {step.table} : {step.detail}\n      {sql}')
+            if options['verbosity'] >= 2:
+                for sql, steps in statements:
+                    self.stdout.write(f'    {sql}')
+                    for step in steps:
+                        self.stdout.write(f'      {step.access:<10} {step.table} : {step.detail}')
+
+        if full_scans and options['strict']:
+            raise CommandError(f'{full_scans} parcours complet(s) de table.')
+
+    def explain_endpoints(self, admin, only=None):
+        """{vue: [(sql, [PlanStep])]}, requêtes distinctes dans l'ordre d'émission."""
+        driver = benchmarks.EndpointDriver(admin, Client(), benchmarks.BENCH_PASSWORD)
+        report = {}
+        for pattern in urlpatterns:
+            if only and pattern.name not in only:
+                continue
+            driver.call(pattern.name)()  # premier appel : compteurs et caches créés à la demande
+            send = driver.call(pattern.name)
+            with CaptureQueriesContext(connection) as captured:
+                send()
+            statements = dict.fromkeys(
+                q['sql'] for q in captured if query_plans.is_explainable(q['sql'])
+            )
+            report[pattern.name] = [(sql, query_plans.explain(sql)) for sql in statements]
+        return report
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import PasswordResetCode
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime par lots les anciennes lignes de password_reset_codes "
+        "(les codes sont désormais gardés dans un store à durée de vie)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Lignes supprimées par transaction.')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        deleted = 0
+        last_id = 0
+        while True:
+            ids = list(
+                PasswordResetCode.objects.filter(id__gt=last_id)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                deleted += PasswordResetCode.objects.filter(id__in=ids).delete()[0]
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f'{deleted} code(s) de réinitialisation supprimé(s).'))
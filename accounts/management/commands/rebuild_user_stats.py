@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts import stats
+from accounts.models import UserSignupCounter, UserStatCounter
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs de statistiques des comptes depuis la table users.'
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{UserStatCounter.objects.count()} compteurs (rôle, statut) et '
+            f'{UserSignupCounter.objects.count()} jours d’inscriptions recalculés.'
+        ))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import mail_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Livre les e-mails de la file d'envoi (table mail_queue), par lots "
+        "d'une connexion chacun. Sans --loop, s'arrête quand plus rien n'est dû."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Messages par lot (MAIL_QUEUE_BATCH_SIZE par défaut).')
+        parser.add_argument('--loop', action='store_true',
+                            help='Tourne en continu (worker).')
+        parser.add_argument('--interval', type=float, default=5,
+                            help="Secondes d'attente quand la file est vide (avec --loop).")
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Remet d\'abord en file les messages abandonnés.')
+        parser.add_argument('--status', action='store_true',
+                            help='Affiche la profondeur de la file sans rien envoyer.')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.write_depth()
+            return
+        if options['retry_failed']:
+            self.stdout.write(f'{mail_queue.retry_failed()} message(s) remis en file.')
+        batch_size = max(options['batch_size'] or mail_queue.get_batch_size(), 1)
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = mail_queue.send_batch(batch_size)
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Lot : {sent} envoyé(s), {failed} en échec.')
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'{total_sent} e-mail(s) envoyé(s), {total_failed} échec(s).'))
+        self.write_depth()
+
+    def write_depth(self):
+        queue = mail_queue.depth()
+        self.stdout.write(
+            f"File : {queue['pending']} en attente ({queue['due']} dû(s)), {queue['failed']} abandonné(s)."
+        )
@@ -0,0 +1,134 @@
+"""
+Métriques de requêtes agrégées en mémoire (par processus) et rendues au
+format texte Prometheus.
+
+Pour chaque vue (nom d'URL) : durée, nombre de requêtes SQL, temps passé en
+base et taille de la réponse, sous forme d'histogrammes à seaux fixes.
+L'enregistrement coûte quelques additions sous un verrou ; p50/p95/p99 ne
+sont estimés qu'au moment du rendu.
+"""
+import bisect
+import threading
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernier seau : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimation par interpolation linéaire dans le seau concerné."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            if cumulative + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return float(lower)
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / n
+            cumulative += n
+        return float(self.buckets[-1])
+
+
+class ViewStats:
+
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_duration = Histogram(DURATION_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.statuses = {}
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, status, duration, queries, db_duration, size):
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = ViewStats()
+            stats.duration.observe(duration)
+            stats.queries.observe(queries)
+            stats.db_duration.observe(db_duration)
+            if size is not None:
+                stats.size.observe(size)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def render(self, extra_gauges=None):
+        """Texte au format d'exposition Prometheus 0.0.4."""
+        lines = []
+        with self._lock:
+            views = sorted(self._views.items())
+
+            lines += _header('accounts_requests_total', 'counter', 'Requêtes traitées par vue et code HTTP.')
+            for view, stats in views:
+                for code, n in sorted(stats.statuses.items()):
+                    lines.append(f'accounts_requests_total{{view="{view}",status="{code}"}} {n}')
+
+            for name, attr, help_text in (
+                ('accounts_request_duration_seconds', 'duration', 'Durée de traitement de la requête.'),
+                ('accounts_request_db_queries', 'queries', 'Nombre de requêtes SQL par requête HTTP.'),
+                ('accounts_request_db_duration_seconds', 'db_duration', 'Temps passé en base par requête HTTP.'),
+                ('accounts_response_size_bytes', 'size', 'Taille du corps de la réponse (hors flux).'),
+            ):
+                lines += _header(name, 'histogram', help_text)
+                for view, stats in views:
+                    lines += _histogram(name, view, getattr(stats, attr))
+
+            name = 'accounts_request_duration_quantile_seconds'
+            lines += _header(name, 'gauge', 'p50/p95/p99 estimés à partir des seaux de durée.')
+            for view, stats in views:
+                for q in QUANTILES:
+                    lines.append(f'{name}{{view="{view}",quantile="{q}"}} {stats.duration.quantile(q):.6f}')
+
+        for name, help_text, value in extra_gauges or ():
+            lines += _header(name, 'gauge', help_text)
+            if isinstance(value, dict):
+                # {'alias="default"': valeur, ...} : une ligne par jeu d'étiquettes.
+                lines += [f'{name}{{{labels}}} {v}' for labels, v in value.items()]
+            else:
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _header(name, kind, help_text):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+
+
+def _histogram(name, view, histogram):
+    lines = []
+    cumulative = 0
+    for bound, n in zip(histogram.buckets, histogram.counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{view="{view}"}} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{{view="{view}"}} {histogram.count}')
+    return lines
+
+
+registry = Registry()
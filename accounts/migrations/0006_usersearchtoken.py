@@ -0,0 +1,37 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    from accounts.search import rebuild_index
+
+    rebuild_index(
+        token_model=apps.get_model('accounts', 'UserSearchToken'),
+        user_model=apps.get_model('accounts', 'User'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'user_search_tokens',
+                'indexes': [models.Index(fields=['token', 'user'], name='user_search_token_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'token'), name='uniq_user_search_token')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+import accounts.models
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+
+def normalize_emails(apps, schema_editor):
+    """
+    Adresses en minuscules, sans espaces. Les adresses vides reçoivent une
+    adresse réservée propre au compte (`compte-<id>@email.invalid`, à corriger
+    ensuite). Les doublons restants (variantes de casse) ne sont pas fusionnés
+    automatiquement : la migration s'arrête en les listant.
+    """
+    User = apps.get_model('accounts', 'User')
+    User.objects.update(email=Lower(Trim('email')))
+    for pk in User.objects.filter(email='').values_list('pk', flat=True):
+        User.objects.filter(pk=pk).update(email=f'compte-{pk}@email.invalid')
+    duplicates = list(
+        User.objects.values('email').annotate(n=Count('id')).filter(n__gt=1).values_list('email', flat=True)[:50]
+    )
+    if duplicates:
+        lines = [
+            f"  {email} : comptes {', '.join(map(str, User.objects.filter(email=email).order_by('id').values_list('id', flat=True)))}"
+            for email in duplicates
+        ]
+        raise RuntimeError(
+            "Adresses e-mail en double (insensible à la casse) : fusionner ou corriger "
+            "ces comptes, puis relancer migrate.\n" + '\n'.join(lines)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_usersearchtoken'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', accounts.models.UserManager()),
+            ],
+        ),
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(Lower('email'), name='users_email_ci_unique'),
+        ),
+    ]
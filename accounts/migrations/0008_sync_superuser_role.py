@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def sync_superuser_role(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    User.objects.filter(is_superuser=True).exclude(role='super_admin').update(role='super_admin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_email_ci_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_superuser_role, migrations.RunPython.noop),
+    ]
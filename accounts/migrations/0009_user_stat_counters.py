@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def build_counters(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    UserStatCounter = apps.get_model('accounts', 'UserStatCounter')
+    UserSignupCounter = apps.get_model('accounts', 'UserSignupCounter')
+
+    UserStatCounter.objects.bulk_create([
+        UserStatCounter(role=row['role'], is_active=row['is_active'], count=row['n'])
+        for row in User.objects.order_by().values('role', 'is_active').annotate(n=Count('id'))
+    ])
+    UserSignupCounter.objects.bulk_create([
+        UserSignupCounter(day=row['day'], count=row['n'])
+        for row in (
+            User.objects.order_by()
+            .annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+            .values('day').annotate(n=Count('id'))
+        )
+        if row['day'] is not None
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_sync_superuser_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(max_length=20)),
+                ('is_active', models.BooleanField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'user_stat_counters',
+                'constraints': [models.UniqueConstraint(fields=('role', 'is_active'), name='uniq_user_stat_counter')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserSignupCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'user_signup_counters',
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core import signing
+from django.db import migrations, models
+from django.utils.module_loading import import_string
+
+# Figés ici plutôt qu'importés de accounts.sessions : la migration doit
+# rejouer le même décodage quel que soit le code à venir.
+SESSION_SALT = 'django.contrib.sessions.SessionStore'
+SESSION_KEY = '_auth_user_id'
+
+
+def session_user_id(session_data, serializer):
+    """Id du compte d'une session signée par django.contrib.sessions, ou None."""
+    try:
+        data = signing.loads(session_data, salt=SESSION_SALT, serializer=serializer)
+        return int(data[SESSION_KEY])
+    except Exception:
+        # Signature invalide, données corrompues ou session anonyme.
+        return None
+
+
+def copy_sessions(apps, schema_editor):
+    """Reprend les sessions de django_session (en décodant chaque ligne une seule fois)."""
+    Session = apps.get_model('sessions', 'Session')
+    UserSession = apps.get_model('accounts', 'UserSession')
+    serializer = import_string(settings.SESSION_SERIALIZER)
+    batch = []
+    for session in Session.objects.iterator(chunk_size=2000):
+        batch.append(UserSession(
+            session_key=session.session_key,
+            session_data=session.session_data,
+            expire_date=session.expire_date,
+            user_id=session_user_id(session.session_data, serializer),
+        ))
+        if len(batch) >= 2000:
+            UserSession.objects.bulk_create(batch)
+            batch = []
+    UserSession.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_user_filter_indexes'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSession',
+            fields=[
+                ('session_key', models.CharField(max_length=40, primary_key=True, serialize=False, verbose_name='session key')),
+                ('session_data', models.TextField(verbose_name='session data')),
+                ('expire_date', models.DateTimeField(db_index=True, verbose_name='expire date')),
+                ('user_id', models.BigIntegerField(null=True)),
+            ],
+            options={
+                'db_table': 'user_sessions',
+                'indexes': [models.Index(fields=['user_id'], name='user_session_user_idx')],
+            },
+        ),
+        migrations.RunPython(copy_sessions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+def fill_blank_emails(apps, schema_editor):
+    """Adresse vide restante : adresse réservée propre au compte (voir 0007)."""
+    User = apps.get_model('accounts', 'User')
+    for pk in User.objects.filter(email='').values_list('pk', flat=True):
+        User.objects.filter(pk=pk).update(email=f'compte-{pk}@email.invalid')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_mail_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_blank_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(max_length=254, verbose_name='email address'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def rebuild_search_index(apps, schema_editor):
+    # Les mots ne sont plus réduits à l'ASCII : les noms en arabe, entre autres, étaient absents de l'index.
+    from accounts.search import rebuild_index
+
+    rebuild_index(
+        token_model=apps.get_model('accounts', 'UserSearchToken'),
+        user_model=apps.get_model('accounts', 'User'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_user_email_required'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Les ETag de list_users sont calculés sur la page servie : plus aucune
+    # requête MAX(updated_at) par rôle / statut ne lit cet index.
+
+    dependencies = [
+        ('accounts', '0016_rebuild_search_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='users_role_active_upd_idx',
+        ),
+    ]
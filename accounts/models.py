@@ -1,5 +1,33 @@
-from django.contrib.auth.models import AbstractUser
+import random
+import string
+from datetime import timedelta
+
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
+from django.contrib.sessions.base_session import AbstractBaseSession
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+
+def normalize_email_address(email):
+    """Forme canonique d'un e-mail : sans espaces, en minuscules."""
+    return (email or '').strip().lower()
+
+
+class UserManager(DjangoUserManager):
+
+    def by_email(self, email):
+        """Filtre sur LOWER(email), couvert par l'index unique `users_email_ci_unique`."""
+        return self.alias(email_ci=Lower('email')).filter(email_ci=normalize_email_address(email))
+
+    def get_by_email(self, email):
+        return self.by_email(email).get()
+
+    def _create_user_object(self, username, email, password, **extra_fields):
+        # Index unique sur LOWER(email) : une adresse vide bloquerait le compte suivant.
+        if not normalize_email_address(email):
+            raise ValueError("L'adresse e-mail est obligatoire.")
+        return super()._create_user_object(username, email, password, **extra_fields)
 
 
 
@@ -13,6 +41,7 @@ class User(AbstractUser):
         ('etudiant', 'Étudiant'),
     )
     
+    email = models.EmailField('email address')  # obligatoire (unique, insensible à la casse)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='etudiant')
     phone = models.CharField(max_length=20, blank=True)
     email_verified = models.BooleanField(default=False)
@@ -35,16 +64,37 @@ class User(AbstractUser):
         help_text='Specific permissions for this user.'
     )
     
+    objects = UserManager()
+
     def __str__(self):
         return f"{self.username} - {self.get_role_display()}"
+
+    def save(self, *args, **kwargs):
+        self.email = normalize_email_address(self.email)
+        super().save(*args, **kwargs)
     
     class Meta:
         db_table = 'users'
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='users_email_ci_unique'),
+        ]
+        indexes = [
+            # Flux de synchronisation (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='users_updated_id_idx'),
+            # Filtres de list_users / export_users, triés par id (pagination par curseur)
+            models.Index(fields=['role', 'is_active', 'id'], name='users_role_active_id_idx'),
+            models.Index(fields=['role', 'id'], name='users_role_id_idx'),
+            models.Index(fields=['is_active', 'id'], name='users_active_id_idx'),
+        ]
 
 
 
 class PasswordResetCode(models.Model):
-    """Modèle pour stocker les codes de réinitialisation de mot de passe"""
+    """
+    Ancien stockage des codes de réinitialisation. Les codes vivent désormais
+    dans le store à durée de vie de `password_reset` ; les lignes restantes
+    sont supprimées par `purge_password_reset_codes`.
+    """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='password_reset_codes')
     code = models.CharField(max_length=6)
     email = models.EmailField()
@@ -65,4 +115,103 @@ class PasswordResetCode(models.Model):
         return f"Code pour {self.email} - {self.code}"
     
     class Meta:
-        db_table = 'password_reset_codes'
\ No newline at end of file
+        db_table = 'password_reset_codes'
+
+
+class UserSearchToken(models.Model):
+    """Index de recherche : un mot normalisé (nom, e-mail, username) par ligne"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.token} → {self.user_id}"
+
+    class Meta:
+        db_table = 'user_search_tokens'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'token'], name='uniq_user_search_token'),
+        ]
+        indexes = [
+            models.Index(fields=['token', 'user'], name='user_search_token_idx'),
+        ]
+
+
+
+class UserStatCounter(models.Model):
+    """Nombre de comptes par (rôle, statut), tenu à jour par les signaux de User"""
+    role = models.CharField(max_length=20)
+    is_active = models.BooleanField()
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.role} / {'actif' if self.is_active else 'inactif'} : {self.count}"
+
+    class Meta:
+        db_table = 'user_stat_counters'
+        constraints = [
+            models.UniqueConstraint(fields=['role', 'is_active'], name='uniq_user_stat_counter'),
+        ]
+
+
+class UserSignupCounter(models.Model):
+    """Nombre de comptes existants créés chaque jour (fuseau TIME_ZONE)"""
+    day = models.DateField(unique=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} : {self.count}"
+
+    class Meta:
+        db_table = 'user_signup_counters'
+
+
+
+class UserTombstone(models.Model):
+    """Trace d'un compte supprimé, pour le flux de synchronisation incrémentale"""
+    user_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Utilisateur {self.user_id} supprimé le {self.deleted_at}"
+
+    class Meta:
+        db_table = 'user_tombstones'
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='user_tombstone_deleted_idx'),
+        ]
+
+
+class UserSession(AbstractBaseSession):
+    """Session (moteur accounts.sessions) avec le compte connecté, pour la révocation"""
+    user_id = models.BigIntegerField(null=True)
+
+    @classmethod
+    def get_session_store_class(cls):
+        from .sessions import SessionStore
+        return SessionStore
+
+    class Meta:
+        db_table = 'user_sessions'
+        indexes = [
+            models.Index(fields=['user_id'], name='user_session_user_idx'),
+        ]
+
+
+class QueuedEmail(models.Model):
+    """E-mail sortant en attente de livraison (file drainée par send_queued_mail)"""
+    message = models.JSONField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True, default='')
+    failed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.message.get('subject', '')} → {', '.join(self.message.get('to', []))}"
+
+    class Meta:
+        db_table = 'mail_queue'
+        indexes = [
+            models.Index(fields=['failed', 'next_attempt_at', 'id'], name='mail_queue_due_idx'),
+        ]
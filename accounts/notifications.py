@@ -0,0 +1,55 @@
+"""
+E-mails transactionnels des comptes.
+
+Ils passent par EMAIL_BACKEND : en production la file d'envoi
+(`accounts.mail_queue`), donc un INSERT au lieu d'un aller-retour SMTP
+pendant la requête.
+"""
+from django.core.mail import EmailMessage, get_connection, send_mail
+
+
+def _greeting(first_name, username):
+    return f'Bonjour {first_name or username},\n\n'
+
+
+def send_reset_code(user, code, ttl):
+    send_mail(
+        'Réinitialisation de votre mot de passe',
+        _greeting(user.first_name, user.username)
+        + f'Votre code de réinitialisation est : {code}\n'
+        f'Il est valable {ttl // 60} minutes.\n\n'
+        "Si vous n'êtes pas à l'origine de cette demande, ignorez ce message.",
+        None,
+        [user.email],
+    )
+
+
+def send_welcome(user):
+    send_mail(
+        'Votre compte a été créé',
+        _greeting(user.first_name, user.username)
+        + 'Un compte vient de vous être ouvert.\n'
+        f'Identifiant : {user.email}\n\n'
+        'Le mot de passe vous est communiqué par votre administrateur.',
+        None,
+        [user.email],
+    )
+
+
+def _status_message(first_name, username, email, is_active):
+    if is_active:
+        subject, text = 'Votre compte a été activé', 'Votre compte est de nouveau actif.'
+    else:
+        subject, text = 'Votre compte a été désactivé', "Votre compte a été désactivé ; vous ne pouvez plus vous connecter."
+    return EmailMessage(subject, _greeting(first_name, username) + text, None, [email])
+
+
+def send_status_notices(recipients, is_active):
+    """Un avis par compte ; `recipients` : tuples (first_name, username, email). Un seul envoi groupé."""
+    messages = [_status_message(*recipient, is_active) for recipient in recipients if recipient[2]]
+    if messages:
+        get_connection().send_messages(messages)
+
+
+def send_status_notice(user):
+    send_status_notices([(user.first_name, user.username, user.email)], user.is_active)
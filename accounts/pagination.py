@@ -0,0 +1,135 @@
+import base64
+import binascii
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def query_params(request):
+    """Paramètres GET d'une requête DRF ou d'une HttpRequest (vues async)."""
+    return getattr(request, 'query_params', request.GET)
+
+
+class UserCursorPagination(BasePagination):
+    """
+    Pagination par curseur (keyset) sur la clé `id`.
+
+    Chaque page est obtenue par `WHERE id > <dernier id> ORDER BY id LIMIT n`,
+    ce qui garde un coût constant quelle que soit la profondeur de la page.
+    Le curseur transporte aussi la position (`numero`) de la ligne frontière,
+    pour que la numérotation reste continue d'une page à l'autre sans COUNT.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 10
+    max_page_size = 100
+    invalid_cursor_message = 'Curseur invalide.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Variante async (vues ASGI) : même requête, itérée avec `async for`."""
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """Requête de la page demandée, avec une ligne de plus pour savoir s'il en reste."""
+        self.request = request
+        self.limit = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            self.after_id, self.position, self.reverse = None, 0, False
+        else:
+            self.after_id, self.position, self.reverse = self.cursor
+
+        if self.reverse:
+            queryset = queryset.order_by('-id')
+            if self.after_id is not None:
+                queryset = queryset.filter(id__lt=self.after_id)
+        else:
+            queryset = queryset.order_by('id')
+            if self.after_id is not None:
+                queryset = queryset.filter(id__gt=self.after_id)
+        return queryset[:self.limit + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+
+        if self.reverse:
+            rows.reverse()
+            # Sans ligne supplémentaire, on est revenu au début du jeu filtré.
+            self.start = max(self.position - len(rows), 1) if has_more else 1
+            self.has_next = self.after_id is not None
+            self.has_previous = has_more
+        else:
+            self.start = self.position + 1
+            self.has_next = has_more
+            self.has_previous = self.after_id is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        value = query_params(request).get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            size = int(value)
+        except ValueError:
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    # ── Curseurs ──────────────────────────────────────────────────
+
+    def decode_cursor(self, request):
+        encoded = query_params(request).get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            direction, last_id, position = raw.split(':')
+            last_id, position = int(last_id), int(position)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if direction not in ('n', 'p') or last_id < 0 or position < 0:
+            raise NotFound(self.invalid_cursor_message)
+        return last_id, position, direction == 'p'
+
+    def encode_cursor(self, last_id, position, reverse):
+        raw = f"{'p' if reverse else 'n'}:{last_id}:{position}"
+        encoded = base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_row_id(self, row):
+        return row.id
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self.start + len(self.page) - 1
+        return self.encode_cursor(self.get_row_id(self.page[-1]), position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.get_row_id(self.page[0]), self.start, reverse=True)
+
+    def get_numbered_page(self):
+        """Renvoie les lignes de la page avec leur position absolue."""
+        return enumerate(self.page, start=self.start)
+
+
+class UserRowPagination(UserCursorPagination):
+    """Même pagination sur des tuples `values_list` dont l'id est le premier champ."""
+
+    def get_row_id(self, row):
+        return row[0]
@@ -0,0 +1,204 @@
+"""
+Codes de réinitialisation du mot de passe, gardés dans un store à durée de vie.
+
+Un seul code actif par e-mail, valable PASSWORD_RESET_TTL secondes (10 min).
+Il n'est jamais stocké en clair : l'entrée `code:<empreinte de l'e-mail>`
+contient un HMAC du code. La recherche se fait par clé (O(1)) et la
+comparaison en temps constant. Plus rien n'est écrit dans
+`password_reset_codes`, que `purge_password_reset_codes` vide.
+
+Protections :
+- `tries:<empreinte>` compte les codes faux. Le compteur survit aux renvois ;
+  au-delà de PASSWORD_RESET_MAX_ATTEMPTS, le code est effacé et aucun
+  nouveau code n'est émis avant l'expiration ;
+- un nouveau code n'est émis qu'après PASSWORD_RESET_RESEND_INTERVAL secondes.
+
+Backends (PASSWORD_RESET_BACKEND) :
+- `CacheBackend` (défaut) : cache Django partagé entre workers
+  (PASSWORD_RESET_CACHE_ALIAS) ; un code demandé sur un worker est vérifié
+  sur un autre ;
+- `MemoryBackend` : par processus (un seul worker, tests), expiration à la
+  lecture, purge au-delà de PASSWORD_RESET_MAX_ENTRIES entrées.
+Check `accounts.E002` : pas de store local au processus avec plusieurs workers.
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .models import normalize_email_address
+
+
+def get_ttl():
+    return getattr(settings, 'PASSWORD_RESET_TTL', 600)
+
+
+def get_max_attempts():
+    return getattr(settings, 'PASSWORD_RESET_MAX_ATTEMPTS', 5)
+
+
+def get_resend_interval():
+    return getattr(settings, 'PASSWORD_RESET_RESEND_INTERVAL', 60)
+
+
+def get_max_entries():
+    return getattr(settings, 'PASSWORD_RESET_MAX_ENTRIES', 100000)
+
+
+# ── Backends ──────────────────────────────────────────────────────
+
+class MemoryBackend:
+    """Entrées en mémoire du processus : nom → (valeur, instant d'expiration)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _live(self, name, now):
+        entry = self._entries.get(name)
+        if entry is not None and entry[1] <= now:
+            del self._entries[name]
+            return None
+        return entry
+
+    def get(self, name):
+        with self._lock:
+            entry = self._live(name, time.time())
+            return None if entry is None else entry[0]
+
+    def set(self, name, value, ttl):
+        now = time.time()
+        with self._lock:
+            if len(self._entries) >= get_max_entries():
+                self._entries = {k: e for k, e in self._entries.items() if e[1] > now}
+            self._entries[name] = (value, now + ttl)
+
+    def incr(self, name, ttl):
+        now = time.time()
+        with self._lock:
+            entry = self._live(name, now)
+            value, expires = entry if entry is not None else (0, now + ttl)
+            self._entries[name] = (value + 1, expires)
+            return value + 1
+
+    def delete(self, name):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            return entry is not None and entry[1] > time.time()
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheBackend:
+    """Entrées dans le cache partagé, avec sa propre expiration."""
+
+    prefix = 'accounts.reset:'
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'PASSWORD_RESET_CACHE_ALIAS', 'default')]
+
+    def get(self, name):
+        return self.cache.get(self.prefix + name)
+
+    def set(self, name, value, ttl):
+        self.cache.set(self.prefix + name, value, timeout=ttl)
+
+    def incr(self, name, ttl):
+        # add() est atomique : crée le compteur s'il n'existe pas encore.
+        self.cache.add(self.prefix + name, 0, timeout=ttl)
+        try:
+            return self.cache.incr(self.prefix + name)
+        except ValueError:
+            # Entrée expirée entre add() et incr().
+            self.cache.set(self.prefix + name, 1, timeout=ttl)
+            return 1
+
+    def delete(self, name):
+        return self.cache.delete(self.prefix + name)
+
+    def reset(self):
+        pass
+
+
+# ── Codes ─────────────────────────────────────────────────────────
+
+def _email_key(email):
+    return hashlib.blake2b(normalize_email_address(email).encode(), digest_size=12).hexdigest()
+
+
+def _digest(key, code):
+    return hmac.new(settings.SECRET_KEY.encode(), f'{key}:{code}'.encode(), hashlib.sha256).hexdigest()
+
+
+def generate_code():
+    """Code à 6 chiffres (générateur cryptographique)."""
+    return ''.join(secrets.choice('0123456789') for _ in range(6))
+
+
+class ResetCodeStore:
+
+    def __init__(self):
+        self._backend = None
+        self._backend_path = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        path = getattr(settings, 'PASSWORD_RESET_BACKEND', 'accounts.password_reset.CacheBackend')
+        with self._lock:
+            if self._backend is None or self._backend_path != path:
+                self._backend = import_string(path)()
+                self._backend_path = path
+            return self._backend
+
+    def issue(self, email):
+        """Nouveau code pour `email`, ou None (renvoi trop rapproché, essais épuisés)."""
+        key = _email_key(email)
+        backend = self.backend
+        now = time.time()
+        current = backend.get('code:' + key)
+        if current is not None and now - current['issued_at'] < get_resend_interval():
+            return None
+        if (backend.get('tries:' + key) or 0) >= get_max_attempts():
+            return None
+        code = generate_code()
+        backend.set('code:' + key, {'digest': _digest(key, code), 'issued_at': now}, get_ttl())
+        return code
+
+    def check(self, email, code, consume=False):
+        """
+        True si `code` est le code actif de `email`. Un code faux est compté ;
+        avec `consume`, un code juste est retiré (usage unique).
+        """
+        key = _email_key(email)
+        backend = self.backend
+        current = backend.get('code:' + key)
+        if current is None:
+            return False
+        if not hmac.compare_digest(current['digest'], _digest(key, str(code))):
+            if backend.incr('tries:' + key, get_ttl()) >= get_max_attempts():
+                backend.delete('code:' + key)
+            return False
+        if consume:
+            if not backend.delete('code:' + key):
+                return False  # déjà utilisé par une requête concurrente
+            backend.delete('tries:' + key)
+        return True
+
+    def reset(self):
+        self.backend.reset()
+
+
+reset_codes = ResetCodeStore()
+
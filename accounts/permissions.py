@@ -0,0 +1,52 @@
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import BasePermission
+
+SUPER_ADMIN = 'super_admin'
+
+
+def get_effective_role(user):
+    """
+    Rôle effectif de l'utilisateur, calculé une fois puis mémorisé sur
+    l'instance (donc pour la durée de la requête). Un superuser est toujours
+    super_admin ; la colonne `role` est synchronisée à l'écriture (signal
+    pre_save, migration 0008), jamais pendant un contrôle d'accès.
+    """
+    if user is None or not user.is_authenticated:
+        return None
+    role = getattr(user, '_effective_role', None)
+    if role is None:
+        role = SUPER_ADMIN if user.is_superuser else user.role
+        user._effective_role = role
+    return role
+
+
+def is_super_admin(user):
+    return get_effective_role(user) == SUPER_ADMIN
+
+
+class RoleDenied(PermissionDenied):
+    """
+    Refus pour rôle insuffisant, avec le corps historique des vues
+    d'administration : `{'success': False, 'message': ...}` au lieu de
+    `{'detail': ...}`. DRF renvoie tel quel un `detail` de type dict.
+    """
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.detail = {'success': False, 'message': self.detail}
+
+
+class HasRole(BasePermission):
+    """Autorise les utilisateurs dont le rôle effectif figure dans `roles`."""
+    roles = ()
+    message = 'Accès refusé.'
+
+    def has_permission(self, request, view):
+        if get_effective_role(request.user) not in self.roles:
+            raise RoleDenied(self.message)
+        return True
+
+
+class IsSuperAdmin(HasRole):
+    roles = (SUPER_ADMIN,)
+    message = 'Accès refusé. Réservé au Super Administrateur.'
@@ -0,0 +1,87 @@
+"""
+Plans d'exécution (EXPLAIN) des requêtes SQL émises par l'API.
+
+`explain(sql)` renvoie une étape par table lue, avec son mode d'accès :
+
+- `lookup`     : accès par index ou clé primaire (SEARCH, type ref/range/eq_ref…) ;
+- `index_scan` : lecture complète d'un index (SCAN … USING INDEX, type index) ;
+- `full_scan`  : lecture complète de la table (SCAN t, type ALL).
+
+Seuls SQLite (EXPLAIN QUERY PLAN) et MySQL (EXPLAIN) sont pris en charge.
+Ni l'un ni l'autre n'exécute la requête expliquée.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connection
+
+LOOKUP = 'lookup'
+INDEX_SCAN = 'index_scan'
+FULL_SCAN = 'full_scan'
+
+PlanStep = namedtuple('PlanStep', 'table access detail')
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+_sqlite_step_re = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS \w+)?(.*)$')
+
+
+def is_explainable(sql):
+    return sql.lstrip().split(None, 1)[0].upper() in EXPLAINABLE
+
+
+def _sqlite_steps(rows):
+    steps = []
+    for row in rows:
+        detail = row[-1]
+        match = _sqlite_step_re.match(detail)
+        if match is None or match.group(2) == 'CONSTANT':
+            continue  # B-tree temporaire, sous-requête, ligne constante…
+        verb, table, rest = match.groups()
+        if verb == 'SEARCH':
+            access = LOOKUP
+        elif 'INDEX' in rest:
+            access = INDEX_SCAN
+        else:
+            access = FULL_SCAN
+        steps.append(PlanStep(table, access, detail))
+    return steps
+
+
+def _mysql_steps(rows, columns):
+    steps = []
+    for row in rows:
+        data = dict(zip(columns, row))
+        table = data.get('table')
+        if not table or table.startswith('<'):
+            continue  # <derivedN>, <subqueryN>, <unionM,N>
+        kind = data.get('type')
+        access = FULL_SCAN if kind == 'ALL' else INDEX_SCAN if kind == 'index' else LOOKUP
+        detail = f"type={kind} key={data.get('key')} rows={data.get('rows')} extra={data.get('Extra')}"
+        steps.append(PlanStep(table, access, detail))
+    return steps
+
+
+def explain(sql, using=None):
+    """Étapes du plan de `sql` (requête déjà interpolée, telle que capturée)."""
+    using = using or connection
+    with using.cursor() as cursor:
+        if using.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return _sqlite_steps(cursor.fetchall())
+        if using.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}')
+            return _mysql_steps(cursor.fetchall(), [col[0] for col in cursor.description])
+    raise NotImplementedError(f'EXPLAIN non pris en charge pour {using.vendor}.')
+
+
+def analyze(tables, using=None):
+    """Met à jour les statistiques de l'optimiseur (après un chargement massif)."""
+    using = using or connection
+    with using.cursor() as cursor:
+        if using.vendor == 'sqlite':
+            for table in tables:
+                cursor.execute(f'ANALYZE {using.ops.quote_name(table)}')
+        elif using.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE ' + ', '.join(using.ops.quote_name(t) for t in tables))
+            cursor.fetchall()
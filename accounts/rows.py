@@ -0,0 +1,57 @@
+"""
+Projection compacte des comptes pour les réponses de liste.
+
+Les listes n'ont besoin que de sept colonnes : on les lit avec
+`values_list(*ROW_FIELDS)` (ni instance de modèle, ni hash du mot de passe,
+ni champs d'AbstractUser inutilisés) et chaque tuple est mis en forme par
+`user_row`, dont les gabarits sont préparés une fois au chargement du
+module. `row_values` donne le même tuple depuis une instance déjà chargée
+(utilisateur connecté, flux de synchronisation).
+"""
+from operator import attrgetter
+
+ROW_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email', 'role', 'is_active')
+PROFILE_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'role', 'phone')
+
+row_values = attrgetter(*ROW_FIELDS)
+profile_values = attrgetter(*PROFILE_FIELDS)
+
+_code = '#USR-{:03d}'.format
+_numero = '{:02d}'.format
+
+
+def user_row(row):
+    """Ligne de liste (`code`, `nom`, `initiales`…) depuis un tuple ROW_FIELDS."""
+    user_id, username, first_name, last_name, email, role, is_active = row
+    if first_name and last_name:
+        initiales = (first_name[0] + last_name[0]).upper()
+    else:
+        initiales = username[:2].upper()
+    return {
+        'id':        user_id,
+        'code':      _code(user_id),
+        'nom':       f'{first_name} {last_name}'.strip() or username,
+        'initiales': initiales,
+        'email':     email,
+        'role':      role,
+        'is_active': is_active,
+    }
+
+
+def numbered_rows(numbered):
+    """[(position, tuple)] → lignes de liste avec leur `numero`."""
+    rows = []
+    for position, row in numbered:
+        data = user_row(row)
+        data['numero'] = _numero(position)
+        rows.append(data)
+    return rows
+
+
+def profile(user):
+    """Profil de l'utilisateur connecté (`me`, `login`)."""
+    return dict(zip(PROFILE_FIELDS, profile_values(user)))
+
+
+def select_rows(queryset):
+    return queryset.values_list(*ROW_FIELDS)
@@ -0,0 +1,162 @@
+"""
+Recherche indexée dans l'annuaire des utilisateurs.
+
+Chaque utilisateur est découpé en mots normalisés (minuscules, sans accents)
+stockés dans `UserSearchToken`. Une recherche devient alors une suite de
+`token LIKE 'terme%'` servis par l'index (token, user) au lieu de quatre
+`LIKE '%terme%'` qui parcourent toute la table `users`.
+
+Les mots gardent toutes les lettres Unicode (arabe, etc.) : seules les
+marques diacritiques sont retirées.
+
+Différence avec l'ancien `icontains` : un terme doit commencer un mot
+(préfixe), il ne peut plus se trouver au milieu (« xample » ne trouve plus
+« example.com », « exam » si). Une recherche sans aucun mot indexable
+(« @ », « -- ») ne renvoie rien, au lieu de toute la table.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, Value, When
+
+from .models import User, UserSearchToken
+
+TOKEN_MAX_LENGTH = 64
+MAX_QUERY_TERMS = 5
+
+# Poids d'un mot selon le champ dont il provient (le plus fort l'emporte).
+FIELD_WEIGHTS = (
+    ('first_name', 3),
+    ('last_name', 3),
+    ('username', 2),
+    ('email', 1),
+)
+INDEXED_FIELDS = frozenset(name for name, _ in FIELD_WEIGHTS)
+
+_split_re = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """Minuscules et suppression des diacritiques : 'Éloïse' → 'eloise', 'مُحَمَّد' → 'محمد'."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    return [t[:TOKEN_MAX_LENGTH] for t in _split_re.split(normalize(text)) if t]
+
+
+def build_tokens(user):
+    """Renvoie {token: poids} pour un utilisateur (instance ou ligne historique)."""
+    tokens = {}
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(getattr(user, field, '')):
+            if weight > tokens.get(token, 0):
+                tokens[token] = weight
+    return tokens
+
+
+def parse_query(query):
+    """Termes distincts de la recherche, limités pour borner le coût SQL."""
+    terms = []
+    for term in tokenize(query):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+# ── Maintenance de l'index ────────────────────────────────────────
+
+def index_user(user):
+    """(Ré)indexe un utilisateur ; appelé par le signal post_save."""
+    with transaction.atomic():
+        UserSearchToken.objects.filter(user_id=user.pk).delete()
+        UserSearchToken.objects.bulk_create([
+            UserSearchToken(user_id=user.pk, token=token, weight=weight)
+            for token, weight in build_tokens(user).items()
+        ])
+
+
+def index_new_users(users, batch_size=2000):
+    """Indexe des comptes créés par `bulk_create` (qui n'émet pas post_save)."""
+    UserSearchToken.objects.bulk_create([
+        UserSearchToken(user_id=user.pk, token=token, weight=weight)
+        for user in users
+        for token, weight in build_tokens(user).items()
+    ], batch_size=batch_size)
+
+
+def rebuild_index(token_model=UserSearchToken, user_model=User, batch_size=2000):
+    """Reconstruit tout l'index par lots ; renvoie le nombre d'utilisateurs indexés."""
+    token_model.objects.all().delete()
+    fields = ['pk'] + [name for name, _ in FIELD_WEIGHTS]
+    count = 0
+    batch = []
+    for user in user_model.objects.only(*fields).order_by('pk').iterator(chunk_size=batch_size):
+        batch.extend(
+            token_model(user_id=user.pk, token=token, weight=weight)
+            for token, weight in build_tokens(user).items()
+        )
+        count += 1
+        if len(batch) >= batch_size:
+            token_model.objects.bulk_create(batch, batch_size=batch_size)
+            batch = []
+    if batch:
+        token_model.objects.bulk_create(batch, batch_size=batch_size)
+    return count
+
+
+# ── Requêtes ──────────────────────────────────────────────────────
+
+def filter_users(queryset, query):
+    """
+    Restreint `queryset` aux utilisateurs dont un mot commence par chacun
+    des termes recherchés (sémantique ET, semi-jointure sur l'index). Sans
+    terme indexable, aucun utilisateur.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return queryset.none()
+    for term in terms:
+        queryset = queryset.filter(
+            id__in=UserSearchToken.objects.filter(token__startswith=term).values('user_id')
+        )
+    return queryset
+
+
+def ranked_search(query, limit=20):
+    """
+    Renvoie une liste [(user_id, score)] triée par pertinence.
+
+    Tous les termes doivent correspondre ; le score additionne le poids des
+    mots trouvés, doublé quand le mot est égal au terme (et pas seulement
+    préfixé).
+    """
+    terms = parse_query(query)
+    if not terms:
+        return []
+
+    any_term = Q()
+    for term in terms:
+        any_term |= Q(token__startswith=term)
+
+    matched = {
+        f'm{i}': Max(Case(When(token__startswith=term, then=Value(1)),
+                          default=Value(0), output_field=IntegerField()))
+        for i, term in enumerate(terms)
+    }
+    score = Sum(Case(
+        When(token__in=terms, then=F('weight') * 2),
+        default=F('weight'),
+        output_field=IntegerField(),
+    ))
+    rows = (
+        UserSearchToken.objects.filter(any_term)
+        .values('user_id')
+        .annotate(score=score, **matched)
+        .filter(**{name: 1 for name in matched})
+        .order_by('-score', 'user_id')
+        .values_list('user_id', 'score')[:limit]
+    )
+    return list(rows)
@@ -0,0 +1,62 @@
+"""
+Génération de données factices pour les benchmarks.
+
+Les comptes créés ont un mot de passe inutilisable (pas de hachage PBKDF2)
+et un username préfixé par `bench`. `bulk_create` ne déclenche pas les
+signaux : passer par `benchmarks.seed_dataset`, qui reconstruit ensuite
+l'index de recherche et les compteurs, dans une base jetable.
+"""
+import random
+
+from django.contrib.auth.hashers import make_password
+
+from .models import User
+
+SEED_PREFIX = 'bench'
+
+FIRST_NAMES = (
+    'mohamed', 'ahmed', 'ali', 'youssef', 'amine', 'sami', 'karim', 'omar',
+    'yasmine', 'amira', 'sarra', 'mariem', 'nour', 'ines', 'salma', 'rania',
+)
+LAST_NAMES = (
+    'benali', 'trabelsi', 'gharbi', 'hammami', 'jebali', 'mansouri', 'bouazizi',
+    'chaabane', 'khelifi', 'ayari', 'saidi', 'mejri', 'dridi', 'ferchichi',
+)
+DOMAINS = ('gmail.com', 'yahoo.fr', 'outlook.com', 'esprit.tn')
+ROLE_WEIGHTS = (
+    ('etudiant', 80), ('formateur', 8), ('entreprise', 5),
+    ('assistante', 3), ('responsable', 3), ('super_admin', 1),
+)
+
+
+def iter_seed_users(count, seed=0, start=0):
+    rng = random.Random(seed)
+    roles = [role for role, _ in ROLE_WEIGHTS]
+    weights = [weight for _, weight in ROLE_WEIGHTS]
+    password = make_password(None)
+    for i in range(start, start + count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        yield User(
+            username=f'{SEED_PREFIX}{i}_{first}{last}',
+            email=f'{first}.{last}{i}@{rng.choice(DOMAINS)}',
+            password=password,
+            first_name=first.capitalize(),
+            last_name=last.capitalize(),
+            role=rng.choices(roles, weights)[0],
+            is_active=rng.random() > 0.1,
+        )
+
+
+def seed_users(count, batch_size=5000, seed=0):
+    """Insère `count` comptes factices par lots ; renvoie le nombre inséré."""
+    start = User.objects.filter(username__startswith=SEED_PREFIX).count()
+    batch = []
+    for user in iter_seed_users(count, seed=seed, start=start):
+        batch.append(user)
+        if len(batch) >= batch_size:
+            User.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        User.objects.bulk_create(batch)
+    return count
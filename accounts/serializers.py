@@ -1,11 +1,19 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from . import hashing
 from .models import User
+from .usernames import EmailTaken, save_user, save_with_unique_username
+from .validation import EMAIL_TAKEN_MESSAGE, base_username
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = '__all__'  # ✅ Tous les champs du modèle User
+        # Liste explicite : '__all__' exposerait le hash du mot de passe et
+        # ajouterait groups / user_permissions (une requête par utilisateur).
+        fields = (
+            'id', 'username', 'email', 'first_name', 'last_name', 'role', 'phone',
+            'is_active', 'email_verified', 'last_login', 'date_joined', 'created_at', 'updated_at',
+        )
         read_only_fields = ['id', 'email_verified', 'created_at', 'updated_at']
 
 
@@ -15,17 +23,33 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('username', 'email', 'password', 'first_name', 'last_name', 'role', 'phone')
+        extra_kwargs = {'username': {'required': False}}  # Attribué automatiquement si absent
+
+    def validate_email(self, value):
+        if User.objects.by_email(value).exists():
+            raise serializers.ValidationError(EMAIL_TAKEN_MESSAGE)
+        return value
     
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
+        user = User(
+            username=validated_data.get('username', ''),
             email=validated_data['email'],
-            password=validated_data['password'],
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', ''),
             role=validated_data.get('role', 'etudiant'),
             phone=validated_data.get('phone', '')
         )
+        hashing.set_password(user, validated_data['password'])
+        try:
+            if user.username:
+                save_user(user)
+            else:
+                save_with_unique_username(
+                    user, base_username(user.first_name, user.last_name, user.email)
+                )
+        except EmailTaken:
+            # Même adresse créée entre validate_email et l'INSERT
+            raise serializers.ValidationError({'email': EMAIL_TAKEN_MESSAGE})
         return user
     
 class LoginSerializer(serializers.Serializer):
@@ -36,38 +60,23 @@ class LoginSerializer(serializers.Serializer):
         email = data.get('email')
         password = data.get('password')
         
-        try:
-            # Chercher l'utilisateur par email
-            user = User.objects.get(email=email)
-            
-            # Authentifier avec le username
-            user = authenticate(username=user.username, password=password)
-            
-            if user and user.is_active:
-                return user
-            else:
-                raise serializers.ValidationError("Email ou mot de passe incorrect")
-                
-        except User.DoesNotExist:
-            raise serializers.ValidationError("Email ou mot de passe incorrect")
+        # Authentification directe par email (une seule requête, cf. EmailBackend)
+        user = authenticate(self.context.get('request'), email=email, password=password)
+
+        if user and user.is_active:
+            return user
+        raise serializers.ValidationError("Email ou mot de passe incorrect")
         
 
 # Ajoutez cette classe dans serializers.py
 
-class ChangePasswordSerializer(serializers.Serializer):
+class NewPasswordSerializer(serializers.Serializer):
     """
-    Sérializer pour le changement de mot de passe
+    Nouveau mot de passe et sa confirmation (changement et réinitialisation)
     """
-    old_password = serializers.CharField(write_only=True, required=True)
     new_password = serializers.CharField(write_only=True, required=True)
     confirm_password = serializers.CharField(write_only=True, required=True)
 
-    def validate_old_password(self, value):
-        user = self.context['request'].user
-        if not user.check_password(value):
-            raise serializers.ValidationError("L'ancien mot de passe est incorrect")
-        return value
-
     def validate(self, data):
         if data['new_password'] != data['confirm_password']:
             raise serializers.ValidationError({
@@ -81,7 +90,27 @@ class ChangePasswordSerializer(serializers.Serializer):
             })
             
         return data
-    
+
+
+class ChangePasswordSerializer(NewPasswordSerializer):
+    """
+    Sérializer pour le changement de mot de passe
+    """
+    old_password = serializers.CharField(write_only=True, required=True)
+
+    def validate_old_password(self, value):
+        user = self.context.get('user') or self.context['request'].user
+        if not hashing.check_password(user, value):
+            raise serializers.ValidationError("L'ancien mot de passe est incorrect")
+        return value
+
+
+class PasswordResetConfirmSerializer(NewPasswordSerializer):
+    """
+    Réinitialisation par code reçu par e-mail
+    """
+    email = serializers.EmailField(required=True)
+    code = serializers.RegexField(r'^\d{6}$', required=True)
 
 
 
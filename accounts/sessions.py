@@ -0,0 +1,261 @@
+"""
+Moteur de session « cached_db » qui regroupe les écritures.
+
+Avec SESSION_SAVE_EVERY_REQUEST = True, le moteur `db` de Django fait un
+UPDATE de `django_session` à chaque requête, uniquement pour repousser
+l'expiration. Ici :
+
+- les lectures sont servies par le cache (SESSION_CACHE_ALIAS) ;
+- une session dont seules les dates changent n'est réécrite en base que si
+  plus de SESSION_RENEW_FRACTION × SESSION_COOKIE_AGE se sont écoulés depuis
+  la dernière écriture ;
+- entre-temps, la nouvelle date d'expiration est mise en attente et écrite
+  par lots (bulk_update) au plus tard SESSION_FLUSH_INTERVAL secondes après
+  sa mise en attente, ou dès que SESSION_FLUSH_BATCH_SIZE sessions attendent.
+
+Le cache doit être partagé entre les workers (check `accounts.E001`) : avec
+un cache local au processus, une session supprimée (logout, révocation)
+resterait servie par le cache des autres workers.
+
+Toute modification du contenu de la session est écrite immédiatement, comme
+avec `cached_db`. L'expiration glissante de 24 h est donc conservée.
+
+Les sessions sont stockées dans `user_sessions` (modèle `UserSession`) avec
+l'identifiant du compte connecté dans une colonne indexée : `revoke_user_sessions`
+retrouve les sessions d'un compte sans décoder la table, les retire du cache
+et les supprime par clé primaire.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.core.cache import caches
+from django.db import DatabaseError, connection, connections
+
+from .models import UserSession
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'accounts.sessions'
+
+
+def get_renew_fraction():
+    return getattr(settings, 'SESSION_RENEW_FRACTION', 0.1)
+
+
+def get_flush_batch_size():
+    return getattr(settings, 'SESSION_FLUSH_BATCH_SIZE', 200)
+
+
+def get_flush_interval():
+    return getattr(settings, 'SESSION_FLUSH_INTERVAL', 30)
+
+
+class PendingRenewals:
+    """
+    Dates d'expiration en attente d'écriture, regroupées par processus.
+
+    Écrites dès que SESSION_FLUSH_BATCH_SIZE sessions attendent, sinon par un
+    minuteur (thread démon) SESSION_FLUSH_INTERVAL secondes après la première
+    mise en attente : un worker inactif n'attend pas la requête suivante.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, session_key, expire_date):
+        with self._lock:
+            self._pending[session_key] = expire_date
+            due = len(self._pending) >= get_flush_batch_size()
+            if not due:
+                self._schedule()
+        if due:
+            self.flush()
+
+    def discard(self, session_key):
+        with self._lock:
+            self._pending.pop(session_key, None)
+
+    def _schedule(self):
+        # Appelé sous self._lock.
+        if self._timer is None:
+            self._timer = threading.Timer(get_flush_interval(), self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            if _table_exists():
+                self.flush()
+            else:
+                self.reset()  # base de test détruite : rien à écrire
+        finally:
+            connections.close_all()  # connexions de ce thread uniquement
+        with self._lock:
+            if self._pending:
+                self._schedule()
+
+    def flush(self):
+        """Écrit les expirations en attente ; renvoie le nombre de sessions traitées."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        sessions = [UserSession(session_key=key, expire_date=date) for key, date in pending.items()]
+        try:
+            UserSession.objects.bulk_update(sessions, ['expire_date'], batch_size=get_flush_batch_size())
+        except DatabaseError:
+            logger.exception('Échec de l’écriture groupée de %d sessions', len(sessions))
+            with self._lock:
+                for key, date in pending.items():
+                    self._pending.setdefault(key, date)
+            return 0
+        return len(sessions)
+
+    def reset(self):
+        """Oublie les renouvellements en attente sans les écrire (tests)."""
+        with self._lock:
+            self._pending = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+pending_renewals = PendingRenewals()
+
+
+def _table_exists():
+    """False si `user_sessions` n'existe pas (ou plus) ou si la base est injoignable."""
+    try:
+        with connection.cursor() as cursor:
+            return UserSession._meta.db_table in connection.introspection.table_names(cursor)
+    except DatabaseError:
+        return False
+
+
+@atexit.register
+def _flush_on_exit():
+    if not len(pending_renewals):
+        return
+    try:
+        if _table_exists():
+            pending_renewals.flush()
+    except Exception:
+        logger.exception('Échec de l’écriture des sessions à l’arrêt')
+
+
+def session_user_id(data):
+    try:
+        return int(data[SESSION_KEY])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX + '.data:'
+    persisted_key_prefix = KEY_PREFIX + '.persisted:'
+
+    @classmethod
+    def get_model_class(cls):
+        return UserSession
+
+    @property
+    def persisted_key(self):
+        return self.persisted_key_prefix + self._get_or_create_session_key()
+
+    def create_model_instance(self, data):
+        session = super().create_model_instance(data)
+        session.user_id = session_user_id(data)
+        return session
+
+    async def acreate_model_instance(self, data):
+        session = await super().acreate_model_instance(data)
+        session.user_id = session_user_id(data)
+        return session
+
+    def save(self, must_create=False):
+        if not must_create and not self.modified and self._session_key and self._coalesce_renewal():
+            return
+        super().save(must_create=must_create)
+        pending_renewals.discard(self.session_key)
+        self._mark_persisted(time.time())
+
+    def delete(self, session_key=None):
+        key = session_key or self.session_key
+        super().delete(session_key)
+        if key:
+            pending_renewals.discard(key)
+            self._cache.delete(self.persisted_key_prefix + key)
+
+    # Variantes async (alogin / alogout des vues ASGI) : même suivi que save/delete.
+
+    async def asave(self, must_create=False):
+        if not must_create and not self.modified and self._session_key:
+            if await sync_to_async(self._coalesce_renewal)():
+                return
+        await super().asave(must_create=must_create)
+        pending_renewals.discard(self.session_key)
+        try:
+            await self._cache.aset(self.persisted_key, time.time(), settings.SESSION_COOKIE_AGE)
+        except Exception:
+            logger.exception('Erreur d’écriture dans le cache (%s)', self._cache)
+
+    async def adelete(self, session_key=None):
+        key = session_key or self.session_key
+        await super().adelete(session_key)
+        if key:
+            pending_renewals.discard(key)
+            await self._cache.adelete(self.persisted_key_prefix + key)
+
+    def _mark_persisted(self, timestamp):
+        try:
+            self._cache.set(self.persisted_key, timestamp, settings.SESSION_COOKIE_AGE)
+        except Exception:
+            logger.exception('Erreur d’écriture dans le cache (%s)', self._cache)
+
+    def _coalesce_renewal(self):
+        """
+        Repousse l'expiration dans le cache seulement, si la dernière écriture
+        en base est assez récente. Renvoie False quand il faut écrire en base.
+        """
+        persisted_at = self._cache.get(self.persisted_key)
+        if persisted_at is None:
+            # Marqueur absent (cache vidé, session rechargée depuis la base).
+            return False
+        if time.time() - persisted_at >= get_renew_fraction() * settings.SESSION_COOKIE_AGE:
+            return False
+        if not self._cache.touch(self.cache_key, self.get_expiry_age()):
+            return False
+        pending_renewals.add(self.session_key, self.get_expiry_date())
+        return True
+
+
+def revoke_user_sessions(user_ids):
+    """
+    Supprime toutes les sessions des comptes `user_ids` (liste ou queryset
+    `values_list('id', flat=True)`) ; renvoie le nombre de sessions supprimées. Coût : une
+    lecture de l'index user_id et un DELETE par clé primaire.
+    """
+    keys = list(UserSession.objects.filter(user_id__in=user_ids).values_list('session_key', flat=True))
+    if not keys:
+        return 0
+    # Le cache servirait encore la session après sa suppression en base.
+    caches[settings.SESSION_CACHE_ALIAS].delete_many(
+        [prefix + key for key in keys for prefix in (SessionStore.cache_key_prefix, SessionStore.persisted_key_prefix)]
+    )
+    for key in keys:
+        pending_renewals.discard(key)
+    deleted, _ = UserSession.objects.filter(session_key__in=keys).delete()
+    return deleted
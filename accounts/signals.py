@@ -0,0 +1,110 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import User
+from . import search, stats, sync
+from .tokens import revoke_user_access
+from .permissions import SUPER_ADMIN
+
+
+STAT_FIELDS = frozenset({'role', 'is_active'})
+
+_local = threading.local()
+
+
+@contextmanager
+def suspended():
+    """
+    Désactive les handlers de suivi (statistiques, tombstones) : les chemins
+    en masse appliquent eux-mêmes un traitement groupé.
+    """
+    previous = getattr(_local, 'suspended', False)
+    _local.suspended = True
+    try:
+        yield
+    finally:
+        _local.suspended = previous
+
+
+def is_suspended():
+    return getattr(_local, 'suspended', False)
+
+
+def _stat_key(instance):
+    """(rôle, is_active) tels que chargés, sans déclencher de requête pour un champ différé."""
+    values = instance.__dict__
+    if 'role' in values and 'is_active' in values:
+        return values['role'], values['is_active']
+    return None
+
+
+@receiver(post_init, sender=User)
+def remember_stat_key(sender, instance, **kwargs):
+    instance._stat_key = _stat_key(instance)
+
+
+@receiver(pre_save, sender=User)
+def sync_superuser_role(sender, instance, raw=False, **kwargs):
+    """Un superuser a toujours le rôle super_admin, écrit avec le reste de la ligne."""
+    if instance.is_superuser and instance.role != SUPER_ADMIN:
+        instance.role = SUPER_ADMIN
+
+
+@receiver(pre_save, sender=User)
+def load_previous_stat_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Retrouve l'ancien (rôle, statut) si l'instance n'a pas été chargée entière."""
+    if raw or instance.pk is None or instance._stat_key is not None or is_suspended():
+        return
+    if update_fields is not None and not STAT_FIELDS.intersection(update_fields):
+        return
+    instance._stat_key = (
+        User.objects.filter(pk=instance.pk).values_list('role', 'is_active').first()
+    )
+
+
+@receiver(post_save, sender=User)
+def revoke_sessions_on_deactivation(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Un compte désactivé perd sessions et jetons (avant update_stats, qui remplace _stat_key)."""
+    if raw or created or instance.is_active or is_suspended():
+        return
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    if instance._stat_key is not None and not instance._stat_key[1]:
+        return  # déjà inactif
+    revoke_user_access([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def update_stats(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Compteurs (rôle, statut) et inscriptions par jour."""
+    if raw or is_suspended():
+        return
+    new_key = (instance.role, instance.is_active)
+    if created:
+        stats.users_added([instance])
+    elif instance._stat_key is not None:
+        if update_fields is None or STAT_FIELDS.intersection(update_fields):
+            stats.status_changed(tuple(instance._stat_key), new_key)
+    instance._stat_key = new_key
+
+
+@receiver(post_delete, sender=User)
+def track_deletion(sender, instance, **kwargs):
+    """Décompte dans les statistiques, tombstone pour la synchronisation, accès révoqués."""
+    if not is_suspended():
+        stats.users_removed([instance])
+        sync.record_deletions([instance.pk])
+        revoke_user_access([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def reindex_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Garde l'index de recherche à jour (la suppression passe par le CASCADE)."""
+    if raw:
+        return
+    if update_fields is not None and not search.INDEXED_FIELDS.intersection(update_fields):
+        return
+    search.index_user(instance)
@@ -0,0 +1,117 @@
+"""
+Statistiques des comptes tenues à jour de façon incrémentale.
+
+Les signaux de `User` ajustent deux tables de compteurs : (rôle, statut) et
+inscriptions par jour. Une lecture coûte donc O(rôles + jours) au lieu d'un
+parcours de la table `users`. Les chemins en masse (import, activation et
+suppression groupées) suspendent les handlers (`signals.suspended`) et
+appliquent un delta agrégé.
+`manage.py rebuild_user_stats` recalcule tout depuis la table `users`.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import User, UserSignupCounter, UserStatCounter
+
+def signup_day(created_at):
+    return timezone.localdate(created_at) if created_at else timezone.localdate()
+
+
+# ── Écriture ──────────────────────────────────────────────────────
+
+def _bump(model, lookup, delta):
+    if model.objects.filter(**lookup).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # Ligne créée entre-temps par une autre requête.
+        model.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def apply_deltas(status_deltas=None, day_deltas=None):
+    """status_deltas : {(rôle, is_active): n} ; day_deltas : {date: n}."""
+    with transaction.atomic():
+        for (role, is_active), delta in (status_deltas or {}).items():
+            if delta:
+                _bump(UserStatCounter, {'role': role, 'is_active': is_active}, delta)
+        for day, delta in (day_deltas or {}).items():
+            if delta:
+                _bump(UserSignupCounter, {'day': day}, delta)
+
+
+def users_added(users, sign=1):
+    """Compte (sign=1) ou décompte (sign=-1) des comptes créés ou supprimés."""
+    status_deltas, day_deltas = Counter(), Counter()
+    for user in users:
+        status_deltas[(user.role, user.is_active)] += sign
+        day_deltas[signup_day(user.created_at)] += sign
+    apply_deltas(status_deltas, day_deltas)
+
+
+def users_removed(users):
+    users_added(users, sign=-1)
+
+
+def status_changed(old_key, new_key):
+    if old_key != new_key:
+        apply_deltas({old_key: -1, new_key: 1})
+
+
+def rebuild():
+    """Recalcule tous les compteurs depuis la table `users`."""
+    with transaction.atomic():
+        UserStatCounter.objects.all().delete()
+        UserSignupCounter.objects.all().delete()
+        UserStatCounter.objects.bulk_create([
+            UserStatCounter(role=row['role'], is_active=row['is_active'], count=row['n'])
+            for row in User.objects.order_by().values('role', 'is_active').annotate(n=Count('id'))
+        ])
+        UserSignupCounter.objects.bulk_create([
+            UserSignupCounter(day=row['day'], count=row['n'])
+            for row in (
+                User.objects.order_by()
+                .annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+                .values('day').annotate(n=Count('id'))
+            )
+            if row['day'] is not None
+        ], batch_size=1000)
+
+
+# ── Lecture ───────────────────────────────────────────────────────
+
+def snapshot(days=30):
+    roles = {
+        role: {'active': 0, 'inactive': 0, 'total': 0}
+        for role, _ in User.ROLE_CHOICES
+    }
+    for counter in UserStatCounter.objects.all():
+        entry = roles.setdefault(counter.role, {'active': 0, 'inactive': 0, 'total': 0})
+        entry['active' if counter.is_active else 'inactive'] += counter.count
+        entry['total'] += counter.count
+
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    per_day = dict(
+        UserSignupCounter.objects.filter(day__gte=start, day__lte=today).values_list('day', 'count')
+    )
+    signups = [
+        {'date': (start + timedelta(days=i)).isoformat(), 'count': per_day.get(start + timedelta(days=i), 0)}
+        for i in range(days)
+    ]
+
+    active = sum(entry['active'] for entry in roles.values())
+    inactive = sum(entry['inactive'] for entry in roles.values())
+    return {
+        'total': active + inactive,
+        'active': active,
+        'inactive': inactive,
+        'roles': roles,
+        'signups': signups,
+    }
@@ -0,0 +1,113 @@
+"""
+Flux de synchronisation incrémentale de l'annuaire.
+
+Le client garde un jeton opaque (signé) qui contient deux curseurs :
+(updated_at, id) pour les comptes créés ou modifiés et (deleted_at, id)
+pour les `UserTombstone`. Chaque appel ne renvoie que ce qui a changé
+depuis, par ordre de curseur, à appliquer dans l'ordre : mises à jour puis
+suppressions.
+
+Les lignes plus récentes que SYNC_SAFETY_SECONDS sont laissées pour l'appel
+suivant : une transaction encore ouverte peut écrire un `updated_at`
+antérieur au curseur déjà renvoyé, et serait sinon manquée.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import User, UserTombstone
+from .rows import ROW_FIELDS
+
+SALT = 'accounts.sync'
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def get_safety_seconds():
+    return getattr(settings, 'SYNC_SAFETY_SECONDS', 5)
+
+
+def get_page_size():
+    return getattr(settings, 'SYNC_PAGE_SIZE', 500)
+
+
+# ── Jetons ────────────────────────────────────────────────────────
+
+def encode_token(users_cursor, tombstones_cursor):
+    return signing.dumps({'u': users_cursor, 't': tombstones_cursor}, salt=SALT, compress=True)
+
+
+def decode_token(token):
+    try:
+        state = signing.loads(token, salt=SALT)
+        return _parse_cursor(state.get('u')), _parse_cursor(state.get('t'))
+    except (signing.BadSignature, AttributeError, TypeError, ValueError):
+        raise InvalidSyncToken('Jeton de synchronisation invalide.')
+
+
+def _parse_cursor(cursor):
+    if cursor is None:
+        return None
+    stamp, pk = cursor
+    return datetime.fromisoformat(stamp), int(pk)
+
+
+def _dump_cursor(stamp, pk):
+    return [stamp.isoformat(), pk]
+
+
+def cursors_since(since):
+    """Curseurs équivalents à « tout ce qui a changé après `since` »."""
+    return (since, 0), (since, 0)
+
+
+# ── Lecture ───────────────────────────────────────────────────────
+
+def _after(queryset, field, cursor):
+    if cursor is None:
+        return queryset
+    stamp, pk = cursor
+    return queryset.filter(Q(**{f'{field}__gt': stamp}) | Q(**{field: stamp, 'id__gt': pk}))
+
+
+def _page(queryset, field, cursor, cutoff, limit):
+    queryset = _after(queryset.filter(**{f'{field}__lte': cutoff}), field, cursor)
+    rows = list(queryset.order_by(field, 'id')[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def changes(users_cursor=None, tombstones_cursor=None, limit=None):
+    """
+    Renvoie (comptes modifiés, ids supprimés, jeton suivant, has_more).
+    Sans curseur, on part du début : le premier appel est une synchronisation complète.
+    """
+    limit = limit or get_page_size()
+    cutoff = timezone.now() - timedelta(seconds=get_safety_seconds())
+
+    users, more_users = _page(
+        User.objects.only(*ROW_FIELDS, 'updated_at'), 'updated_at', users_cursor, cutoff, limit,
+    )
+    tombstones, more_deleted = _page(UserTombstone.objects.all(), 'deleted_at', tombstones_cursor, cutoff, limit)
+
+    if users:
+        users_cursor = (users[-1].updated_at, users[-1].id)
+    if tombstones:
+        tombstones_cursor = (tombstones[-1].deleted_at, tombstones[-1].id)
+
+    token = encode_token(
+        _dump_cursor(*users_cursor) if users_cursor else None,
+        _dump_cursor(*tombstones_cursor) if tombstones_cursor else None,
+    )
+    deleted = [tombstone.user_id for tombstone in tombstones]
+    return users, deleted, token, more_users or more_deleted
+
+
+# ── Écriture ──────────────────────────────────────────────────────
+
+def record_deletions(user_ids):
+    UserTombstone.objects.bulk_create([UserTombstone(user_id=user_id) for user_id in user_ids])
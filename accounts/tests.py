@@ -1,3 +1,1469 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.core import mail
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import call_command
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.utils import ConnectionHandler
+from django.db import connection
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from crm_backend.db import pool as db_pool
+
+from .admin import CustomUserAdmin
+from . import benchmarks, export, mail_queue, query_plans, search, stats, tokens
+from . import usernames as usernames_module
+from .hashing import HashMetrics, hashing_pool
+from .management.commands.bench_user_rows import Command as BenchUserRowsCommand
+from .management.commands.explain_user_queries import Command as ExplainUserQueriesCommand
+from .metrics import registry as metrics_registry
+from .password_reset import ResetCodeStore, reset_codes
+from .models import PasswordResetCode, QueuedEmail, User, UserSearchToken, UserSession
+from .rows import select_rows, user_row
+from .seed import seed_users
+from .serializers import LoginSerializer, RegisterSerializer, UserSerializer
+from .checks import check_password_reset_store, check_session_cache, check_token_cache
+from .sessions import PendingRenewals, _flush_on_exit, pending_renewals, revoke_user_sessions
+from .throttling import MemoryBackend, login_throttle
+from .urls import urlpatterns
+
+FAST_HASHING = {
+    'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+    'PASSWORD_HASH_WORKERS': 0,
+}
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 à une itération : un algorithme préféré différent de MD5, sans coût."""
+    iterations = 1
+
+
+_users_select_re = re.compile(r'^SELECT .* FROM [`"]?users[`"]?(\s|$)', re.IGNORECASE | re.DOTALL)
+
+
+def users_selects(captured):
+    """Requêtes SELECT qui lisent la table `users`."""
+    return [q['sql'] for q in captured if _users_select_re.match(q['sql'])]
+
+
+def tearDownModule():
+    # Rien à écrire à l'arrêt du processus : la base de test est détruite.
+    pending_renewals.reset()
+
+
+@override_settings(**FAST_HASHING)
+class LoginQueryCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='amirabenali', email='Amira.Benali@Example.com', password='secret123',
+        )
+
+    def login(self, email, password='secret123'):
+        return self.client.post(
+            reverse('login'), {'email': email, 'password': password}, content_type='application/json',
+        )
+
+    def test_email_is_stored_normalized(self):
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'amira.benali@example.com')
+
+    def test_login_reads_users_table_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.login('AMIRA.benali@example.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(users_selects(ctx.captured_queries)), 1)
+
+    def test_wrong_password_reads_users_table_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.login('amira.benali@example.com', 'mauvais')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['error_type'], 'wrong_password')
+        self.assertEqual(len(users_selects(ctx.captured_queries)), 1)
+
+    def test_unknown_email(self):
+        response = self.login('personne@example.com')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['error_type'], 'not_found')
+
+    def test_login_serializer_single_query(self):
+        serializer = LoginSerializer(data={'email': 'amira.benali@example.com', 'password': 'secret123'})
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data, self.user)
+        self.assertEqual(len(users_selects(ctx.captured_queries)), 1)
+
+    def test_email_is_required(self):
+        for create in (User.objects.create_user, User.objects.create_superuser):
+            with self.assertRaises(ValueError):
+                create('sansemail', email='  ', password='secret123')
+        with self.assertRaises(ValidationError) as ctx:
+            User(username='sansemail', email='').full_clean()
+        self.assertIn('email', ctx.exception.message_dict)
+        add_form = CustomUserAdmin(User, admin.site).get_form(RequestFactory().get('/'))
+        self.assertTrue(add_form.base_fields['email'].required)
+
+    def test_migration_replaces_blank_emails(self):
+        User.objects.filter(pk=self.user.pk).update(email='')
+        import_module('accounts.migrations.0015_user_email_required').fill_blank_emails(apps, None)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, f'compte-{self.user.pk}@email.invalid')
+
+
+@override_settings(**FAST_HASHING)
+class SessionRenewalTests(TestCase):
+
+    def setUp(self):
+        pending_renewals.reset()
+        self.addCleanup(pending_renewals.reset)
+        User.objects.create_user(username='sami', email='sami@example.com', password='secret123')
+        self.client.post(
+            reverse('login'), {'email': 'sami@example.com', 'password': 'secret123'},
+            content_type='application/json',
+        )
+
+    def test_me_does_not_touch_session_table(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('me'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'user_sessions' in q['sql']])
+
+    def test_pending_renewals_are_flushed_in_batch(self):
+        before = UserSession.objects.get().expire_date
+        self.client.get(reverse('me'))
+        self.assertEqual(pending_renewals.flush(), 1)
+        self.assertGreater(UserSession.objects.get().expire_date, before)
+
+    @override_settings(SESSION_FLUSH_INTERVAL=0.05)
+    def test_idle_worker_flushes_on_timer(self):
+        renewals = PendingRenewals()
+        flushed = threading.Event()
+        with mock.patch.object(renewals, 'flush', side_effect=lambda: flushed.set()), \
+                mock.patch('accounts.sessions._table_exists', return_value=True):
+            renewals.add('cle', timezone.now())
+            self.assertTrue(flushed.wait(2))  # sans autre requête
+            renewals.reset()  # annule le minuteur suivant
+
+    def test_exit_flush_skips_missing_table(self):
+        self.client.get(reverse('me'))
+        self.assertEqual(len(pending_renewals), 1)
+        with mock.patch('accounts.sessions._table_exists', return_value=False), \
+                mock.patch.object(pending_renewals, 'flush') as flush:
+            _flush_on_exit()
+        flush.assert_not_called()
+
+    def test_migration_copies_django_sessions(self):
+        user = User.objects.get(username='sami')
+        signed_in = DBSessionStore()
+        signed_in[SESSION_KEY] = str(user.pk)
+        signed_in.create()
+        anonymous = DBSessionStore()
+        anonymous['panier'] = 1
+        anonymous.create()
+        UserSession.objects.all().delete()
+
+        import_module('accounts.migrations.0013_usersession').copy_sessions(apps, None)
+        copied = dict(UserSession.objects.values_list('session_key', 'user_id'))
+        self.assertEqual(copied, {signed_in.session_key: user.pk, anonymous.session_key: None})
+
+    def test_local_cache_is_rejected_for_multiple_workers(self):
+        with override_settings(ACCOUNTS_SINGLE_PROCESS=False):
+            self.assertEqual([e.id for e in check_session_cache(None)], ['accounts.E001'])
+            shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+            with override_settings(CACHES=shared):
+                self.assertEqual(check_session_cache(None), [])
+        self.assertEqual(check_session_cache(None), [])
+
+
+@override_settings(LOGIN_THROTTLE_ENABLED=False, **FAST_HASHING)
+class SessionRevocationTests(TestCase):
+
+    def setUp(self):
+        pending_renewals.reset()
+        self.addCleanup(pending_renewals.reset)
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.admin_client = self.login('admin@example.com')
+        self.user = User.objects.create_user(username='sami', email='sami@example.com', password='secret123')
+        self.devices = [self.login('sami@example.com') for _ in range(2)]
+
+    def login(self, email):
+        client = self.client_class()
+        response = client.post(
+            reverse('login'), {'email': email, 'password': 'secret123'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return client
+
+    def assertLoggedOut(self, *clients):
+        for client in clients:
+            self.assertEqual(client.get(reverse('me')).status_code, 403)
+
+    def test_sessions_are_indexed_by_user(self):
+        self.assertEqual(UserSession.objects.filter(user_id=self.user.id).count(), 2)
+        self.assertEqual(UserSession.objects.filter(user_id=self.admin.id).count(), 1)
+
+    def test_deactivation_revokes_sessions(self):
+        self.admin_client.patch(reverse('toggle_user_status', args=[self.user.id]))
+        self.assertLoggedOut(*self.devices)
+        self.assertEqual(self.admin_client.get(reverse('me')).status_code, 200)
+
+    def test_bulk_deactivation_and_delete_revoke_sessions(self):
+        self.admin_client.patch(
+            reverse('bulk_user_status'), {'ids': [self.user.id], 'is_active': False}, content_type='application/json',
+        )
+        self.assertLoggedOut(*self.devices)
+        self.admin_client.patch(
+            reverse('bulk_user_status'), {'ids': [self.user.id], 'is_active': True}, content_type='application/json',
+        )
+        device = self.login('sami@example.com')
+        self.admin_client.post(
+            reverse('bulk_delete_users'), {'ids': [self.user.id]}, content_type='application/json',
+        )
+        self.assertLoggedOut(device)
+        self.assertFalse(UserSession.objects.filter(user_id=self.user.id).exists())
+
+    def test_delete_revokes_sessions(self):
+        self.admin_client.delete(reverse('delete_user', args=[self.user.id]))
+        self.assertFalse(UserSession.objects.filter(user_id=self.user.id).exists())
+
+    def test_password_change_keeps_only_current_device(self):
+        current, other = self.devices
+        response = current.post(reverse('change_password'), {
+            'old_password': 'secret123', 'new_password': 'nouveau123', 'confirm_password': 'nouveau123',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(current.get(reverse('me')).status_code, 200)
+        self.assertLoggedOut(other)
+        self.assertEqual(UserSession.objects.filter(user_id=self.user.id).count(), 1)
+
+    def test_logout_all(self):
+        response = self.devices[0].post(reverse('logout_all'))
+        self.assertEqual(response.json()['revoked'], 2)
+        self.assertLoggedOut(*self.devices)
+
+    def test_revocation_cost_does_not_depend_on_session_table_size(self):
+        for _ in range(20):
+            self.login('admin@example.com')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(revoke_user_sessions([self.user.id]), 2)
+        self.assertEqual(len(ctx), 2)
+        self.assertNotIn('session_data', ctx.captured_queries[0]['sql'])
+
+
+@override_settings(**FAST_HASHING)
+class HashingPoolTests(TestCase):
+
+    def setUp(self):
+        hashing_pool.shutdown()
+        self.addCleanup(hashing_pool.shutdown)
+        User.objects.create_user(username='nour', email='nour@example.com', password='secret123')
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=0, PASSWORD_HASH_RETRY_AFTER=3)
+    def test_saturated_pool_fails_fast(self):
+        response = self.client.post(
+            reverse('login'), {'email': 'nour@example.com', 'password': 'secret123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+        self.assertEqual(hashing_pool.metrics.snapshot()['rejected'], 1)
+
+    def test_login_rehashes_when_preferred_algorithm_changes(self):
+        hashers = ['accounts.tests.FastPBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(PASSWORD_HASHERS=hashers, PASSWORD_HASH_WORKERS=0):
+            response = self.client.post(
+                reverse('login'), {'email': 'nour@example.com', 'password': 'secret123'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(email='nour@example.com')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1$'))
+        with override_settings(PASSWORD_HASHERS=hashers):
+            self.assertTrue(user.check_password('secret123'))
+
+
+@override_settings(**FAST_HASHING)
+class UserSearchTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.client.force_login(self.admin)
+        self.exact = User.objects.create_user(
+            username='mbenali', email='mb@example.com', first_name='Mohamed', last_name='Benali',
+        )
+        self.prefix = User.objects.create_user(
+            username='mohamedou', email='o.diallo@example.com', first_name='Mohamedou', last_name='Diallo',
+        )
+        self.email_only = User.objects.create_user(
+            username='strabelsi', email='mohamed.trabelsi@example.com', first_name='Sami', last_name='Trabelsi',
+        )
+        self.arabic = User.objects.create_user(
+            username='arabe', email='arabe@example.com', first_name='مُحَمَّد', last_name='العلي',
+        )
+
+    def tokens(self, user):
+        return set(UserSearchToken.objects.filter(user=user).values_list('token', flat=True))
+
+    def listed(self, term):
+        response = self.client.get(reverse('list_users'), {'search': term})
+        return {row['email'] for row in response.json()['users']}
+
+    def test_index_follows_save_and_delete(self):
+        self.exact.last_name = 'Gharbi'
+        self.exact.save(update_fields=['last_name'])
+        self.assertIn('gharbi', self.tokens(self.exact))
+        self.assertNotIn('benali', self.tokens(self.exact))
+        with CaptureQueriesContext(connection) as ctx:
+            self.exact.save(update_fields=['phone'])
+        self.assertFalse([q for q in ctx.captured_queries if 'user_search_tokens' in q['sql']])
+        user_id = self.exact.pk
+        self.exact.delete()
+        self.assertFalse(UserSearchToken.objects.filter(user_id=user_id).exists())
+
+    def test_ranking_order(self):
+        ranked = search.ranked_search('mohamed')
+        self.assertEqual(
+            [user_id for user_id, _ in ranked], [self.exact.pk, self.prefix.pk, self.email_only.pk],
+        )
+        self.assertEqual([score for _, score in ranked], [6, 3, 2])
+
+    def test_non_latin_names_are_indexed(self):
+        self.assertEqual(self.tokens(self.arabic) & {'محمد', 'العلي'}, {'محمد', 'العلي'})
+        self.assertEqual(self.listed('محمد'), {'arabe@example.com'})
+
+    def test_query_without_terms_matches_nothing(self):
+        self.assertEqual(self.listed('@'), set())
+        self.assertEqual(self.listed('moh'), {
+            'mb@example.com', 'o.diallo@example.com', 'mohamed.trabelsi@example.com',
+        })
+
+    def test_prefix_not_infix(self):
+        self.assertEqual(self.listed('xample'), set())
+        self.assertEqual(len(self.listed('exam')), 5)
+
+
+@override_settings(IMPORT_CHUNK_SIZE=2, **FAST_HASHING)
+class ImportUsersTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        User.objects.create_user(username='alibenali', email='pris@example.com', password='secret123')
+        self.client.force_login(self.admin)
+
+    def test_csv_import_reports_rows_and_resolves_collisions(self):
+        body = (
+            'first_name,last_name,email,role,password\n'
+            'Ali,Ben Ali,ali1@example.com,etudiant,secret123\n'
+            'Ali,Ben Ali,ali2@example.com,etudiant,secret123\n'
+            'Ali,Ben Ali,PRIS@example.com,etudiant,secret123\n'
+            'A,B,invalide,etudiant,court\n'
+        )
+        response = self.client.generic('POST', reverse('import_users'), body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (2, 2))
+        self.assertEqual(sorted(e['ligne'] for e in data['errors']), [4, 5])
+        self.assertEqual(User.objects.filter(username__in=['alibenali1', 'alibenali2']).count(), 2)
+
+    def test_over_long_values_are_row_errors(self):
+        long_name = 'A' * 151
+        body = (
+            'first_name,last_name,email,phone,role,password\n'
+            f'Nour,Gharbi,nour@example.com,{"2" * 21},etudiant,secret123\n'
+            f'{long_name},Gharbi,long@example.com,,etudiant,secret123\n'
+            f'{"B" * 150},{"C" * 150},court@example.com,,etudiant,secret123\n'
+        )
+        response = self.client.generic('POST', reverse('import_users'), body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (1, 2))
+        self.assertEqual({e['ligne']: set(e['errors']) for e in data['errors']}, {2: {'phone'}, 3: {'first_name'}})
+        created = User.objects.get(email='court@example.com')
+        self.assertLessEqual(len(created.username), 150)
+
+    def test_forbidden_for_non_admin(self):
+        self.client.force_login(User.objects.get(username='alibenali'))
+        response = self.client.generic('POST', reverse('import_users'), '', content_type='text/csv')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(**FAST_HASHING)
+class UsernameAllocationTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        for i, username in enumerate(('amira', 'amira1', 'amira3', 'amirab')):
+            User.objects.create_user(username=username, email=f'amira{i}@example.com', password='secret123')
+
+    def test_allocator_reads_prefix_once_and_fills_gaps(self):
+        with CaptureQueriesContext(connection) as ctx:
+            usernames = usernames_module.allocate_usernames(['amira', 'amira', 'amira', 'sami'])
+        self.assertEqual(usernames, ['amira2', 'amira4', 'amira5', 'sami'])
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_collision_is_retried_with_next_free_name(self):
+        user = User(email='nouvelle@example.com')
+        with mock.patch.object(usernames_module, 'allocate_username', side_effect=['amira1', 'amira2']):
+            usernames_module.save_with_unique_username(user, 'amira')
+        self.assertEqual(User.objects.get(email='nouvelle@example.com').username, 'amira2')
+
+    def test_email_conflict_is_reported_not_retried(self):
+        with self.assertRaises(usernames_module.EmailTaken):
+            usernames_module.save_with_unique_username(User(email='AMIRA0@example.com'), 'amira')
+        self.assertEqual(User.objects.by_email('amira0@example.com').count(), 1)
+
+    def test_concurrent_email_creation_is_a_400(self):
+        self.client.force_login(self.admin)
+        by_email = User.objects.by_email
+        missed = [User.objects.none()]  # la vérification préalable ne voit pas encore le compte
+        with mock.patch.object(User.objects, 'by_email', side_effect=lambda email: missed.pop() if missed else by_email(email)):
+            response = self.client.post(reverse('create_user'), {
+                'first_name': 'Amira', 'last_name': 'Ben Ali', 'email': 'amira0@example.com',
+                'role': 'etudiant', 'password': 'secret123',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json()['errors'])
+
+    def test_register_serializer_rejects_taken_email(self):
+        serializer = RegisterSerializer(data={'email': 'Amira0@Example.com', 'password': 'secret123'})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('email', serializer.errors)
+
+
+@override_settings(BULK_DELETE_CHUNK_SIZE=2, BULK_STATUS_CHUNK_SIZE=2, **FAST_HASHING)
+class BulkActionsTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.students = [
+            User.objects.create_user(username=f'etu{i}', email=f'etu{i}@example.com', password='secret123')
+            for i in range(5)
+        ]
+        self.client.force_login(self.admin)
+
+    def test_bulk_status_by_filter_skips_requesting_admin(self):
+        response = self.client.patch(
+            reverse('bulk_user_status'), {'filters': {'is_active': 'true'}, 'is_active': False},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['updated'], 5)
+        self.admin.refresh_from_db()
+        self.assertTrue(self.admin.is_active)
+        self.assertFalse(User.objects.filter(role='etudiant', is_active=True).exists())
+
+    def test_bulk_status_updates_in_chunks_and_notifies_after_commit(self):
+        with CaptureQueriesContext(connection) as ctx, \
+                self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(
+                reverse('bulk_user_status'), {'filters': {'role': 'etudiant'}, 'is_active': False},
+                content_type='application/json',
+            )
+            self.assertEqual(mail.outbox, [])  # rien d'envoyé avant la validation
+        self.assertEqual(response.json()['updated'], 5)
+        updates = [q for q in ctx if q['sql'].startswith('UPDATE "users"')]
+        self.assertEqual(len(updates), 3)  # lots de 2
+        self.assertEqual(len(callbacks), 3)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(u.email for u in self.students))
+
+    def test_bulk_delete_by_ids_in_chunks(self):
+        ids = [u.id for u in self.students[:3]] + [self.admin.id]
+        response = self.client.post(reverse('bulk_delete_users'), {'ids': ids}, content_type='application/json')
+        self.assertEqual(response.json()['deleted'], 3)
+        self.assertTrue(User.objects.filter(id=self.admin.id).exists())
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_empty_selection_is_rejected(self):
+        response = self.client.post(reverse('bulk_delete_users'), {'filters': {}}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(**FAST_HASHING)
+class RolePermissionTests(TestCase):
+
+    def test_superuser_role_is_synced_on_save(self):
+        user = User.objects.create_superuser(username='root', email='root@example.com', password='secret123')
+        self.assertEqual(user.role, 'super_admin')
+
+    def test_role_checks_do_not_write(self):
+        user = User.objects.create_superuser(username='root', email='root@example.com', password='secret123')
+        User.objects.filter(pk=user.pk).update(role='etudiant')
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('list_users'))
+        self.assertTrue(response.json()['can_manage'])
+        self.assertFalse([q for q in ctx.captured_queries if re.match(r'UPDATE [`"]?users[`"]? ', q['sql'])])
+
+    def test_non_admin_is_forbidden(self):
+        user = User.objects.create_user(username='etu', email='etu@example.com', password='secret123')
+        self.client.force_login(user)
+        response = self.client.delete(reverse('delete_user', args=[user.id]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_forbidden_body_keeps_success_message_shape(self):
+        user = User.objects.create_user(username='etu', email='etu@example.com', password='secret123')
+        self.client.force_login(user)
+        expected = {'success': False, 'message': 'Accès refusé. Réservé au Super Administrateur.'}
+        for response in (
+            self.client.post(reverse('create_user'), {}, content_type='application/json'),
+            self.client.patch(reverse('toggle_user_status', args=[user.id])),
+            self.client.post(reverse('bulk_delete_users'), {'ids': [user.id]}, content_type='application/json'),
+        ):
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(response.json(), expected)
+
+
+@override_settings(**FAST_HASHING)
+class UserStatsTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.students = [
+            User.objects.create_user(username=f'etu{i}', email=f'etu{i}@example.com', password='secret123')
+            for i in range(3)
+        ]
+        self.client.force_login(self.admin)
+
+    def stats(self):
+        return self.client.get(reverse('user_stats'), {'days': 7}).json()
+
+    def test_counters_follow_signals_and_bulk_paths(self):
+        self.client.patch(reverse('toggle_user_status', args=[self.students[0].id]))
+        self.client.patch(
+            reverse('bulk_user_status'), {'ids': [self.students[1].id], 'is_active': False},
+            content_type='application/json',
+        )
+        self.client.post(reverse('bulk_delete_users'), {'ids': [self.students[2].id]}, content_type='application/json')
+
+        data = self.stats()
+        self.assertEqual(data['roles']['etudiant'], {'active': 0, 'inactive': 2, 'total': 2})
+        self.assertEqual(data['roles']['super_admin']['active'], 1)
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['signups'][-1]['count'], 3)
+
+    def test_rebuild_matches_incremental_counters(self):
+        before = self.stats()
+        call_command('rebuild_user_stats', stdout=io.StringIO())
+        self.assertEqual(self.stats(), before)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2, **FAST_HASHING)
+class ExportUsersTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.piege = User.objects.create_user(
+            username='piege', email='piege@example.com', password='secret123',
+            first_name='=HYPERLINK("http://x")', last_name='@SUM(A1)', phone='+21620000000',
+        )
+        User.objects.create_user(username='sami', email='sami@example.com', password='secret123', last_name='-Ben')
+        self.client.force_login(self.admin)
+
+    def export(self, output):
+        response = self.client.get(reverse('export_users'), {'output': output})
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_content_and_headers(self):
+        response, body = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="utilisateurs.csv"')
+        self.assertTrue(body.startswith('\ufeff'))
+        header, *lines = csv.reader(io.StringIO(body[1:]))
+        self.assertEqual(tuple(header), export.EXPORT_FIELDS)
+        self.assertEqual([line[1] for line in lines], ['admin', 'piege', 'sami'])  # par lots de 2
+        row = dict(zip(header, lines[1]))
+        self.assertEqual(row['first_name'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(row['last_name'], "'@SUM(A1)")
+        self.assertEqual(row['phone'], "'+21620000000")
+        self.assertEqual(dict(zip(header, lines[2]))['last_name'], "'-Ben")
+        self.assertEqual(row['email'], 'piege@example.com')
+
+    def test_ndjson_keeps_raw_values(self):
+        response, body = self.export('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="utilisateurs.ndjson"')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['username'] for row in rows], ['admin', 'piege', 'sami'])
+        self.assertEqual(set(rows[1]), set(export.EXPORT_FIELDS))
+        self.assertEqual((rows[1]['first_name'], rows[1]['phone']), ('=HYPERLINK("http://x")', '+21620000000'))
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('export_users'), {'output': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(**FAST_HASHING)
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.student = User.objects.create_user(username='etu', email='etu@example.com', password='secret123')
+        self.client.force_login(self.admin)
+
+    def test_me_not_modified(self):
+        etag = self.client.get(reverse('me'))['ETag']
+        response = self.client.get(reverse('me'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_users_revalidates_after_change(self):
+        etag = self.client.get(reverse('list_users'))['ETag']
+        self.assertEqual(self.client.get(reverse('list_users'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.patch(reverse('toggle_user_status', args=[self.student.id]))
+        response = self.client.get(reverse('list_users'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_users_revalidates_after_deletion(self):
+        etag = self.client.get(reverse('list_users'))['ETag']
+        self.client.delete(reverse('delete_user', args=[self.student.id]))
+        self.assertEqual(self.client.get(reverse('list_users'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_users_validators_do_not_scan_filtered_set(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('list_users'))
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('MAX(', sql)
+
+
+@override_settings(SYNC_SAFETY_SECONDS=0, **FAST_HASHING)
+class UserChangesTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.students = [
+            User.objects.create_user(username=f'etu{i}', email=f'etu{i}@example.com', password='secret123')
+            for i in range(3)
+        ]
+        self.client.force_login(self.admin)
+
+    def sync(self, **params):
+        return self.client.get(reverse('user_changes'), params).json()
+
+    def test_initial_sync_is_paged(self):
+        first = self.sync(limit=3)
+        self.assertTrue(first['has_more'])
+        second = self.sync(token=first['token'], limit=3)
+        self.assertFalse(second['has_more'])
+        ids = [u['id'] for u in first['users'] + second['users']]
+        self.assertEqual(sorted(ids), sorted(User.objects.values_list('id', flat=True)))
+
+    def test_delta_contains_only_changes_and_deletions(self):
+        token = self.sync()['token']
+        self.client.patch(reverse('toggle_user_status', args=[self.students[0].id]))
+        self.client.delete(reverse('delete_user', args=[self.students[1].id]))
+
+        delta = self.sync(token=token)
+        self.assertEqual([u['id'] for u in delta['users']], [self.students[0].id])
+        self.assertEqual(delta['deleted'], [self.students[1].id])
+        self.assertEqual(self.sync(token=delta['token'])['users'], [])
+
+    def test_tampered_token_is_rejected(self):
+        response = self.client.get(reverse('user_changes'), {'token': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.client.force_login(self.admin)
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get(reverse('me'))
+        self.client.get(reverse('me'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('accounts_requests_total{view="me",status="200"} 2', body)
+        self.assertIn('accounts_request_duration_seconds_count{view="me"} 2', body)
+        self.assertIn('accounts_request_duration_quantile_seconds{view="me",quantile="0.99"}', body)
+        self.assertIn('accounts_password_hash_completed_total', body)
+
+    def test_metrics_require_super_admin(self):
+        student = User.objects.create_user(username='etu', email='etu@example.com', password='secret123')
+        self.client.force_login(student)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+
+@override_settings(**FAST_HASHING)
+class BenchmarkSuiteTests(TestCase):
+
+    def test_suite_reports_every_scenario(self):
+        admin = benchmarks.prepare_data(50)
+        result = benchmarks.run_suite(admin, requests=3, warmup=1)
+        self.assertEqual(list(result), [
+            'login', 'me', 'list_users', 'list_users_search',
+            'create_user', 'toggle_user_status', 'delete_user',
+        ])
+        self.assertEqual(result['create_user']['statuses'], {'201': 3})
+        self.assertEqual(result['delete_user']['statuses'], {'200': 3})
+        self.assertEqual(set(result['me']['latency_ms']), {'mean', 'max', 'p50', 'p95', 'p99'})
+
+
+# ── Budgets de requêtes SQL par vue ───────────────────────────────
+#
+# nom d'URL → (requêtes max, répétitions max d'une même requête).
+# Une requête est « répétée » quand le même SQL revient avec d'autres
+# paramètres : c'est la signature d'un N+1. Les SAVEPOINT comptent.
+# Les répétitions à 2 : deux lignes de compteurs, ou l'utilisateur
+# connecté puis l'utilisateur visé.
+
+QUERY_BUDGETS = {
+    'me':                 (1, 1),
+    'login':              (9, 1),
+    'logout':             (3, 1),
+    'logout_all':         (4, 1),
+    'token_refresh':      (1, 1),
+    'password_reset_request': (2, 1),
+    'password_reset_verify':  (0, 0),
+    'password_reset_confirm': (3, 1),
+    'change_password':    (10, 1),
+    'list_users':         (2, 1),
+    'export_users':       (2, 1),
+    'user_changes':       (3, 1),
+    'user_stats':         (3, 1),
+    'search_users':       (3, 1),
+    'create_user':        (15, 1),
+    'import_users':       (12, 2),
+    'toggle_user_status': (9, 2),
+    'delete_user':        (14, 2),
+    'bulk_user_status':   (11, 1),
+    'bulk_delete_users':  (19, 2),
+    'metrics':            (2, 1),
+}
+BUDGET_TABLE_SIZES = (10, 300)
+
+# Tables que l'API n'a aucune raison de lire (ex. `fields='__all__'` sur User).
+FORBIDDEN_TABLES = ('auth_group', 'auth_permission', 'users_groups', 'users_user_permissions')
+
+_sql_literal_re = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def sql_shape(sql):
+    """SQL sans ses valeurs littérales, et avec les listes IN (...) réduites."""
+    shape = _sql_literal_re.sub('?', sql)
+    return re.sub(r'\((?:\s*\?\s*,)+\s*\?\s*\)', '(?)', shape)
+
+
+# Les e-mails passent par la file comme en production : leur INSERT est compté.
+@override_settings(EXPORT_CHUNK_SIZE=10000, EMAIL_BACKEND='accounts.mail_queue.QueuedEmailBackend', **FAST_HASHING)
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.driver = benchmarks.EndpointDriver(self.admin, self.client, 'secret123')
+
+    def measure(self, name):
+        self.driver.call(name)()  # premier appel : compteurs et caches créés à la demande
+        send = self.driver.call(name)
+        with CaptureQueriesContext(connection) as captured:
+            with self.captureOnCommitCallbacks(execute=True):  # avis envoyés après validation
+                response = send()
+        if hasattr(response, 'status_code'):
+            self.assertLess(response.status_code, 400, name)
+        return [q['sql'] for q in captured]
+
+    def test_user_serializer_is_one_query_for_many_users(self):
+        seed_users(50)
+        with CaptureQueriesContext(connection) as captured:
+            UserSerializer(User.objects.all(), many=True).data
+        self.assertEqual(len(captured), 1)
+        self.assertNotIn('password', UserSerializer.Meta.fields)
+
+    def test_every_endpoint_has_a_budget(self):
+        self.assertEqual({p.name for p in urlpatterns}, set(QUERY_BUDGETS))
+
+    def test_budgets_hold_at_every_table_size(self):
+        counts = {}
+        for size in BUDGET_TABLE_SIZES:
+            seed_users(size - User.objects.count())
+            search.rebuild_index()
+            stats.rebuild()
+            for name, (max_queries, max_repeats) in QUERY_BUDGETS.items():
+                with self.subTest(endpoint=name, users=size):
+                    queries = self.measure(name)
+                    self.assertLessEqual(len(queries), max_queries, '\n'.join(queries))
+                    shapes = {}
+                    for sql in queries:
+                        shapes[sql_shape(sql)] = shapes.get(sql_shape(sql), 0) + 1
+                        if sql.lstrip().upper().startswith('SELECT'):
+                            for table in FORBIDDEN_TABLES:
+                                self.assertNotRegex(sql, rf'[`"]{table}[`"]', name)
+                    worst = max(shapes.items(), key=lambda item: item[1], default=('', 0))
+                    self.assertLessEqual(worst[1], max_repeats, worst[0])
+                    counts.setdefault(name, set()).add(len(queries))
+        # O(1) : même nombre de requêtes quelle que soit la taille de la table.
+        for name, seen in counts.items():
+            self.assertEqual(len(seen), 1, f'{name} : {sorted(seen)} requêtes selon la taille')
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'email': (3, 300), 'ip': (5, 60)}, **FAST_HASHING)
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        login_throttle.reset()
+        User.objects.create_user(username='sami', email='sami@example.com', password='secret123')
+
+    def tearDown(self):
+        login_throttle.reset()
+
+    def attempt(self, email='sami@example.com', password='mauvais'):
+        return self.client.post(
+            reverse('login'), {'email': email, 'password': password}, content_type='application/json',
+        )
+
+    def test_rejects_before_any_query(self):
+        for _ in range(3):
+            self.assertEqual(self.attempt().status_code, 401)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.attempt(password='secret123')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(captured), 0)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_ip_limit_spans_emails(self):
+        for i in range(5):
+            self.attempt(email=f'inconnu{i}@example.com')
+        self.assertEqual(self.attempt(email='autre@example.com').status_code, 429)
+
+    def test_spoofed_forwarded_for_does_not_reset_ip_limit(self):
+        def attempt(i, forwarded):
+            return self.client.post(
+                reverse('login'), {'email': f'inconnu{i}@example.com', 'password': 'mauvais'},
+                content_type='application/json', REMOTE_ADDR='1.2.3.4', HTTP_X_FORWARDED_FOR=forwarded,
+            )
+
+        for i in range(5):
+            attempt(i, f'9.9.9.{i}')
+        self.assertEqual(attempt(5, '9.9.9.5').status_code, 429)
+
+        login_throttle.reset()
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            # Derrière un proxy : seule l'adresse qu'il a ajoutée (la dernière) compte.
+            for i in range(5):
+                attempt(i, f'9.9.9.{i}, 5.5.5.5')
+            self.assertEqual(attempt(5, '9.9.9.5, 5.5.5.5').status_code, 429)
+            self.assertEqual(attempt(6, '9.9.9.5, 6.6.6.6').status_code, 404)  # compte inconnu, non limité
+
+    @override_settings(LOGIN_THROTTLE_BACKEND='accounts.throttling.CacheBackend')
+    def test_cache_backend(self):
+        for _ in range(3):
+            self.attempt(email='cache@example.com')
+        self.assertEqual(self.attempt(email='cache@example.com').status_code, 429)
+
+    @override_settings(LOGIN_THROTTLE_MAX_KEYS=100)
+    def test_memory_backend_is_bounded(self):
+        backend = MemoryBackend()
+        backend.incr([f'k{i}' for i in range(500)], 60, 0)
+        self.assertEqual(len(backend), 100)
+        self.assertEqual(backend.counts(['k499', 'k0'], 60, 0), {'k499': (0, 1), 'k0': (0, 0)})
+
+
+@override_settings(ROOT_URLCONF=benchmarks.async_urlconf(), **FAST_HASHING)
+class AsyncViewsTests(TestCase):
+
+    def setUp(self):
+        login_throttle.reset()
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        for i in range(12):
+            User.objects.create_user(username=f'etu{i}', email=f'etu{i}@example.com', password='secret123')
+
+    async def test_same_payload_as_sync_views(self):
+        await self.client.aforce_login(self.admin)
+        async_client = AsyncClient()
+        async_client.cookies = self.client.cookies
+        for name, params in (('me', {}), ('list_users', {'page_size': 5})):
+            with override_settings(ROOT_URLCONF='crm_backend.urls'):
+                expected = (await async_client.get(reverse(name), params)).json()
+            response = await async_client.get(reverse(name), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), expected)
+
+    async def test_login_me_logout(self):
+        client = AsyncClient()
+        url = reverse('login')
+        wrong = await client.post(url, {'email': 'admin@example.com', 'password': 'mauvais'}, content_type='application/json')
+        self.assertEqual(wrong.json()['error_type'], 'wrong_password')
+
+        response = await client.post(url, {'email': 'ADMIN@example.com', 'password': 'secret123'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await client.get(reverse('me'))).json()['email'], 'admin@example.com')
+
+        self.assertEqual((await client.post(reverse('logout'))).status_code, 200)
+        self.assertEqual((await client.get(reverse('me'))).status_code, 403)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=0, PASSWORD_HASH_RETRY_AFTER=3)
+    async def test_saturated_pool_fails_fast(self):
+        hashing_pool.shutdown()
+        self.addCleanup(hashing_pool.shutdown)
+        self.addCleanup(setattr, hashing_pool, 'metrics', hashing_pool.metrics)
+        hashing_pool.metrics = HashMetrics()
+        response = await AsyncClient().post(
+            reverse('login'), {'email': 'admin@example.com', 'password': 'secret123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+        self.assertIn('detail', response.json())
+        self.assertEqual(hashing_pool.metrics.snapshot()['rejected'], 1)
+
+
+# ── Pool de connexions (fausse connexion DB-API) ──────────────────
+
+class FakeConnection:
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def ping(self):
+        if not self.alive:
+            raise OSError('MySQL server has gone away')
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ConnectionPoolTests(TestCase):
+
+    def make_pool(self, **kwargs):
+        self.opened = []
+
+        def connect():
+            self.opened.append(FakeConnection())
+            return self.opened[-1]
+
+        return db_pool.ConnectionPool(connect, **kwargs)
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool(max_size=2)
+        first = pool.checkout()
+        pool.checkin(first)
+        self.assertIs(pool.checkout(), first)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_dead_connection_is_replaced(self):
+        pool = self.make_pool(max_size=2)
+        conn = pool.checkout()
+        pool.checkin(conn)
+        conn.alive = False
+        replacement = pool.checkout()
+        self.assertIsNot(replacement, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.snapshot()['discarded'], 1)
+
+    def test_saturation_waits_then_times_out(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        conn = pool.checkout()
+        self.assertEqual(pool.snapshot()['saturation'], 1.0)
+        with self.assertRaises(db_pool.PoolTimeout):
+            pool.checkout()
+
+        threading.Timer(0.02, pool.checkin, args=[conn]).start()
+        pool.timeout = 5
+        self.assertIs(pool.checkout(), conn)
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot['timeouts'], snapshot['waits']), (1, 1))
+        self.assertGreater(snapshot['wait_seconds_max'], 0)
+
+    def test_idle_connections_expire_above_min_size(self):
+        clock = FakeClock()
+        pool = self.make_pool(min_size=1, max_size=3, idle_timeout=60, clock=clock)
+        pool.fill()
+        conns = [pool.checkout(), pool.checkout()]
+        for conn in conns:
+            pool.checkin(conn)
+        clock.now = 120
+        pool.checkout()
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot['size'], snapshot['expired']), (1, 1))
+
+
+class PooledWrapper(db_pool.PooledDatabaseWrapperMixin, SQLiteDatabaseWrapper):
+    pool_health_check = staticmethod(db_pool.select_one)
+
+
+class PooledDatabaseWrapperTests(TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        handler = ConnectionHandler({'default': {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': self.path,
+            'OPTIONS': {'pool': {'max_size': 2}},
+        }})
+        self.wrapper = PooledWrapper(handler.settings['default'], alias='pooled')
+
+    def tearDown(self):
+        self.wrapper.pool.close_all()
+        db_pool._pools.pop('pooled', None)
+        os.remove(self.path)
+
+    def test_close_returns_connection_to_pool(self):
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.close()
+        self.assertEqual(self.wrapper.pool.snapshot()['idle'], 1)
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(self.wrapper.connection, raw)
+        self.assertEqual(self.wrapper.pool.snapshot()['created'], 1)
+        self.wrapper.close()
+
+    def test_new_database_name_gets_a_new_pool(self):
+        # Comme lors de la création de la base de test : NAME change, l'alias non.
+        fd, other = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, other)
+        self.wrapper.ensure_connection()
+        old_pool = self.wrapper.pool
+        self.wrapper.close()
+
+        self.wrapper.settings_dict['NAME'] = other
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA database_list')
+            self.assertEqual(cursor.fetchone()[2], other)
+        self.assertIsNot(self.wrapper.pool, old_pool)
+        self.assertTrue(old_pool.retired)
+        self.assertEqual(old_pool.snapshot()['size'], 0)
+        self.wrapper.close()
+
+
+class UserRowsTests(TestCase):
+
+    def test_projection_matches_instance_formatting(self):
+        User.objects.create_user(username='mbenali', email='m@example.com', first_name='Mohamed', last_name='Benali')
+        User.objects.create_user(username='sans_nom', email='s@example.com', first_name='Sami')
+        User.objects.create_user(username='x', email='x@example.com')
+        expected = [BenchUserRowsCommand().legacy_row(user) for user in User.objects.order_by('id')]
+        self.assertEqual([user_row(row) for row in select_rows(User.objects.order_by('id'))], expected)
+
+
+@override_settings(**FAST_HASHING)
+class UserCursorPaginationTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        for i in range(6):
+            User.objects.create_user(username=f'etu{i}', email=f'etu{i}@example.com', password='secret123')
+        User.objects.update(updated_at=timezone.now())  # égalité partout : l'ordre repose sur `id`
+        self.ids = list(User.objects.order_by('id').values_list('id', flat=True))
+        self.client.force_login(self.admin)
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or reverse('list_users'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, first, link):
+        pages = [first]
+        while pages[-1][link]:
+            pages.append(self.get(pages[-1][link]))
+        return pages
+
+    def rows(self, pages):
+        return [(u['numero'], u['id']) for page in pages for u in page['users']]
+
+    def test_next_links_cover_every_row_once_with_continuous_numbering(self):
+        pages = self.walk(self.get(page_size=3), 'next')
+        self.assertEqual([page['count'] for page in pages], [3, 3, 1])
+        self.assertEqual(self.rows(pages), [(f'{n:02d}', pk) for n, pk in enumerate(self.ids, start=1)])
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_links_return_the_same_pages(self):
+        forward = self.walk(self.get(page_size=3), 'next')
+        backward = self.walk(forward[-1], 'previous')
+        self.assertEqual(self.rows(reversed(backward)), self.rows(forward))
+        self.assertIsNone(backward[-1]['previous'])
+
+    def test_rows_changed_between_pages_are_not_repeated(self):
+        first = self.get(page_size=3)
+        User.objects.filter(id=first['users'][0]['id']).update(first_name='Modifié', updated_at=timezone.now())
+        rest = self.walk(self.get(first['next']), 'next')
+        self.assertEqual([pk for _, pk in self.rows([first] + rest)], self.ids)
+
+    def test_invalid_or_tampered_cursor_is_a_404(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        for cursor in ('abc', '%%%', encode('x:1:0'), encode('n:-1:0'), encode('n:1'), encode('n:un:0')):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('list_users'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(LOGIN_THROTTLE_ENABLED=False, EXPORT_CHUNK_SIZE=10000, **FAST_HASHING)
+class QueryPlanTests(TestCase):
+
+    def test_plan_steps_are_classified(self):
+        steps = query_plans._sqlite_steps([
+            (2, 0, 0, 'SEARCH users USING INDEX users_role_id_idx (role=?)'),
+            (3, 0, 0, 'SCAN U0 USING COVERING INDEX user_search_token_idx'),
+            (4, 0, 0, 'SCAN users'),
+            (5, 0, 0, 'USE TEMP B-TREE FOR ORDER BY'),
+        ])
+        self.assertEqual(
+            [(s.table, s.access) for s in steps],
+            [('users', query_plans.LOOKUP), ('U0', query_plans.INDEX_SCAN), ('users', query_plans.FULL_SCAN)],
+        )
+        columns = ['id', 'select_type', 'table', 'type', 'key', 'rows', 'Extra']
+        steps = query_plans._mysql_steps([
+            (1, 'SIMPLE', 'users', 'ref', 'users_role_id_idx', 40, 'Using where'),
+            (1, 'SIMPLE', 'user_search_tokens', 'ALL', None, 9000, None),
+            (1, 'PRIMARY', '<subquery2>', 'eq_ref', '<auto_key>', 1, None),
+        ], columns)
+        self.assertEqual(
+            [(s.table, s.access) for s in steps],
+            [('users', query_plans.LOOKUP), ('user_search_tokens', query_plans.FULL_SCAN)],
+        )
+
+    def test_no_endpoint_scans_the_users_table(self):
+        admin = benchmarks.prepare_data(300)
+        query_plans.analyze(['users', 'user_search_tokens'])
+        report = ExplainUserQueriesCommand().explain_endpoints(admin)
+        self.assertEqual(set(report), {p.name for p in urlpatterns})
+        for name, statements in report.items():
+            for sql, steps in statements:
+                for step in steps:
+                    if step.table == 'users':
+                        self.assertNotEqual(step.access, query_plans.FULL_SCAN, f'{name}: {sql}')
+
+
+@override_settings(ACCOUNTS_TOKEN_AUTH=True, LOGIN_THROTTLE_ENABLED=False, **FAST_HASHING)
+class TokenAuthTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.user = User.objects.create_user(
+            username='sami', email='sami@example.com', password='secret123', first_name='Sami',
+        )
+
+    def login(self, email):
+        response = self.client.post(
+            reverse('login'), {'email': email, 'password': 'secret123'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def bearer(self, token):
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def test_login_issues_tokens_without_session(self):
+        body = self.login('sami@example.com')
+        self.assertEqual(body['user']['email'], 'sami@example.com')
+        self.assertEqual(body['expires_in'], 300)
+        self.assertFalse(UserSession.objects.exists())
+
+    def test_me_and_role_checks_without_queries(self):
+        access = self.login('sami@example.com')['access']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('me'), **self.bearer(access))
+            forbidden = self.client.get(reverse('export_users'), **self.bearer(access))
+        self.assertEqual(len(ctx), 0)
+        self.assertEqual(response.json()['first_name'], 'Sami')
+        self.assertEqual(forbidden.status_code, 403)
+
+        admin_access = self.login('admin@example.com')['access']
+        response = self.client.get(reverse('list_users'), **self.bearer(admin_access))
+        self.assertTrue(response.json()['can_manage'])
+
+    def test_invalid_tokens_are_rejected(self):
+        body = self.login('sami@example.com')
+        self.assertEqual(self.client.get(reverse('me'), **self.bearer(body['access'] + 'x')).status_code, 403)
+        # Un jeton de rafraîchissement n'ouvre pas l'API.
+        self.assertEqual(self.client.get(reverse('me'), **self.bearer(body['refresh'])).status_code, 403)
+        with override_settings(ACCESS_TOKEN_LIFETIME=-1):
+            expired = tokens.issue(self.user)['access']
+        self.assertEqual(self.client.get(reverse('me'), **self.bearer(expired)).status_code, 403)
+
+    def test_refresh_rotates_and_rereads_account(self):
+        refresh = self.login('sami@example.com')['refresh']
+        User.objects.filter(pk=self.user.pk).update(role='formateur')
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(tokens.decode(response.json()['access'])['role'], 'formateur')
+        reused = self.client.post(reverse('token_refresh'), {'refresh': refresh}, content_type='application/json')
+        self.assertEqual(reused.status_code, 401)
+
+    def test_concurrent_refreshes_only_first_wins(self):
+        refresh = self.login('sami@example.com')['refresh']
+        # Deux requêtes simultanées : toutes deux passent decode() avant que l'une ne consomme le jeton.
+        first, second = tokens.decode(refresh, tokens.REFRESH), tokens.decode(refresh, tokens.REFRESH)
+        self.assertTrue(tokens.consume(first))
+        self.assertFalse(tokens.consume(second))
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_local_revocation_cache_is_rejected_for_multiple_workers(self):
+        with override_settings(ACCOUNTS_SINGLE_PROCESS=False):
+            self.assertEqual([e.id for e in check_token_cache(None)], ['accounts.E003'])
+            with override_settings(ACCOUNTS_TOKEN_AUTH=False):
+                self.assertEqual(check_token_cache(None), [])
+
+    def test_logout_revokes_presented_tokens(self):
+        body = self.login('sami@example.com')
+        self.client.post(reverse('logout'), {'refresh': body['refresh']}, content_type='application/json',
+                         **self.bearer(body['access']))
+        self.assertEqual(self.client.get(reverse('me'), **self.bearer(body['access'])).status_code, 403)
+        response = self.client.post(reverse('token_refresh'), {'refresh': body['refresh']}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_and_password_change_revoke_tokens(self):
+        body = self.login('sami@example.com')
+        other = self.login('sami@example.com')
+        response = self.client.post(reverse('change_password'), {
+            'old_password': 'secret123', 'new_password': 'nouveau123', 'confirm_password': 'nouveau123',
+        }, content_type='application/json', **self.bearer(body['access']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('me'), **self.bearer(other['access'])).status_code, 403)
+        access = response.json()['access']
+        self.assertEqual(self.client.get(reverse('me'), **self.bearer(access)).status_code, 200)
+
+        admin = self.login('admin@example.com')['access']
+        self.client.patch(reverse('toggle_user_status', args=[self.user.id]), **self.bearer(admin))
+        self.assertEqual(self.client.get(reverse('me'), **self.bearer(access)).status_code, 403)
+
+    @override_settings(ROOT_URLCONF=benchmarks.async_urlconf())
+    async def test_async_views_accept_access_tokens(self):
+        access = tokens.issue(self.user)['access']
+        # Sans signal : le profil du jeton reste celui de l'émission.
+        await User.objects.filter(pk=self.user.pk).aupdate(first_name='Modifié')
+        response = await AsyncClient().get(reverse('me'), headers={'Authorization': f'Bearer {access}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['first_name'], 'Sami')
+
+
+@override_settings(PASSWORD_RESET_MAX_ATTEMPTS=3, **FAST_HASHING)
+class PasswordResetTests(TestCase):
+
+    def setUp(self):
+        reset_codes.reset()
+        caches['default'].clear()  # CacheBackend (défaut) : pas d'état d'un test à l'autre
+        self.user = User.objects.create_user(username='sami', email='sami@example.com', password='secret123')
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), data, content_type='application/json')
+
+    def request_code(self, email='sami@example.com'):
+        mail.outbox = []
+        self.assertEqual(self.post('password_reset_request', {'email': email}).status_code, 200)
+        return re.search(r'\b(\d{6})\b', mail.outbox[0].body).group(1) if mail.outbox else None
+
+    def confirm(self, code, password='nouveau123'):
+        return self.post('password_reset_confirm', {
+            'email': 'sami@example.com', 'code': code, 'new_password': password, 'confirm_password': password,
+        })
+
+    def test_reset_flow(self):
+        self.assertIsNone(self.request_code('inconnu@example.com'))
+        code = self.request_code('Sami@Example.com')
+        self.assertEqual(self.post('password_reset_verify', {'email': 'sami@example.com', 'code': code}).status_code, 200)
+        self.assertEqual(self.confirm(code).status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('nouveau123'))
+        # Usage unique ; rien n'est écrit dans l'ancienne table.
+        self.assertEqual(self.confirm(code).status_code, 400)
+        self.assertFalse(PasswordResetCode.objects.exists())
+
+    def test_resend_interval(self):
+        self.assertIsNotNone(self.request_code())
+        self.assertIsNone(self.request_code())
+        with override_settings(PASSWORD_RESET_RESEND_INTERVAL=0):
+            self.assertIsNotNone(self.request_code())
+
+    @override_settings(PASSWORD_RESET_RESEND_INTERVAL=0)
+    def test_wrong_codes_lock_until_expiry(self):
+        code = self.request_code()
+        wrong = '000000' if code != '000000' else '111111'
+        for _ in range(3):
+            self.assertEqual(self.confirm(wrong).status_code, 400)
+        self.assertEqual(self.confirm(code).status_code, 400)
+        # Le compteur survit au renvoi : pas de nouveau code avant l'expiration.
+        self.assertIsNone(self.request_code())
+
+    @override_settings(PASSWORD_RESET_TTL=0, PASSWORD_RESET_BACKEND='accounts.password_reset.MemoryBackend')
+    def test_codes_expire(self):
+        code = self.request_code()
+        self.assertEqual(self.confirm(code).status_code, 400)
+        self.assertEqual(len(reset_codes.backend), 0)
+
+    def test_cache_backend(self):
+        with override_settings(PASSWORD_RESET_BACKEND='accounts.password_reset.CacheBackend'):
+            code = reset_codes.issue('sami@example.com')
+            self.assertFalse(reset_codes.check('sami@example.com', '12345x'))
+            self.assertTrue(reset_codes.check('sami@example.com', code, consume=True))
+            self.assertFalse(reset_codes.check('sami@example.com', code))
+
+    def test_default_store_is_shared_between_workers(self):
+        code = ResetCodeStore().issue('sami@example.com')  # un worker émet…
+        self.assertTrue(ResetCodeStore().check('sami@example.com', code, consume=True))  # …un autre vérifie
+
+    def test_process_local_store_is_rejected_for_multiple_workers(self):
+        with override_settings(ACCOUNTS_SINGLE_PROCESS=False):
+            self.assertEqual([e.id for e in check_password_reset_store(None)], ['accounts.E002'])
+            with override_settings(PASSWORD_RESET_BACKEND='accounts.password_reset.MemoryBackend'):
+                self.assertEqual([e.id for e in check_password_reset_store(None)], ['accounts.E002'])
+            shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+            with override_settings(CACHES=shared):
+                self.assertEqual(check_password_reset_store(None), [])
+
+    def test_purge_command_deletes_legacy_rows_in_batches(self):
+        for code in ('111111', '222222', '333333'):
+            PasswordResetCode.objects.create(user=self.user, email=self.user.email, code=code)
+        self.assertTrue(PasswordResetCode.objects.first().is_valid())
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('purge_password_reset_codes', batch_size=2, stdout=out)
+        self.assertIn('3 code(s)', out.getvalue())
+        self.assertFalse(PasswordResetCode.objects.exists())
+        self.assertEqual(len([q for q in ctx if q['sql'].startswith('DELETE')]), 2)
+
+
+class RecordingBackend(LocmemBackend):
+    """locmem qui compte les connexions ouvertes et peut échouer sur commande."""
+    opened = 0
+    fail = False
+
+    def open(self):
+        RecordingBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if RecordingBackend.fail:
+            raise ConnectionError('SMTP indisponible')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='accounts.mail_queue.QueuedEmailBackend',
+    MAIL_QUEUE_DELIVERY_BACKEND='accounts.tests.RecordingBackend',
+    MAIL_QUEUE_RETRY_BASE=30, MAIL_QUEUE_MAX_ATTEMPTS=2,
+    **FAST_HASHING,
+)
+class MailQueueTests(TestCase):
+
+    def setUp(self):
+        RecordingBackend.opened = 0
+        RecordingBackend.fail = False
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret123', role='super_admin',
+        )
+        self.client.force_login(self.admin)
+
+    def test_views_enqueue_instead_of_sending(self):
+        response = self.client.post(reverse('create_user'), {
+            'first_name': 'Sami', 'last_name': 'Trabelsi', 'email': 'sami@example.com',
+            'phone': '20000000', 'role': 'etudiant', 'password': 'secret123',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.client.patch(reverse('toggle_user_status', args=[response.json()['user']['id']]))
+        self.assertEqual(mail.outbox, [])
+        subjects = [row.message['subject'] for row in QueuedEmail.objects.order_by('id')]
+        self.assertEqual(subjects, ['Votre compte a été créé', 'Votre compte a été désactivé'])
+
+    def test_bulk_status_notices_are_one_insert(self):
+        ids = [User.objects.create_user(username=f'u{i}', email=f'u{i}@example.com').id for i in range(3)]
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('bulk_user_status'), {'ids': ids, 'is_active': False},
+                              content_type='application/json')
+        self.assertEqual(QueuedEmail.objects.count(), 3)
+        self.assertEqual(len([q for q in ctx if 'INSERT INTO "mail_queue"' in q['sql']]), 1)
+
+    def test_worker_sends_each_batch_over_one_connection(self):
+        for i in range(5):
+            mail.EmailMessage(f'Message {i}', 'Corps', None, [f'dest{i}@example.com'],
+                              attachments=[('a.bin', b'\x00\x01', 'application/octet-stream')]).send()
+        out = io.StringIO()
+        call_command('send_queued_mail', batch_size=2, stdout=out)
+        self.assertEqual(RecordingBackend.opened, 3)
+        self.assertEqual([m.subject for m in mail.outbox], [f'Message {i}' for i in range(5)])
+        self.assertEqual(mail.outbox[0].attachments[0].content, b'\x00\x01')
+        self.assertFalse(QueuedEmail.objects.exists())
+        self.assertIn('5 e-mail(s) envoyé(s)', out.getvalue())
+
+    def test_failures_back_off_then_give_up(self):
+        mail.send_mail('Bienvenue', 'Corps', None, ['sami@example.com'])
+        RecordingBackend.fail = True
+        self.assertEqual(mail_queue.send_batch(), (0, 1))
+        item = QueuedEmail.objects.get()
+        self.assertEqual(item.attempts, 1)
+        self.assertIn('SMTP indisponible', item.last_error)
+        self.assertEqual(mail_queue.send_batch(), (0, 0))  # pas encore dû
+        self.assertEqual(mail_queue.depth(), {'pending': 1, 'due': 0, 'failed': 0})
+
+        QueuedEmail.objects.update(next_attempt_at=item.created_at)
+        self.assertEqual(mail_queue.send_batch(), (0, 1))
+        self.assertEqual(mail_queue.depth(), {'pending': 0, 'due': 0, 'failed': 1})
+        self.assertEqual([mail_queue.retry_delay(n) for n in (1, 2, 3)], [30, 60, 120])
+
+        RecordingBackend.fail = False
+        self.assertEqual(mail_queue.retry_failed(), 1)
+        self.assertEqual(mail_queue.send_batch(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_metrics_expose_queue_depth(self):
+        mail.send_mail('Bienvenue', 'Corps', None, ['sami@example.com'])
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('accounts_mail_queue_pending 1', body)
+        self.assertIn('accounts_mail_queue_failed 0', body)
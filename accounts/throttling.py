@@ -0,0 +1,210 @@
+"""
+Limitation des tentatives de connexion, par e-mail et par adresse IP.
+
+Fenêtre glissante approchée : pour chaque clé on ne garde que deux
+compteurs (fenêtre courante et précédente) et l'estimation vaut
+
+    précédente × (part de la fenêtre précédente encore couverte) + courante
+
+La vérification a lieu avant toute requête SQL et tout hachage : une rafale
+de « credential stuffing » est refusée (429 + Retry-After) sans coûter de
+PBKDF2. Les tentatives refusées ne sont pas comptées, pour ne pas prolonger
+indéfiniment le blocage d'un compte visé.
+
+Backends (LOGIN_THROTTLE_BACKEND) :
+- `MemoryBackend` : par processus, LRU borné à LOGIN_THROTTLE_MAX_KEYS clés ;
+- `CacheBackend` : cache Django partagé entre workers (Redis, Memcached…).
+
+L'adresse IP est celle de DRF (`get_ident`), réglée par NUM_PROXIES : avec
+0, REMOTE_ADDR ; derrière N proxys, la N-ième entrée depuis la fin de
+X-Forwarded-For, celle qu'a ajoutée le proxy. Sans réglage, DRF prendrait
+l'en-tête entier, qu'un client change à chaque requête.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from .models import normalize_email_address
+
+DEFAULT_RATES = {
+    'email': (10, 300),   # 10 tentatives / 5 min pour un même compte
+    'ip': (60, 60),       # 60 tentatives / min depuis une même adresse
+}
+
+
+def is_enabled():
+    return getattr(settings, 'LOGIN_THROTTLE_ENABLED', True)
+
+
+def get_rates():
+    return getattr(settings, 'LOGIN_THROTTLE_RATES', DEFAULT_RATES)
+
+
+def get_max_keys():
+    return getattr(settings, 'LOGIN_THROTTLE_MAX_KEYS', 50000)
+
+
+def make_key(scope, value):
+    """Empreinte courte et de taille fixe (e-mails longs, clés de cache sûres)."""
+    return hashlib.blake2b(f'{scope}:{value}'.encode(), digest_size=12).hexdigest()
+
+
+# ── Backends ──────────────────────────────────────────────────────
+
+class MemoryBackend:
+    """Compteurs en mémoire du processus : clé → (n° de fenêtre, précédente, courante)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _current(self, key, index):
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0, 0
+        stored, previous, current = entry
+        if stored == index:
+            return previous, current
+        if stored == index - 1:
+            return current, 0
+        return 0, 0
+
+    def counts(self, keys, window, now):
+        index = int(now // window)
+        with self._lock:
+            return {key: self._current(key, index) for key in keys}
+
+    def incr(self, keys, window, now):
+        index = int(now // window)
+        with self._lock:
+            for key in keys:
+                previous, current = self._current(key, index)
+                self._entries[key] = (index, previous, current + 1)
+                self._entries.move_to_end(key)
+            while len(self._entries) > get_max_keys():
+                self._entries.popitem(last=False)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheBackend:
+    """Compteurs dans le cache partagé : une entrée par clé et par fenêtre."""
+
+    prefix = 'accounts.throttle:'
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'LOGIN_THROTTLE_CACHE_ALIAS', 'default')]
+
+    def _name(self, key, index):
+        return f'{self.prefix}{key}:{index}'
+
+    def counts(self, keys, window, now):
+        index = int(now // window)
+        names = [self._name(key, i) for key in keys for i in (index - 1, index)]
+        values = self.cache.get_many(names)
+        return {
+            key: (values.get(self._name(key, index - 1), 0), values.get(self._name(key, index), 0))
+            for key in keys
+        }
+
+    def incr(self, keys, window, now):
+        index = int(now // window)
+        for key in keys:
+            name = self._name(key, index)
+            # add() est atomique : crée le compteur s'il n'existe pas encore.
+            self.cache.add(name, 0, timeout=2 * window)
+            try:
+                self.cache.incr(name)
+            except ValueError:
+                # Entrée expirée entre add() et incr().
+                self.cache.set(name, 1, timeout=2 * window)
+
+    def reset(self):
+        pass
+
+
+# ── Limiteur ──────────────────────────────────────────────────────
+
+def estimate(previous, current, elapsed, window):
+    return previous * (1 - elapsed / window) + current
+
+
+def retry_after(previous, current, elapsed, window, limit):
+    """Secondes avant qu'une nouvelle tentative soit acceptée (estimation ≤ limit - 1)."""
+    target = limit - 1
+    if current <= target:
+        # Seule la part de la fenêtre précédente doit encore décroître.
+        return window * (1 - (target - current) / previous) - elapsed
+    # Il faut attendre que la fenêtre courante devienne la précédente et décroisse.
+    return (window - elapsed) + window * (1 - target / current)
+
+
+class LoginThrottle:
+
+    def __init__(self):
+        self._backend = None
+        self._backend_path = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        path = getattr(settings, 'LOGIN_THROTTLE_BACKEND', 'accounts.throttling.MemoryBackend')
+        with self._lock:
+            if self._backend is None or self._backend_path != path:
+                self._backend = import_string(path)()
+                self._backend_path = path
+            return self._backend
+
+    def check(self, request, email):
+        """
+        Enregistre une tentative ; renvoie None si elle est autorisée, sinon le
+        nombre de secondes à attendre. Aucune requête SQL.
+        """
+        if not is_enabled():
+            return None
+        scopes = {
+            'email': make_key('email', normalize_email_address(email)),
+            'ip': make_key('ip', BaseThrottle().get_ident(request)),
+        }
+        now = time.time()
+        backend = self.backend
+        wait = None
+        allowed = []
+        for scope, key in scopes.items():
+            limit, window = get_rates()[scope]
+            previous, current = backend.counts([key], window, now)[key]
+            elapsed = now % window
+            if estimate(previous, current, elapsed, window) + 1 > limit:
+                wait = max(wait or 0, retry_after(previous, current, elapsed, window, limit))
+            else:
+                allowed.append((key, window))
+        if wait is not None:
+            return max(math.ceil(wait), 1)
+        for key, window in allowed:
+            backend.incr([key], window, now)
+        return None
+
+    async def acheck(self, request, email):
+        """Variante async : un backend partagé (cache réseau) est interrogé hors de la boucle."""
+        if isinstance(self.backend, MemoryBackend):
+            return self.check(request, email)
+        return await sync_to_async(self.check, thread_sensitive=False)(request, email)
+
+    def reset(self):
+        self.backend.reset()
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,198 @@
+"""
+Jetons signés sans état (mode optionnel, ACCOUNTS_TOKEN_AUTH).
+
+- Jeton d'accès : courte durée (ACCESS_TOKEN_LIFETIME). Il porte l'id, le
+  rôle effectif, `is_active` et le profil affiché par `me`. Il est vérifié
+  par signature HMAC avec une clé locale (ACCOUNTS_TOKEN_KEY, SECRET_KEY par
+  défaut) : ni session ni `users` à lire.
+- Jeton de rafraîchissement : longue durée (REFRESH_TOKEN_LIFETIME), à usage
+  unique. `token_refresh` relit le compte en base et renvoie une nouvelle paire.
+
+Liste de révocation compacte, dans le cache TOKEN_CACHE_ALIAS :
+- `jti:<id>` : jeton révoqué individuellement (logout, rotation), gardé
+  jusqu'à l'expiration du jeton ;
+- `user:<id>` : instant de coupure ; tout jeton du compte émis avant est
+  refusé (désactivation, suppression, changement de mot de passe, logout_all).
+Une vérification fait une seule lecture `get_many`. Le cache doit être
+partagé entre les workers (check `accounts.E003`), sinon une révocation
+n'est vue que par le worker qui l'a écrite.
+"""
+import secrets
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+
+from .permissions import get_effective_role
+from .rows import PROFILE_FIELDS
+from .sessions import revoke_user_sessions
+
+SALT = 'accounts.tokens'
+KEY_PREFIX = 'accounts.tokens:'
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def is_enabled():
+    return getattr(settings, 'ACCOUNTS_TOKEN_AUTH', False)
+
+
+def get_lifetime(kind):
+    if kind == ACCESS:
+        return getattr(settings, 'ACCESS_TOKEN_LIFETIME', 300)
+    return getattr(settings, 'REFRESH_TOKEN_LIFETIME', 7 * 86400)
+
+
+def get_cache():
+    return caches[getattr(settings, 'TOKEN_CACHE_ALIAS', 'default')]
+
+
+def _key():
+    return getattr(settings, 'ACCOUNTS_TOKEN_KEY', None) or settings.SECRET_KEY
+
+
+def _fallback_keys():
+    return getattr(settings, 'ACCOUNTS_TOKEN_FALLBACK_KEYS', [])
+
+
+# ── Émission et vérification ──────────────────────────────────────
+
+def _encode(user, kind, now):
+    claims = {
+        'typ': kind,
+        'jti': secrets.token_hex(8),
+        'iat': round(now, 3),
+        'exp': int(now + get_lifetime(kind)),
+        'id': user.pk,
+    }
+    if kind == ACCESS:
+        claims.update({field: getattr(user, field) for field in PROFILE_FIELDS})
+        claims['role'] = get_effective_role(user)
+        claims['is_active'] = user.is_active
+        claims['updated_at'] = user.updated_at.isoformat()
+    return signing.dumps(claims, key=_key(), salt=SALT, compress=True)
+
+
+def issue(user):
+    """Nouvelle paire de jetons pour `user` (aucune requête SQL)."""
+    now = time.time()
+    return {
+        'access': _encode(user, ACCESS, now),
+        'refresh': _encode(user, REFRESH, now),
+        'expires_in': get_lifetime(ACCESS),
+    }
+
+
+def _unsign(token, kind):
+    try:
+        claims = signing.loads(token, key=_key(), salt=SALT, fallback_keys=_fallback_keys())
+    except signing.BadSignature:
+        raise InvalidToken('Jeton invalide.')
+    if claims.get('typ') != kind or claims['exp'] <= time.time():
+        raise InvalidToken('Jeton invalide ou expiré.')
+    return claims
+
+
+def _revocation_keys(claims):
+    return KEY_PREFIX + 'jti:' + claims['jti'], KEY_PREFIX + f"user:{claims['id']}"
+
+
+def _check_revocations(claims, found):
+    jti_key, user_key = _revocation_keys(claims)
+    if jti_key in found or claims['iat'] < found.get(user_key, 0):
+        raise InvalidToken('Jeton révoqué.')
+    return claims
+
+
+def decode(token, kind=ACCESS):
+    """Claims d'un jeton valide et non révoqué, sinon InvalidToken."""
+    claims = _unsign(token, kind)
+    return _check_revocations(claims, get_cache().get_many(_revocation_keys(claims)))
+
+
+async def adecode(token, kind=ACCESS):
+    claims = _unsign(token, kind)
+    return _check_revocations(claims, await get_cache().aget_many(_revocation_keys(claims)))
+
+
+def bearer_token(request):
+    """Jeton de l'en-tête `Authorization: Bearer …`, sinon None."""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    return token.strip()
+
+
+class TokenUser:
+    """Utilisateur reconstruit depuis les claims d'un jeton d'accès, sans requête SQL."""
+    is_authenticated = True
+    is_anonymous = False
+    is_superuser = False
+    is_staff = False
+
+    def __init__(self, claims):
+        self.claims = claims
+        self.pk = self.id = claims['id']
+        for field in PROFILE_FIELDS:
+            setattr(self, field, claims[field])
+        self.is_active = claims['is_active']
+        self.updated_at = datetime.fromisoformat(claims['updated_at'])
+
+    def __str__(self):
+        return self.username
+
+
+# ── Révocation ────────────────────────────────────────────────────
+
+def revoke(claims):
+    """Révoque un jeton jusqu'à son expiration."""
+    remaining = claims['exp'] - time.time()
+    if remaining > 0:
+        get_cache().set(_revocation_keys(claims)[0], 1, timeout=int(remaining) + 1)
+
+
+def consume(claims):
+    """
+    Marque un jeton à usage unique comme utilisé. `cache.add` est atomique :
+    de deux rafraîchissements concurrents du même jeton, seul le premier
+    obtient True.
+    """
+    remaining = claims['exp'] - time.time()
+    if remaining <= 0:
+        return False
+    return get_cache().add(_revocation_keys(claims)[0], 1, timeout=int(remaining) + 1)
+
+
+def revoke_refresh(token):
+    """Révoque un jeton de rafraîchissement présenté au logout (ignoré s'il est invalide)."""
+    try:
+        revoke(_unsign(token, REFRESH))
+    except InvalidToken:
+        pass
+
+
+def revoke_users(user_ids):
+    """Coupure : les jetons déjà émis pour ces comptes sont refusés."""
+    now = round(time.time(), 3)  # même arrondi que `iat` : un jeton émis ensuite reste valide
+    get_cache().set_many(
+        {KEY_PREFIX + f'user:{user_id}': now for user_id in user_ids},
+        timeout=get_lifetime(REFRESH),
+    )
+
+
+def revoke_user_access(user_ids):
+    """
+    Sessions et jetons des comptes `user_ids` (liste ou queryset
+    `values_list('id', flat=True)`). Renvoie le nombre de sessions supprimées.
+    """
+    revoked = revoke_user_sessions(user_ids)
+    if is_enabled():
+        revoke_users(list(user_ids))
+    return revoked
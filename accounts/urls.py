@@ -1,16 +1,41 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
-urlpatterns = [
-    # ── Auth ──────────────────────────────────────────────────────
-    path('me/',              views.me,              name='me'),
-    path('login/',           views.login,           name='login'),
-    path('logout/',          views.logout_view,     name='logout'),
-    path('change-password/', views.change_password, name='change_password'),
 
-    # ── Gestion des comptes (super_admin) ─────────────────────────
-    path('users/',                              views.list_users,         name='list_users'),
-    path('users/create/', views.create_user, name='create_user'),
-    path('users/<int:user_id>/toggle-status/', views.toggle_user_status, name='toggle_user_status'),
-    path('users/<int:user_id>/delete/',        views.delete_user,        name='delete_user'),
-]
\ No newline at end of file
+def build_urlpatterns(async_views_enabled=False):
+    # Sous ASGI, me / login / logout / list_users ont une variante native async.
+    hot = async_views if async_views_enabled else views
+    return [
+        # ── Auth ──────────────────────────────────────────────────────
+        path('me/',              hot.me,                name='me'),
+        path('login/',           hot.login,             name='login'),
+        path('logout/',          hot.logout_view,       name='logout'),
+        path('logout-all/',      views.logout_all,      name='logout_all'),
+        path('token/refresh/',   views.token_refresh,   name='token_refresh'),
+
+        # ── Mot de passe oublié ───────────────────────────────────────
+        path('password-reset/',         views.password_reset_request, name='password_reset_request'),
+        path('password-reset/verify/',  views.password_reset_verify,  name='password_reset_verify'),
+        path('password-reset/confirm/', views.password_reset_confirm, name='password_reset_confirm'),
+        path('change-password/', views.change_password, name='change_password'),
+
+        # ── Gestion des comptes (super_admin) ─────────────────────────
+        path('users/',                              hot.list_users,           name='list_users'),
+        path('users/export/',                       views.export_users,       name='export_users'),
+        path('users/changes/',                      views.user_changes,       name='user_changes'),
+        path('users/stats/',                        views.user_stats,         name='user_stats'),
+        path('users/search/',                       views.search_users,       name='search_users'),
+        path('users/create/', views.create_user, name='create_user'),
+        path('users/import/',                       views.import_users,       name='import_users'),
+        path('users/<int:user_id>/toggle-status/', views.toggle_user_status, name='toggle_user_status'),
+        path('users/<int:user_id>/delete/',        views.delete_user,        name='delete_user'),
+        path('users/bulk/status/',                  views.bulk_user_status,   name='bulk_user_status'),
+        path('users/bulk/delete/',                  views.bulk_delete_users,  name='bulk_delete_users'),
+
+        # ── Supervision (super_admin) ─────────────────────────────────
+        path('metrics/',                            views.metrics,            name='metrics'),
+    ]
+
+
+urlpatterns = build_urlpatterns(getattr(settings, 'ACCOUNTS_ASYNC_VIEWS', False))
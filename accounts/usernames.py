@@ -0,0 +1,90 @@
+"""
+Attribution de usernames uniques.
+
+Au lieu de tester `base`, `base1`, `base2`… par autant de `exists()`, on lit
+en une requête (range scan sur l'index unique de `username`) tous les
+usernames qui commencent par la base, puis on choisit le plus petit suffixe
+libre en mémoire. La contrainte d'unicité reste l'arbitre final : en cas
+d'insertion concurrente, on recalcule et on réessaie.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import User
+
+MAX_ATTEMPTS = 3
+
+
+def _taken_usernames(bases):
+    query = reduce(or_, (Q(username__startswith=base) for base in bases))
+    return set(User.objects.filter(query).values_list('username', flat=True))
+
+
+def _next_free(base, taken):
+    username, counter = base, 1
+    while username in taken:
+        username = f"{base}{counter}"
+        counter += 1
+    return username
+
+
+def allocate_usernames(bases):
+    """
+    Attribue un username libre à chaque base (dans l'ordre), en une seule
+    requête pour tout le lot. Deux bases identiques reçoivent des suffixes
+    différents.
+    """
+    if not bases:
+        return []
+    taken = _taken_usernames(set(bases))
+    result = []
+    for base in bases:
+        username = _next_free(base, taken)
+        taken.add(username)
+        result.append(username)
+    return result
+
+
+def allocate_username(base):
+    return allocate_usernames([base])[0]
+
+
+class EmailTaken(ValueError):
+    """L'INSERT a échoué sur l'index unique `users_email_ci_unique`."""
+
+
+def save_user(user):
+    """
+    Insère `user`. Un conflit sur l'e-mail (création concurrente de la même
+    adresse) lève EmailTaken, que l'appelant transforme en erreur 400 ; les
+    autres violations de contrainte remontent telles quelles.
+    """
+    try:
+        with transaction.atomic():
+            user.save(force_insert=True)
+    except IntegrityError:
+        user.pk = None
+        if User.objects.by_email(user.email).exists():
+            raise EmailTaken(user.email) from None
+        raise
+    return user
+
+
+def save_with_unique_username(user, base):
+    """
+    Attribue un username libre à `user` puis l'insère. Si un autre processus
+    a pris le même username entre-temps, l'INSERT échoue sur la contrainte
+    unique : on recalcule et on réessaie (MAX_ATTEMPTS fois). EmailTaken si
+    c'est l'e-mail qui est déjà pris.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        user.username = allocate_username(base)
+        try:
+            return save_user(user)
+        except IntegrityError:
+            username_taken = User.objects.filter(username=user.username).exists()
+            if not username_taken or attempt == MAX_ATTEMPTS - 1:
+                raise
@@ -0,0 +1,93 @@
+"""
+Nettoyage et validation des données d'un compte, partagés par `create_user`
+et l'import en masse. Aucune requête SQL ici : l'unicité de l'e-mail est
+vérifiée par l'appelant (une requête unitaire ou une requête par lot).
+"""
+import re
+
+from .models import User
+
+EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+VALID_ROLES = [r[0] for r in User.ROLE_CHOICES]
+
+EMAIL_TAKEN_MESSAGE = 'Un compte avec cet e-mail existe déjà.'
+
+# Longueurs des colonnes : au-delà, MySQL (mode strict) lève DataError à l'INSERT.
+MAX_LENGTHS = {
+    field: User._meta.get_field(field).max_length
+    for field in ('first_name', 'last_name', 'email', 'phone')
+}
+# Place gardée pour le suffixe numérique ajouté en cas de collision.
+USERNAME_BASE_LENGTH = User._meta.get_field('username').max_length - 10
+
+
+def _text(data, key):
+    value = data.get(key, '')
+    return '' if value is None else str(value)
+
+
+def clean_user_payload(data):
+    """
+    Renvoie (données nettoyées, erreurs par champ).
+
+    Champs : first_name, last_name, email, phone, role, is_active, password.
+    """
+    first_name = _text(data, 'first_name').strip()
+    last_name  = _text(data, 'last_name').strip()
+    email      = _text(data, 'email').strip().lower()
+    phone      = _text(data, 'phone').strip()
+    role       = _text(data, 'role').strip()
+    is_active  = data.get('is_active', True)
+    password   = _text(data, 'password')
+
+    # Convertit is_active si envoyé en string depuis un formulaire
+    if isinstance(is_active, str):
+        is_active = is_active.lower() in ('true', '1', 'actif')
+
+    errors = {}
+
+    if not first_name:
+        errors['first_name'] = 'Le prénom est obligatoire.'
+    elif len(first_name) < 2:
+        errors['first_name'] = 'Le prénom doit contenir au moins 2 caractères.'
+
+    if not last_name:
+        errors['last_name'] = 'Le nom est obligatoire.'
+    elif len(last_name) < 2:
+        errors['last_name'] = 'Le nom doit contenir au moins 2 caractères.'
+
+    if not email:
+        errors['email'] = "L'adresse e-mail est obligatoire."
+    elif not EMAIL_REGEX.match(email):
+        errors['email'] = "Format d'e-mail invalide."
+
+    if not role:
+        errors['role'] = 'Le rôle est obligatoire.'
+    elif role not in VALID_ROLES:
+        errors['role'] = f'Rôle invalide. Valeurs acceptées : {", ".join(VALID_ROLES)}.'
+
+    if not password:
+        errors['password'] = 'Le mot de passe est obligatoire.'
+    elif len(password) < 8:
+        errors['password'] = 'Le mot de passe doit contenir au moins 8 caractères.'
+
+    for field, value in (('first_name', first_name), ('last_name', last_name), ('email', email), ('phone', phone)):
+        if field not in errors and len(value) > MAX_LENGTHS[field]:
+            errors[field] = f'{MAX_LENGTHS[field]} caractères au maximum.'
+
+    cleaned = {
+        'first_name': first_name,
+        'last_name':  last_name,
+        'email':      email,
+        'phone':      phone,
+        'role':       role,
+        'is_active':  bool(is_active),
+        'password':   password,
+    }
+    return cleaned, errors
+
+
+def base_username(first_name, last_name, email):
+    """Username de base : prénom + nom en minuscules, sinon partie locale de l'e-mail."""
+    base = re.sub(r'[^a-z0-9]', '', f"{first_name}{last_name}".lower()) or email.split('@')[0]
+    return base[:USERNAME_BASE_LENGTH]
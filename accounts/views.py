@@ -1,172 +1,400 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
-from .serializers import LoginSerializer, ChangePasswordSerializer
+from crm_backend.db.pool import pools_snapshot
+from .serializers import LoginSerializer, ChangePasswordSerializer, PasswordResetConfirmSerializer
 from .models import User
-import re
-
-def is_super_admin(user):
-    if not user.is_authenticated:
-        return False
-    if user.role == 'super_admin':
-        return True
-    if user.is_superuser:
-        User.objects.filter(pk=user.pk).update(role='super_admin')
-        user.role = 'super_admin'
-        return True
-    return False
+from .permissions import IsSuperAdmin, is_super_admin
+from .pagination import UserRowPagination
+from .metrics import registry as metrics_registry
+from .password_reset import get_ttl as reset_code_ttl, reset_codes
+from .sessions import pending_renewals
+from .throttling import login_throttle
+from .conditional import instance_validators, not_modified, page_validators, set_validators
+from . import search as user_search
+from . import hashing
+from . import mail_queue
+from . import notifications
+from . import rows
+from . import stats
+from . import tokens
+from . import sync as user_sync
+from .validation import EMAIL_REGEX, EMAIL_TAKEN_MESSAGE, base_username, clean_user_payload
+from .usernames import EmailTaken, save_with_unique_username
+from .bulk import BulkSelectionError, bulk_delete, bulk_set_active, filter_users, resolve_selection
+from .export import FORMATS as EXPORT_FORMATS, iter_export
+from .imports import CSV_CONTENT_TYPES, NDJSON_CONTENT_TYPES, UserImporter, iter_rows
 
 
 # ── AUTH ──────────────────────────────────────────────────────────
 
+def _login_error(error, field, error_type):
+    return {'success': False, 'error': error, 'field': field, 'error_type': error_type}
+
+
+def _login_input_error(email, password):
+    """(corps, statut) si la saisie est invalide, sinon None. Aucune requête SQL."""
+    if not email:
+        return _login_error("L'email est requis", 'email', 'required'), status.HTTP_400_BAD_REQUEST
+    if not EMAIL_REGEX.match(email):
+        return _login_error("Format d'email invalide", 'email', 'invalid_format'), status.HTTP_400_BAD_REQUEST
+    if not password:
+        return _login_error('Le mot de passe est requis', 'password', 'required'), status.HTTP_400_BAD_REQUEST
+    if len(password) < 3:
+        return (
+            _login_error('Le mot de passe doit contenir au moins 3 caractères', 'password', 'too_short'),
+            status.HTTP_400_BAD_REQUEST,
+        )
+    return None
+
+
+def _login_throttled(wait):
+    body = dict(
+        _login_error(f'Trop de tentatives de connexion. Réessayez dans {wait} s.', 'general', 'throttled'),
+        retry_after=wait,
+    )
+    return body, status.HTTP_429_TOO_MANY_REQUESTS, {'Retry-After': str(wait)}
+
+
+LOGIN_INACTIVE = (
+    _login_error("Ce compte est désactivé. Contactez l'administrateur.", 'general', 'inactive'),
+    status.HTTP_401_UNAUTHORIZED,
+)
+LOGIN_WRONG_PASSWORD = (
+    _login_error('Mot de passe incorrect', 'password', 'wrong_password'), status.HTTP_401_UNAUTHORIZED,
+)
+LOGIN_NOT_FOUND = (
+    _login_error('Aucun compte trouvé avec cet email', 'email', 'not_found'), status.HTTP_404_NOT_FOUND,
+)
+
+
+def _login_success(user):
+    body = {'success': True, 'message': 'Connexion réussie', 'user': rows.profile(user)}
+    if tokens.is_enabled():
+        body.update(tokens.issue(user))
+    return body
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
     email = request.data.get('email', '').strip()
     password = request.data.get('password', '')
-    
-    if not email:
-        return Response({
-            'success': False, 'error': "L'email est requis",
-            'field': 'email', 'error_type': 'required'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(email_regex, email):
-        return Response({
-            'success': False, 'error': "Format d'email invalide",
-            'field': 'email', 'error_type': 'invalid_format'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    if not password:
-        return Response({
-            'success': False, 'error': 'Le mot de passe est requis',
-            'field': 'password', 'error_type': 'required'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    if len(password) < 3:
-        return Response({
-            'success': False,
-            'error': 'Le mot de passe doit contenir au moins 3 caractères',
-            'field': 'password', 'error_type': 'too_short'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
+
+    error = _login_input_error(email, password)
+    if error is not None:
+        return Response(error[0], status=error[1])
+
+    # Avant toute requête SQL et tout hachage (429 + Retry-After).
+    wait = login_throttle.check(request, email)
+    if wait is not None:
+        body, code, headers = _login_throttled(wait)
+        return Response(body, status=code, headers=headers)
+
     try:
-        user = User.objects.get(email=email)
-        if not user.is_active:
-            return Response({
-                'success': False,
-                'error': "Ce compte est désactivé. Contactez l'administrateur.",
-                'field': 'general', 'error_type': 'inactive'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        authenticated_user = authenticate(username=user.username, password=password)
-        if authenticated_user:
-            auth_login(request, authenticated_user)
-            return Response({
-                'success': True, 'message': 'Connexion réussie',
-                'user': {
-                    'id': user.id, 'username': user.username,
-                    'email': user.email, 'first_name': user.first_name,
-                    'last_name': user.last_name, 'role': user.role, 'phone': user.phone,
-                }
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                'success': False, 'error': 'Mot de passe incorrect',
-                'field': 'password', 'error_type': 'wrong_password'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-            
+        # Une seule requête : l'instance chargée est réutilisée par le backend.
+        user = User.objects.get_by_email(email)
     except User.DoesNotExist:
-        return Response({
-            'success': False, 'error': 'Aucun compte trouvé avec cet email',
-            'field': 'email', 'error_type': 'not_found'
-        }, status=status.HTTP_404_NOT_FOUND)
+        return Response(LOGIN_NOT_FOUND[0], status=LOGIN_NOT_FOUND[1])
+    if not user.is_active:
+        return Response(LOGIN_INACTIVE[0], status=LOGIN_INACTIVE[1])
+
+    authenticated_user = authenticate(request, user=user, password=password)
+    if not authenticated_user:
+        return Response(LOGIN_WRONG_PASSWORD[0], status=LOGIN_WRONG_PASSWORD[1])
+    if not tokens.is_enabled():
+        auth_login(request, authenticated_user)
+    return Response(_login_success(user), status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout_view(request):
+    if isinstance(request.user, tokens.TokenUser):
+        # Jeton d'accès présenté et, s'il est fourni, jeton de rafraîchissement.
+        tokens.revoke(request.auth)
+        tokens.revoke_refresh(str(request.data.get('refresh', '')))
     auth_logout(request)
     return Response({'success': True, 'message': 'Deconnexion reussie'}, status=status.HTTP_200_OK)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_all(request):
+    """Déconnexion de tous les appareils : sessions et jetons du compte, dont les courants."""
+    revoked = tokens.revoke_user_access([request.user.id])
+    auth_logout(request)
+    return Response({
+        'success': True, 'message': 'Deconnexion de tous les appareils reussie', 'revoked': revoked,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def token_refresh(request):
+    """
+    Body : refresh. Relit le compte (rôle et statut à jour) et renvoie une
+    nouvelle paire ; le jeton présenté est révoqué (usage unique).
+    """
+    if not tokens.is_enabled():
+        return Response({'success': False, 'message': 'Authentification par jeton désactivée.'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        claims = tokens.decode(str(request.data.get('refresh', '')), tokens.REFRESH)
+        if not tokens.consume(claims):
+            raise tokens.InvalidToken('Jeton déjà utilisé.')
+        user = User.objects.get(pk=claims['id'], is_active=True)
+    except (tokens.InvalidToken, User.DoesNotExist):
+        return Response({'success': False, 'message': 'Jeton invalide ou expiré.'}, status=status.HTTP_401_UNAUTHORIZED)
+    return Response({'success': True, **tokens.issue(user)}, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def me(request):
     user = request.user
-    return Response({
-        'id': user.id, 'username': user.username,
-        'email': user.email, 'first_name': user.first_name,
-        'last_name': user.last_name, 'role': user.role, 'phone': user.phone,
-    }, status=status.HTTP_200_OK)
+    etag, last_modified = instance_validators(user)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+    response = Response(rows.profile(user), status=status.HTTP_200_OK)
+    return set_validators(response, etag, last_modified)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def change_password(request):
-    serializer = ChangePasswordSerializer(data=request.data, context={'request': request})
+    user = request.user
+    if isinstance(user, tokens.TokenUser):
+        user = User.objects.get(pk=user.pk)  # le hash n'est pas dans le jeton
+    serializer = ChangePasswordSerializer(data=request.data, context={'request': request, 'user': user})
     if serializer.is_valid():
-        user = request.user
-        user.set_password(serializer.validated_data['new_password'])
-        user.save()
-        auth_login(request, user)
-        return Response({'success': True, 'message': 'Mot de passe change avec succes'}, status=status.HTTP_200_OK)
+        hashing.set_password(user, serializer.validated_data['new_password'])
+        user.save(update_fields=['password'])
+        # Les autres appareils sont déconnectés ; celui-ci reçoit une session ou une paire de jetons neuve.
+        tokens.revoke_user_access([user.id])
+        body = {'success': True, 'message': 'Mot de passe change avec succes'}
+        if isinstance(request.user, tokens.TokenUser):
+            body.update(tokens.issue(user))
+        else:
+            auth_login(request, user)
+        return Response(body, status=status.HTTP_200_OK)
     return Response({'success': False, 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ── MOT DE PASSE OUBLIÉ ───────────────────────────────────────────
+
+RESET_CODE_INVALID = {'success': False, 'message': 'Code invalide ou expiré.'}
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def password_reset_request(request):
+    """
+    Body : email. Envoie un code à 6 chiffres valable 10 minutes. La réponse
+    est la même que le compte existe ou non.
+    """
+    email = str(request.data.get('email', '')).strip()
+    if not EMAIL_REGEX.match(email):
+        return Response({'success': False, 'message': "Format d'email invalide"}, status=status.HTTP_400_BAD_REQUEST)
+    user = User.objects.by_email(email).filter(is_active=True).first()
+    if user is not None:
+        code = reset_codes.issue(email)
+        if code is not None:
+            notifications.send_reset_code(user, code, reset_code_ttl())
+    return Response({
+        'success': True, 'message': 'Si un compte correspond à cet email, un code vient de lui être envoyé.',
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def password_reset_verify(request):
+    """Body : email, code. Vérifie le code sans le consommer (un code faux compte comme essai)."""
+    email = str(request.data.get('email', '')).strip()
+    if not reset_codes.check(email, str(request.data.get('code', '')).strip()):
+        return Response(RESET_CODE_INVALID, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'success': True, 'message': 'Code valide.'}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def password_reset_confirm(request):
+    """Body : email, code, new_password, confirm_password. Le code est à usage unique."""
+    serializer = PasswordResetConfirmSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({'success': False, 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    if not reset_codes.check(data['email'], data['code'], consume=True):
+        return Response(RESET_CODE_INVALID, status=status.HTTP_400_BAD_REQUEST)
+    user = User.objects.by_email(data['email']).filter(is_active=True).first()
+    if user is None:
+        return Response(RESET_CODE_INVALID, status=status.HTTP_400_BAD_REQUEST)
+    hashing.set_password(user, data['new_password'])
+    user.save(update_fields=['password'])
+    tokens.revoke_user_access([user.id])
+    return Response({'success': True, 'message': 'Mot de passe reinitialise avec succes'}, status=status.HTTP_200_OK)
+
+
 # ── GESTION DES COMPTES ───────────────────────────────────────────
 
+def _page_state(paginator):
+    """Ce qui, hors lignes, change le corps d'une page : numérotation et liens."""
+    return paginator.start, paginator.has_next, paginator.has_previous
+
+
+def _user_page(paginator, can_manage):
+    data = rows.numbered_rows(paginator.get_numbered_page())
+    return {
+        'success': True, 'count': len(data),
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'can_manage': can_manage,
+        'users': data,
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_users(request):
-    queryset = User.objects.all().order_by('id')
+    """
+    Liste paginée des utilisateurs (pagination par curseur sur `id`).
 
-    search = request.query_params.get('search', '').strip()
-    role   = request.query_params.get('role', '').strip()
-    active = request.query_params.get('is_active', '').strip()
+    Query params : search, role, is_active, page_size, cursor.
+    La réponse contient les liens `next` / `previous` à suivre tels quels.
+    Réponse 304 si la page servie n'a pas changé (ETag calculé sur ses lignes).
+    """
+    queryset = filter_users(User.objects.all(), request.query_params)
 
-    if search:
-        queryset = queryset.filter(
-            Q(first_name__icontains=search) | Q(last_name__icontains=search) |
-            Q(email__icontains=search)      | Q(username__icontains=search)
-        )
-    if role:
-        queryset = queryset.filter(role=role)
-    if active in ('true', 'false'):
-        queryset = queryset.filter(is_active=(active == 'true'))
-
-    data = []
-    for idx, user in enumerate(queryset, start=1):
-        full_name = f"{user.first_name} {user.last_name}".strip() or user.username
-        initiales = (
-            (user.first_name[0] + user.last_name[0]).upper()
-            if user.first_name and user.last_name
-            else user.username[:2].upper()
+    can_manage = is_super_admin(request.user)
+    paginator = UserRowPagination()
+    page = paginator.paginate_queryset(rows.select_rows(queryset), request)
+    etag, last_modified = page_validators(page, *_page_state(paginator), can_manage)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+
+    response = Response(_user_page(paginator, can_manage), status=status.HTTP_200_OK)
+    return set_validators(response, etag, last_modified)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_users(request):
+    """
+    Recherche classée par pertinence (autocomplétion de l'écran admin).
+
+    Query params : q (texte), limit (max 50).
+    """
+    query = request.query_params.get('q', '').strip()
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+    except ValueError:
+        limit = 20
+
+    ranked = user_search.ranked_search(query, limit=limit)
+    found = {
+        row[0]: row
+        for row in rows.select_rows(User.objects.filter(id__in=[user_id for user_id, _ in ranked]))
+    }
+    data = [
+        dict(rows.user_row(found[user_id]), score=score)
+        for user_id, score in ranked if user_id in found
+    ]
+    return Response({'success': True, 'count': len(data), 'users': data}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def export_users(request):
+    """
+    Export de l'annuaire en flux, mémoire constante quelle que soit la taille.
+
+    Query params : output (csv | ndjson, défaut csv) et les filtres de
+    `list_users` (search, role, is_active).
+    """
+    export_format = request.query_params.get('output', 'csv').strip().lower()
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'success': False, 'message': f'Format invalide. Valeurs acceptées : {", ".join(EXPORT_FORMATS)}.'},
+            status=status.HTTP_400_BAD_REQUEST
         )
-        data.append({
-            'id':        user.id,
-            'numero':    str(idx).zfill(2),
-            'code':      f'#USR-{str(user.id).zfill(3)}',
-            'nom':       full_name,
-            'initiales': initiales,
-            'email':     user.email,
-            'role':      user.role,
-            'is_active': user.is_active,
-        })
+    queryset = filter_users(User.objects.all(), request.query_params)
+    response = StreamingHttpResponse(iter_export(queryset, export_format), content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="utilisateurs.{export_format}"'
+    return response
+
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_changes(request):
+    """
+    Comptes créés, modifiés, désactivés ou supprimés depuis le dernier appel.
+
+    Query params :
+        token  – jeton renvoyé par l'appel précédent (prioritaire)
+        since  – date ISO 8601, pour un premier appel à partir d'une date
+        limit  – taille de page (max 1000)
+    Sans token ni since, le premier appel renvoie tout l'annuaire par pages.
+    Tant que `has_more` est vrai, rappeler immédiatement avec le nouveau token.
+    """
+    token = request.query_params.get('token', '').strip()
+    since = request.query_params.get('since', '').strip()
+    try:
+        limit = min(max(int(request.query_params.get('limit', user_sync.get_page_size())), 1), 1000)
+    except ValueError:
+        limit = user_sync.get_page_size()
+
+    users_cursor = tombstones_cursor = None
+    if token:
+        try:
+            users_cursor, tombstones_cursor = user_sync.decode_token(token)
+        except user_sync.InvalidSyncToken as exc:
+            return Response({'success': False, 'message': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    elif since:
+        since_dt = parse_datetime(since)
+        if since_dt is None:
+            return Response({'success': False, 'message': 'Date since invalide (ISO 8601 attendu).'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since_dt):
+            since_dt = timezone.make_aware(since_dt)
+        users_cursor, tombstones_cursor = user_sync.cursors_since(since_dt)
+
+    users, deleted, next_token, has_more = user_sync.changes(users_cursor, tombstones_cursor, limit=limit)
     return Response({
-        'success': True, 'count': len(data),
-        'can_manage': is_super_admin(request.user),
-        'users': data,
+        'success': True,
+        'users': [dict(rows.user_row(rows.row_values(user)), updated_at=user.updated_at) for user in users],
+        'deleted': deleted,
+        'token': next_token,
+        'has_more': has_more,
     }, status=status.HTTP_200_OK)
 
 
-@api_view(['POST'])
+@api_view(['GET'])
 @permission_classes([IsAuthenticated])
+def user_stats(request):
+    """
+    Totaux par rôle × statut et inscriptions par jour, lus dans les tables
+    de compteurs (coût indépendant du nombre d'utilisateurs).
+
+    Query params : days (1 à 365, défaut 30).
+    """
+    try:
+        days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+    except ValueError:
+        days = 30
+    return Response({'success': True, **stats.snapshot(days=days)}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
 def create_user(request):
     """
     Crée un nouvel utilisateur.
@@ -181,57 +409,12 @@ def create_user(request):
         is_active    (bool) – statut actif/inactif
         password     (str)  – mot de passe (min 8 caractères)
     """
-    # ── 1. Vérification des droits ────────────────────────────────
-    if not is_super_admin(request.user):
-        return Response(
-            {'success': False, 'message': 'Accès refusé. Réservé au Super Administrateur.'},
-            status=status.HTTP_403_FORBIDDEN
-        )
-
-    # ── 2. Récupération et nettoyage des données ──────────────────
-    first_name = request.data.get('first_name', '').strip()
-    last_name  = request.data.get('last_name',  '').strip()
-    email      = request.data.get('email',      '').strip().lower()
-    phone      = request.data.get('phone',      '').strip()
-    role       = request.data.get('role',       '').strip()
-    is_active  = request.data.get('is_active',  True)
-    password   = request.data.get('password',   '')
-
-    # Convertit is_active si envoyé en string depuis un formulaire
-    if isinstance(is_active, str):
-        is_active = is_active.lower() in ('true', '1', 'actif')
-
-    # ── 3. Validations ────────────────────────────────────────────
-    errors = {}
+    # ── 1. Nettoyage et validations ───────────────────────────────
+    cleaned, errors = clean_user_payload(request.data)
+    email = cleaned['email']
 
-    if not first_name:
-        errors['first_name'] = 'Le prénom est obligatoire.'
-    elif len(first_name) < 2:
-        errors['first_name'] = 'Le prénom doit contenir au moins 2 caractères.'
-
-    if not last_name:
-        errors['last_name'] = 'Le nom est obligatoire.'
-    elif len(last_name) < 2:
-        errors['last_name'] = 'Le nom doit contenir au moins 2 caractères.'
-
-    email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not email:
-        errors['email'] = "L'adresse e-mail est obligatoire."
-    elif not re.match(email_regex, email):
-        errors['email'] = "Format d'e-mail invalide."
-    elif User.objects.filter(email=email).exists():
-        errors['email'] = 'Un compte avec cet e-mail existe déjà.'
-
-    valid_roles = [r[0] for r in User.ROLE_CHOICES]
-    if not role:
-        errors['role'] = 'Le rôle est obligatoire.'
-    elif role not in valid_roles:
-        errors['role'] = f'Rôle invalide. Valeurs acceptées : {", ".join(valid_roles)}.'
-
-    if not password:
-        errors['password'] = 'Le mot de passe est obligatoire.'
-    elif len(password) < 8:
-        errors['password'] = 'Le mot de passe doit contenir au moins 8 caractères.'
+    if 'email' not in errors and User.objects.by_email(email).exists():
+        errors['email'] = EMAIL_TAKEN_MESSAGE
 
     if errors:
         return Response(
@@ -239,27 +422,29 @@ def create_user(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # ── 4. Génération d'un username unique ────────────────────────
-    base_username = re.sub(r'[^a-z0-9]', '', f"{first_name}{last_name}".lower()) or email.split('@')[0]
-    username = base_username
-    counter  = 1
-    while User.objects.filter(username=username).exists():
-        username = f"{base_username}{counter}"
-        counter += 1
-
-    # ── 5. Création de l'utilisateur ──────────────────────────────
-    user = User.objects.create_user(
-        username=username,
+    # ── 2. Création de l'utilisateur (username unique attribué) ───
+    user = User(
         email=email,
-        password=password,
-        first_name=first_name,
-        last_name=last_name,
-        role=role,
-        phone=phone,
-        is_active=is_active,
+        first_name=cleaned['first_name'],
+        last_name=cleaned['last_name'],
+        role=cleaned['role'],
+        phone=cleaned['phone'],
+        is_active=cleaned['is_active'],
     )
+    hashing.set_password(user, cleaned['password'])  # PBKDF2 hors du worker (pool borné)
+    try:
+        save_with_unique_username(
+            user, base_username(cleaned['first_name'], cleaned['last_name'], email)
+        )
+    except EmailTaken:
+        # Même adresse créée par une requête concurrente depuis la vérification
+        return Response(
+            {'success': False, 'message': 'Données invalides.', 'errors': {'email': EMAIL_TAKEN_MESSAGE}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    notifications.send_welcome(user)
 
-    # ── 6. Réponse ────────────────────────────────────────────────
+    # ── 3. Réponse ────────────────────────────────────────────────
     full_name = f"{user.first_name} {user.last_name}".strip()
     return Response({
         'success': True,
@@ -275,11 +460,37 @@ def create_user(request):
     }, status=status.HTTP_201_CREATED)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def import_users(request):
+    """
+    Import en masse de comptes. Accessible uniquement au super_admin.
+
+    Corps : fichier CSV (Content-Type text/csv, ligne d'en-tête) ou NDJSON
+    (application/x-ndjson, un objet JSON par ligne), avec les mêmes champs
+    que `create_user`. Le fichier est lu en flux ; la réponse donne le
+    nombre de comptes créés et les erreurs par ligne.
+    """
+    content_type = request.content_type.split(';')[0].strip().lower()
+    if content_type not in CSV_CONTENT_TYPES + NDJSON_CONTENT_TYPES:
+        return Response(
+            {'success': False, 'message': 'Format non supporté. Envoyez un fichier CSV ou NDJSON.'},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+    if request.stream is None:
+        return Response({'success': False, 'message': 'Fichier vide.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    report = UserImporter().run(iter_rows(request.stream, content_type))
+    return Response({
+        'success': True,
+        'message': f"{report['created']} compte(s) créé(s), {report['failed']} ligne(s) rejetée(s).",
+        **report,
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['PATCH'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
 def toggle_user_status(request, user_id):
-    if not is_super_admin(request.user):
-        return Response({'success': False, 'message': 'Acces refuse.'}, status=status.HTTP_403_FORBIDDEN)
     try:
         user = User.objects.get(id=user_id)
     except User.DoesNotExist:
@@ -287,7 +498,8 @@ def toggle_user_status(request, user_id):
     if user.id == request.user.id:
         return Response({'success': False, 'message': 'Vous ne pouvez pas modifier votre propre statut.'}, status=status.HTTP_400_BAD_REQUEST)
     user.is_active = not user.is_active
-    user.save()
+    user.save(update_fields=['is_active', 'updated_at'])  # pas de réindexation de la recherche
+    notifications.send_status_notice(user)
     return Response({
         'success': True,
         'message': f"Utilisateur {'active' if user.is_active else 'desactive'} avec succes.",
@@ -296,10 +508,8 @@ def toggle_user_status(request, user_id):
 
 
 @api_view(['DELETE'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
 def delete_user(request, user_id):
-    if not is_super_admin(request.user):
-        return Response({'success': False, 'message': 'Acces refuse.'}, status=status.HTTP_403_FORBIDDEN)
     try:
         user = User.objects.get(id=user_id)
     except User.DoesNotExist:
@@ -307,4 +517,92 @@ def delete_user(request, user_id):
     if user.id == request.user.id:
         return Response({'success': False, 'message': 'Vous ne pouvez pas supprimer votre propre compte.'}, status=status.HTTP_400_BAD_REQUEST)
     user.delete()
-    return Response({'success': True, 'message': 'Utilisateur supprime avec succes.'}, status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response({'success': True, 'message': 'Utilisateur supprime avec succes.'}, status=status.HTTP_200_OK)
+
+
+# ── ACTIONS EN MASSE ──────────────────────────────────────────────
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def bulk_user_status(request):
+    """
+    Active ou désactive un ensemble de comptes, par lots (un UPDATE chacun).
+
+    Body : is_active (bool) et soit `ids` (liste d'identifiants), soit
+    `filters` ({search, role, is_active}, comme `list_users`).
+    Le compte du super_admin qui fait la demande n'est jamais modifié.
+    """
+    is_active = request.data.get('is_active')
+    if isinstance(is_active, str):
+        is_active = {'true': True, 'false': False}.get(is_active.lower())
+    if not isinstance(is_active, bool):
+        return Response({'success': False, 'message': "Le champ is_active (booléen) est obligatoire."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        queryset = resolve_selection(request.data, exclude_user=request.user)
+    except BulkSelectionError as exc:
+        return Response({'success': False, 'message': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    updated = bulk_set_active(queryset, is_active)
+    return Response({
+        'success': True,
+        'message': f"{updated} utilisateur(s) {'active(s)' if is_active else 'desactive(s)'} avec succes.",
+        'updated': updated,
+        'is_active': is_active,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def bulk_delete_users(request):
+    """
+    Supprime un ensemble de comptes par lots (voir `bulk_user_status` pour le body).
+    Le compte du super_admin qui fait la demande n'est jamais supprimé.
+    """
+    try:
+        queryset = resolve_selection(request.data, exclude_user=request.user)
+    except BulkSelectionError as exc:
+        return Response({'success': False, 'message': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    deleted = bulk_delete(queryset)
+    return Response({
+        'success': True,
+        'message': f'{deleted} utilisateur(s) supprime(s) avec succes.',
+        'deleted': deleted,
+    }, status=status.HTTP_200_OK)
+
+
+# ── SUPERVISION ───────────────────────────────────────────────────
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def metrics(request):
+    """Métriques du processus au format texte Prometheus."""
+    pool = hashing.hashing_pool.metrics.snapshot()
+    extra = [
+        ('accounts_password_hash_completed_total', 'Hachages terminés.', pool['completed']),
+        ('accounts_password_hash_rejected_total', 'Hachages refusés (file saturée).', pool['rejected']),
+        ('accounts_password_hash_in_flight', 'Hachages en cours ou en attente.', pool['in_flight']),
+        ('accounts_password_hash_seconds_total', 'Temps cumulé de hachage.', pool['hash_seconds_total']),
+        ('accounts_password_hash_queue_wait_seconds_total', "Temps cumulé d'attente dans la file.", pool['queue_wait_seconds_total']),
+        ('accounts_session_pending_renewals', "Renouvellements de session en attente d'écriture.", len(pending_renewals)),
+    ]
+    queue = mail_queue.depth()
+    extra += [
+        ('accounts_mail_queue_pending', "E-mails en file d'envoi.", queue['pending']),
+        ('accounts_mail_queue_due', 'E-mails en file dont l\'envoi est dû.', queue['due']),
+        ('accounts_mail_queue_failed', 'E-mails abandonnés après MAIL_QUEUE_MAX_ATTEMPTS essais.', queue['failed']),
+    ]
+    pools = pools_snapshot()
+    for key, help_text in (
+        ('in_use', 'Connexions SQL prêtées.'),
+        ('saturation', 'Part du pool SQL utilisée (in_use / max_size).'),
+        ('wait_seconds_total', "Temps cumulé d'attente d'une connexion SQL."),
+        ('wait_seconds_max', "Attente maximale d'une connexion SQL."),
+        ('timeouts', 'Attentes de connexion SQL abandonnées (pool saturé).'),
+        ('discarded', 'Connexions SQL jetées (contrôle de santé échoué).'),
+    ):
+        extra.append((f'accounts_db_pool_{key}', help_text, {f'alias="{a}"': snap[key] for a, snap in pools.items()}))
+    return HttpResponse(
+        metrics_registry.render(extra), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
\ No newline at end of file
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm_backend.settings')
+# Variantes async des vues les plus sollicitées (voir accounts/async_views.py).
+os.environ.setdefault('ACCOUNTS_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
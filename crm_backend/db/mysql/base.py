@@ -0,0 +1,23 @@
+"""
+Backend MySQL avec pool de connexions (voir `crm_backend.db.pool`).
+
+ENGINE = 'crm_backend.db.mysql' et OPTIONS['pool'] = {...} ; sans
+OPTIONS['pool'], comportement identique à django.db.backends.mysql.
+"""
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+from django.db.backends.mysql.creation import DatabaseCreation as MySQLDatabaseCreation
+
+from crm_backend.db.pool import PooledDatabaseWrapperMixin, ping
+
+
+class DatabaseCreation(MySQLDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Les connexions libres du pool pointent sur la base qu'on supprime.
+        self.connection.close_pool()
+        return super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, MySQLDatabaseWrapper):
+    creation_class = DatabaseCreation
+    pool_health_check = staticmethod(ping)
@@ -0,0 +1,337 @@
+"""
+Pool de connexions persistantes pour les backends Django sans pool natif
+(MySQL).
+
+Sans pool, chaque requête HTTP ouvre une connexion MySQL (TCP +
+authentification + `init_command`) puis la ferme. Ici, la fermeture de fin
+de requête rend la connexion au pool du processus et la requête suivante la
+reprend :
+
+- au plus `max_size` connexions ouvertes ; au-delà, on attend au plus
+  `timeout` secondes une connexion libre (PoolTimeout sinon) ;
+- `min_size` connexions sont gardées ouvertes, même inactives ;
+- les connexions inactives depuis plus de `idle_timeout` secondes sont
+  fermées ;
+- chaque connexion sortie du pool passe un contrôle de santé (ping) ; une
+  connexion morte est jetée et remplacée.
+
+Le pool ne dépend que de l'API DB-API (`close()`, et ce qu'utilise le
+contrôle de santé) : il se teste avec une fausse connexion.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Aucune connexion libérée dans le délai imparti (pool saturé)."""
+
+
+def ping(connection):
+    """Contrôle de santé MySQLdb : aller-retour minimal, sans requête SQL."""
+    connection.ping()
+
+
+def select_one(connection):
+    """Contrôle de santé générique DB-API."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT 1')
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+class PoolMetrics:
+
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0                 # sorties qui ont dû attendre une connexion
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0             # contrôle de santé échoué, connexion cassée
+        self.expired = 0               # fermées après idle_timeout
+
+
+class ConnectionPool:
+
+    def __init__(self, connect, min_size=0, max_size=10, idle_timeout=300, timeout=10,
+                 health_check=ping, clock=time.monotonic):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('Taille de pool invalide (0 <= min_size <= max_size, max_size >= 1).')
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.health_check = health_check
+        self.clock = clock
+        self.metrics = PoolMetrics()
+        self._cond = threading.Condition()
+        self._idle = deque()           # (connexion, rendue à)
+        self._size = 0                 # connexions ouvertes (libres + prêtées + en création)
+        self._in_use = 0
+        self.key = None                # paramètres de connexion du pool (voir get_pool)
+        self.retired = False
+
+    # ── Sortie / retour ───────────────────────────────────────────
+
+    def checkout(self):
+        started = self.clock()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            connection, create = None, False
+            with self._cond:
+                while True:
+                    self._expire_idle()
+                    if self._idle:
+                        connection, _ = self._idle.pop()   # la plus récente : encore « chaude »
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        self.metrics.timeouts += 1
+                        raise PoolTimeout(
+                            f'Pool saturé : {self.max_size} connexions utilisées depuis {self.timeout} s.'
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+                self._in_use += 1
+
+            if create:
+                try:
+                    connection = self.connect()
+                except BaseException:
+                    self._forget()
+                    raise
+                with self._cond:
+                    self.metrics.created += 1
+            elif not self._healthy(connection):
+                self._forget(connection)
+                with self._cond:
+                    self.metrics.discarded += 1
+                continue
+
+            wait = self.clock() - started
+            with self._cond:
+                self.metrics.checkouts += 1
+                if waited:
+                    self.metrics.waits += 1
+                    self.metrics.wait_seconds_total += wait
+                    self.metrics.wait_seconds_max = max(self.metrics.wait_seconds_max, wait)
+            return connection
+
+    def checkin(self, connection, discard=False):
+        if discard or self.retired:
+            self._forget(connection)
+            with self._cond:
+                self.metrics.discarded += 1
+            return
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((connection, self.clock()))
+            self._expire_idle()
+            self._cond.notify()
+
+    def _healthy(self, connection):
+        if self.health_check is None:
+            return True
+        try:
+            self.health_check(connection)
+        except Exception:
+            return False
+        return True
+
+    def _forget(self, connection=None):
+        """Retire une connexion prêtée (ou en création) du pool et la ferme."""
+        with self._cond:
+            self._in_use -= 1
+            self._size -= 1
+            self._cond.notify()
+        if connection is not None:
+            _close_quietly(connection)
+
+    def _expire_idle(self):
+        """Ferme les connexions libres trop anciennes (verrou tenu), au-dessus de min_size."""
+        if self.idle_timeout is None:
+            return
+        limit = self.clock() - self.idle_timeout
+        while self._idle and self._size > self.min_size and self._idle[0][1] < limit:
+            connection, _ = self._idle.popleft()    # les plus anciennes sont à gauche
+            self._size -= 1
+            self.metrics.expired += 1
+            _close_quietly(connection)
+
+    # ── Gestion ───────────────────────────────────────────────────
+
+    def fill(self):
+        """Ouvre des connexions jusqu'à min_size."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self.connect()
+            except BaseException:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self.metrics.created += 1
+                self._idle.append((connection, self.clock()))
+                self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for connection, _ in idle:
+            _close_quietly(connection)
+
+    def retire(self):
+        """Ferme les connexions libres ; celles encore prêtées seront fermées à leur retour."""
+        self.retired = True
+        self.close_all()
+
+    def snapshot(self):
+        with self._cond:
+            m = self.metrics
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+                'saturation': self._in_use / self.max_size,
+                'checkouts': m.checkouts,
+                'waits': m.waits,
+                'wait_seconds_total': m.wait_seconds_total,
+                'wait_seconds_max': m.wait_seconds_max,
+                'timeouts': m.timeouts,
+                'created': m.created,
+                'discarded': m.discarded,
+                'expired': m.expired,
+            }
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+# ── Pools du processus, par alias de base ─────────────────────────
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, factory, key=None):
+    """
+    Pool de l'alias. Si les paramètres de connexion (`key`) ont changé, par
+    exemple NAME lors de la création de la base de test, l'ancien pool est
+    retiré : ses connexions vers l'ancienne base ne sont plus prêtées.
+    """
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is not None and pool.key != key:
+            pool.retire()
+            pool = None
+        if pool is None:
+            pool = _pools[alias] = factory()
+            pool.key = key
+        return pool
+
+
+def close_pool(alias):
+    with _pools_lock:
+        pool = _pools.pop(alias, None)
+    if pool is not None:
+        pool.retire()
+
+
+def pools_snapshot():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.snapshot() for alias, pool in pools.items()}
+
+
+def _reset_after_fork():
+    # Un worker forké (gunicorn --preload) ne doit pas réutiliser les sockets du parent.
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    _pools.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    À combiner avec le DatabaseWrapper d'un backend Django. Actif quand
+    OPTIONS['pool'] est défini (dict : min_size, max_size, idle_timeout,
+    timeout) ; garder CONN_MAX_AGE = 0 pour rendre la connexion au pool à la
+    fin de chaque requête.
+    """
+    pool_health_check = staticmethod(ping)
+
+    @property
+    def pool_options(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if options is True:
+            return {}
+        return options or None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    @property
+    def pool_key(self):
+        return tuple(self.settings_dict.get(name) for name in ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT'))
+
+    def get_pool(self, conn_params):
+        options = self.pool_options
+
+        def factory():
+            pool = ConnectionPool(
+                lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params),
+                health_check=self.pool_health_check,
+                **options,
+            )
+            pool.fill()
+            return pool
+
+        return get_pool(self.alias, factory, self.pool_key)
+
+    def close_pool(self):
+        close_pool(self.alias)
+
+    def get_new_connection(self, conn_params):
+        if self.pool_options is None:
+            return super().get_new_connection(conn_params)
+        self.pool = self.get_pool(conn_params)
+        return self.pool.checkout()
+
+    def _close(self):
+        pool = getattr(self, 'pool', None)
+        if pool is None or self.connection is None:
+            return super()._close()
+        # Connexion fermée au milieu d'une transaction ou après une erreur : on ne la rend pas.
+        broken = self.in_atomic_block or (self.errors_occurred and not self.is_usable())
+        if not broken and not self.get_autocommit():
+            try:
+                self.connection.rollback()
+            except Exception:
+                broken = True
+        pool.checkin(self.connection, discard=broken)
@@ -2,6 +2,7 @@
 Django settings for crm_backend project.
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',   # ← DOIT être en 1er absolu
+    'accounts.middleware.RequestMetricsMiddleware',  # Durée / SQL / taille par vue (METRICS_ENABLED)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,15 +66,22 @@ WSGI_APPLICATION = 'crm_backend.wsgi.application'
 # Database - MySQL
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'crm_backend.db.mysql',  # django.db.backends.mysql + pool de connexions
         'NAME': 'crm_formation_db',
         'USER': 'root',
         'PASSWORD': '',
         'HOST': 'localhost',
         'PORT': '3306',
+        'CONN_MAX_AGE': 0,                  # Rend la connexion au pool à la fin de chaque requête
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
             'charset': 'utf8mb4',
+            'pool': {
+                'min_size': 2,              # Connexions gardées ouvertes
+                'max_size': 20,             # Par processus ; au-delà on attend `timeout` s
+                'idle_timeout': 300,        # Fermeture des connexions inactives (s)
+                'timeout': 10,
+            },
         }
     }
 }
@@ -129,12 +138,38 @@ CORS_ALLOW_HEADERS = [
 ]
 
 
-# ✅ Session Configuration - stocke la session en base de données
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# ✅ Session Configuration - session en base, lue depuis le cache
+SESSION_ENGINE = 'accounts.sessions'  # cached_db qui regroupe les renouvellements
 SESSION_COOKIE_AGE = 86400          # Durée de vie : 24 heures (en secondes)
 SESSION_COOKIE_HTTPONLY = True       # Sécurité : cookie non accessible en JS
 SESSION_COOKIE_SAMESITE = 'Lax'     # ✅ Nécessaire pour le cross-origin avec React
 SESSION_SAVE_EVERY_REQUEST = True    # Renouvelle la session à chaque requête
+SESSION_CACHE_ALIAS = 'default'
+SESSION_RENEW_FRACTION = 0.1        # Réécrit l'expiration en base après 10 % de SESSION_COOKIE_AGE
+SESSION_FLUSH_BATCH_SIZE = 200      # Renouvellements en attente écrits par lots…
+SESSION_FLUSH_INTERVAL = 30         # …ou au plus tard toutes les 30 secondes
+
+
+# Cache : partagé entre workers (Redis) si REDIS_URL est défini, sinon local au processus.
+# Sessions, révocation des jetons et codes de réinitialisation exigent un cache
+# partagé dès qu'il y a plusieurs workers (checks accounts.E00x).
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'crm-backend',
+        }
+    }
+# Un seul processus (runserver, tests) : cache local accepté. À False avec gunicorn/uvicorn à plusieurs workers.
+ACCOUNTS_SINGLE_PROCESS = os.environ.get('ACCOUNTS_SINGLE_PROCESS', '1' if DEBUG else '0') == '1'
 
 
 # ✅ CSRF Configuration
@@ -152,6 +187,7 @@ CSRF_TRUSTED_ORIGINS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',  # ✅ Auth par session/cookie
+        'accounts.authentication.AccessTokenAuthentication',    # Bearer, si ACCOUNTS_TOKEN_AUTH
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -159,8 +195,77 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S',
+    # Proxys de confiance devant l'application : l'adresse client (limitation
+    # des connexions par IP) est lue à cette position depuis la fin de
+    # X-Forwarded-For. 0 : REMOTE_ADDR seul, l'en-tête (falsifiable) est ignoré.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
 }
 
 
-# Email (mode développement : affiche dans le terminal)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
+# Email : mis en file (table mail_queue), livré par `manage.py send_queued_mail --loop`
+EMAIL_BACKEND = 'accounts.mail_queue.QueuedEmailBackend'
+MAIL_QUEUE_DELIVERY_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # Développement : terminal (SMTP en production)
+MAIL_QUEUE_BATCH_SIZE = 100         # Messages envoyés par connexion
+MAIL_QUEUE_LEASE = 300              # Un lot réservé et non traité (worker arrêté) redevient dû après 5 minutes
+MAIL_QUEUE_RETRY_BASE = 30          # Premier nouvel essai après 30 s, puis délai doublé…
+MAIL_QUEUE_RETRY_MAX = 3600         # …plafonné à 1 heure
+MAIL_QUEUE_MAX_ATTEMPTS = 8         # Essais avant abandon (failed)
+
+# ✅ Authentification par e-mail (une seule requête indexée sur LOWER(email))
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.EmailBackend',
+]
+
+
+# ✅ Hachage des mots de passe dans un pool de processus borné (0 = dans le worker)
+PASSWORD_HASH_WORKERS = 4
+PASSWORD_HASH_MAX_PENDING = 16      # Au-delà : 503 + Retry-After immédiat
+PASSWORD_HASH_TIMEOUT = 10          # Secondes
+PASSWORD_HASH_RETRY_AFTER = 1       # Secondes
+
+
+# Opérations en masse sur les comptes (import / export CSV-NDJSON, suppression)
+IMPORT_CHUNK_SIZE = 500             # Lignes validées puis insérées par lot
+BULK_DELETE_CHUNK_SIZE = 500        # Suppression en masse : comptes supprimés par transaction
+BULK_STATUS_CHUNK_SIZE = 1000       # (Dés)activation en masse : comptes modifiés par transaction
+EXPORT_CHUNK_SIZE = 2000            # Export en flux : lignes lues par requête
+
+
+# Flux de synchronisation incrémentale (users/changes/)
+SYNC_PAGE_SIZE = 500
+SYNC_SAFETY_SECONDS = 5             # Lignes plus récentes renvoyées à l'appel suivant
+
+
+# Limitation des tentatives de connexion (fenêtre glissante, avant tout hachage)
+LOGIN_THROTTLE_ENABLED = True
+LOGIN_THROTTLE_BACKEND = 'accounts.throttling.MemoryBackend'  # CacheBackend : compteurs partagés entre workers
+LOGIN_THROTTLE_RATES = {
+    'email': (10, 300),             # (tentatives, fenêtre en secondes)
+    'ip': (60, 60),
+}
+LOGIN_THROTTLE_MAX_KEYS = 50000     # Clés gardées en mémoire par processus (LRU)
+
+
+# Vues natives async pour me / login / logout / list_users (activé par asgi.py)
+ACCOUNTS_ASYNC_VIEWS = os.environ.get('ACCOUNTS_ASYNC_VIEWS', '0') == '1'
+
+
+# Jetons signés sans état : login renvoie access / refresh au lieu d'ouvrir une session
+ACCOUNTS_TOKEN_AUTH = os.environ.get('ACCOUNTS_TOKEN_AUTH', '0') == '1'
+ACCOUNTS_TOKEN_KEY = None           # Clé HMAC locale (SECRET_KEY par défaut)
+ACCOUNTS_TOKEN_FALLBACK_KEYS = []   # Anciennes clés acceptées pendant une rotation
+ACCESS_TOKEN_LIFETIME = 300         # Jeton d'accès : 5 minutes
+REFRESH_TOKEN_LIFETIME = 7 * 86400  # Jeton de rafraîchissement : 7 jours, usage unique
+TOKEN_CACHE_ALIAS = 'default'       # Liste de révocation : cache partagé entre workers (check accounts.E003)
+
+
+# Mot de passe oublié : codes dans un store à durée de vie (pas en base)
+PASSWORD_RESET_BACKEND = 'accounts.password_reset.CacheBackend'  # Partagé entre workers (MemoryBackend : un seul processus)
+PASSWORD_RESET_CACHE_ALIAS = 'default'
+PASSWORD_RESET_TTL = 600            # Validité d'un code : 10 minutes
+PASSWORD_RESET_MAX_ATTEMPTS = 5     # Codes faux tolérés avant blocage jusqu'à expiration
+PASSWORD_RESET_RESEND_INTERVAL = 60 # Délai minimal entre deux envois
+
+
+# Supervision : métriques par vue exposées sur /api/metrics/ (format Prometheus)
+METRICS_ENABLED = True